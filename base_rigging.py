@@ -1,5 +1,20 @@
 import maya.cmds as cmds
 import math
+import os
+import sys
+import json
+import hashlib
+import time
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+from scene_index import SCENE_INDEX
+from rig_math import (get_world_matrices, remove_scale, chain_local_matrices, aim_matrices, matrix_to_euler_xyz,
+                      euler_xyz_to_matrix, solve_joint_orients, solve_pole_positions, SECONDARY_AXIS_VECTORS)
+from skeleton_index import SkeletonIndex
+from rig_benchmark import time_playback, print_comparison
+from rig_report import build_report, format_report, check_budgets
+from cmds_profiler import CmdsProfiler
 
 # 定义组的名称列表
 groups = ["geometry", "controls", "rigNodes", "joints"]
@@ -34,186 +49,12 @@ master_attributes = {
                             "target_group": "geometry", "target_attribute": "overrideDisplayType"},
 }
 
-# 定义控制器形状信息
-CTRL_INFO = {
-    'shape': {
-        'square': {'degree': 1,
-                   'point': [[-1, 0, -1], [-1, 0, 1], [1, 0, 1], [1, 0, -1], [-1, 0, -1]],
-                   'knot': [0, 1, 2, 3, 4]},
-        'arrow': {'degree': 1,
-                  'point': [[-0.5, 0, -1], [-0.5, 0, 0], [-1, 0, 0], [0, 0, 1], [1, 0, 0], [0.5, 0, 0], [0.5, 0, -1],
-                            [-0.5, 0, -1]],
-                  'knot': [0, 1, 2, 3, 4, 5, 6, 7]},
-        'cube': {'degree': 1,
-                 'point': [[-0.5, 0.5, 0.5], [-0.5, -0.5, 0.5], [0.5, -0.5, 0.5], [0.5, 0.5, 0.5],
-                           [-0.5, 0.5, 0.5], [-0.5, 0.5, -0.5], [0.5, 0.5, -0.5], [0.5, 0.5, 0.5],
-                           [0.5, -0.5, 0.5], [0.5, -0.5, -0.5], [0.5, 0.5, -0.5], [0.5, -0.5, -0.5],
-                           [-0.5, -0.5, -0.5], [-0.5, 0.5, -0.5], [-0.5, -0.5, -0.5], [-0.5, -0.5, 0.5]],
-                 'knot': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]},
-        'octagon': {'degree': 1,
-                    'point': [(math.cos(2 * math.pi * i / 8), 0, math.sin(2 * math.pi * i / 8))
-                              for i in range(8)] + [[1, 0, 0]],
-                    'knot': list(range(9))},
-        'cross': {'degree': 1,
-                  'point': [[1, 3, 0], [1, 1, 0], [3, 1, 0], [3, -1, 0], [1, -1, 0], [1, -3, 0], [-1, -3, 0],
-                            [-1, -1, 0],
-                            [-3, -1, 0], [-3, 1, 0], [-1, 1, 0], [-1, 3, 0], [1, 3, 0]],
-                  'knot': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]},
-        'cog': {'degree': 1,
-                'point': [
-                    (0.5, 0, 0), (0.35, 0, 0.35), (0, 0, 0.5), (-0.35, 0, 0.35), (-0.5, 0, 0),
-                    (-0.35, 0, -0.35), (0, 0, -0.5), (0.35, 0, -0.35), (0.5, 0, 0)
-                ],
-                'knot': [0, 1, 2, 3, 4, 5, 6, 7, 8]},
-        'headLocal': {'degree': 1,
-                      'point': [(0.0, 1.0, 0.0), (0.0, 0.7071067690849304, 0.7071067094802856),
-                                (0.0, 0.0, 0.9999999403953552), (0.0, -0.7071067690849304, 0.7071067094802856),
-                                (0.0, -1.0, 0.0), (0.0, -0.7071067690849304, -0.7071067094802856),
-                                (0.0, 0.0, -0.9999998807907104), (0.0, 0.7071067690849304, -0.7071067094802856),
-                                (0.0, 1.0, 0.0), (0.7071067690849304, 0.7071067690849304, 0.0),
-                                (1.0, 0.0, 0.0), (0.7071067690849304, -0.7071067690849304, 0.0),
-                                (0.0, -1.0, 0.0), (-0.7071067094802856, -0.7071067690849304, 0.0),
-                                (-0.9999998807907104, 0.0, 0.0), (-0.7071067094802856, 0.7071067690849304, 0.0),
-                                (0.0, 1.0, 0.0), (-0.7071067094802856, 0.7071067690849304, 0.0),
-                                (-0.9999998807907104, 0.0, 0.0), (-0.7071067094802856, 0.0, -0.7071067094802856),
-                                (0.0, 0.0, -0.9999998807907104), (0.7071067094802856, 0.0, -0.7071067094802856),
-                                (1.0, 0.0, 0.0), (0.7071067690849304, 0.0, 0.7071067690849304),
-                                (0.0, 0.0, 0.9999999403953552), (-0.7071067094802856, 0.0, 0.7071067094802856),
-                                (-0.9999998807907104, 0.0, 0.0)],
-                      'knot': [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0, 12.0, 13.0, 14.0, 15.0,
-                               16.0, 17.0, 18.0, 19.0, 20.0, 21.0, 22.0, 23.0, 24.0, 25.0, 26.0]},
-        'clavicle': {'degree': 1,
-                     'point': [[0, 0, 5], [-1, 0, 6], [0, 0, 7], [1, 0, 6], [0, 0, 5], [0, 0, 0], [0, 0, -5],
-                               [-1, 0, -6], [0, 0, -7], [1, 0, -6], [0, 0, -5], [0, 1, -6], [0, 0, -7], [0, -1, -6],
-                               [0, 0, -5], [0, 0, 0], [0, 0, 5], [0, 1, 6], [0, 0, 7], [0, -1, 6], [0, 0, 5],
-                               [0, 1, 6], [-1, 0, 6], [0, -1, 6], [1, 0, 6], [0, 1, 6], [0, 0, 5], [0, 0, 0],
-                               [0, 0, -5], [0, 1, -6], [-1, 0, -6], [0, -1, -6], [1, 0, -6], [0, 1, -6]],
-                     'knot': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23,
-                              24, 25, 26, 27, 28, 29, 30, 31, 32, 33]},
-        'scapulaL': {
-            'degree': 1,  # 1 次 B 样条（线性插值，即多段线）
-            'point': [
-                [13.373194609638492, -2.581291462895584, 12.8058831275416],
-                [20.283956464120095, -2.70416136816603, 6.017509772261082],
-                [18.988162596908182, -2.890748278129042, 4.684836406511425],
-                [12.077400742426562, -2.7678783728585623, 11.473209761791942],
-                [13.373194609638492, -2.581291462895584, 12.8058831275416],
-                [15.571351046855208, -16.671422312629037, 11.33382213369734],
-                [20.58425062251515, -16.782766575005688, 6.378306316622873],
-                [20.283956464120095, -2.70416136816603, 6.017509772261082],
-                [20.58425062251515, -16.782766575005688, 6.378306316622873],
-                [19.288456755303216, -16.969353484968682, 5.045632950873244],
-                [18.988162596908182, -2.890748278129042, 4.684836406511425],
-                [19.288456755303216, -16.969353484968682, 5.045632950873244],
-                [14.27555717964326, -16.85800922259205, 10.001148767947683],
-                [12.077400742426562, -2.7678783728585623, 11.473209761791942],
-                [14.27555717964326, -16.85800922259205, 10.001148767947683],
-                [15.571351046855208, -16.671422312629037, 11.33382213369734],
-                [13.373194609638492, -2.581291462895584, 12.8058831275416]
-            ],
-            'knot': [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0, 12.0, 13.0, 14.0, 15.0, 16.0]},
-
-        'scapulaR': {
-            'degree': 1,  # 线性 B 样条（多段线）
-            'point': [
-                [-13.373196469376804, 2.5808795772834046, -12.805860451019084],
-                [-20.283958323858407, 2.7037494825538517, -6.017487095738566],
-                [-18.988164456646494, 2.890336392516863, -4.684813729988909],
-                [-12.077402602164874, 2.7674664872463826, -11.473187085269426],
-                [-13.373196469376804, 2.5808795772834046, -12.805860451019084],
-                [-15.571352906593518, 16.671010427016856, -11.333799457174825],
-                [-20.584252482253458, 16.782354689393507, -6.378283640100357],
-                [-20.283958323858407, 2.7037494825538517, -6.017487095738566],
-                [-20.584252482253458, 16.782354689393507, -6.378283640100357],
-                [-19.288458615041524, 16.9689415993565, -5.045610274350728],
-                [-18.988164456646494, 2.890336392516863, -4.684813729988909],
-                [-19.288458615041524, 16.9689415993565, -5.045610274350728],
-                [-14.27555903938157, 16.857597336979865, -10.001126091425167],
-                [-12.077402602164874, 2.7674664872463826, -11.473187085269426],
-                [-14.27555903938157, 16.857597336979865, -10.001126091425167],
-                [-15.571352906593518, 16.671010427016856, -11.333799457174825],
-                [-13.373196469376804, 2.5808795772834046, -12.805860451019084]
-            ],
-            'knot': [float(i) for i in range(17)]},
-
-        'pyramidl': {
-            'degree': 1,
-            'point': [[1, 0, 1], [-1, 0, 1], [-1, 0, -1], [1, 0, -1], [1, 0, 1], [0, 2, 0], [1, 0, 1], [-1, 0, 1],
-                      [0, 2, 0], [-1, 0, -1], [0, 2, 0], [1, 0, -1], [0, 2, 0]],
-            'knot': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
-        },
-        'pyramidr': {
-            'degree': 1,
-            'point': [[1, 0, 1], [-1, 0, 1], [-1, 0, -1], [1, 0, -1], [1, 0, 1], [0, -2, 0], [1, 0, 1], [-1, 0, 1],
-                      [0, -2, 0], [-1, 0, -1], [0, -2, 0], [1, 0, -1], [0, -2, 0]],
-            'knot': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
-        },
+# 控制器形状数据存放在 controller_shapes.json 中，由 SHAPE_LIBRARY 懒加载
+# circleY/circleX 仍使用 cmds.circle 创建
+NATIVE_CIRCLE_SHAPES = {'circleY': (0, 1, 0), 'circleX': (1, 0, 0)}
 
-        'clavicleL': {
-            'degree': 1,
-            'point': [[-1.7430770550733623, -3.3990209831111793, 5.423020977367101],
-                      [-3.747160706151803, -3.4494778571300726, 7.9330461594762935],
-                      [-1.236651588321227, -3.503550688084539, 9.936429220630608],
-                      [0.7674320627572127, -3.453093814065644, 7.426404038521409],
-                      [-1.7430770550733623, -3.3990209831111793, 5.423020977367101],
-                      [0.0, 0.0, 0.0], [17.599136509119166, -11.14489906377664, -18.277790842991823],
-                      [17.677797662270173, -11.305291073596377, -21.251458209383106],
-                      [20.59910722500327, -11.878747678161506, -21.143251272755705],
-                      [20.520446071852284, -11.718355668341689, -18.169583906364426],
-                      [17.599136509119166, -11.14489906377664, -18.277790842991823],
-                      [19.50800671725651, -9.447842665434703, -19.811030840220493],
-                      [20.59910722500327, -11.878747678161506, -21.143251272755705],
-                      [18.690237016865932, -13.575804076503394, -19.610011275527032],
-                      [17.599136509119166, -11.14489906377664, -18.277790842991823],
-                      [0.0, 0.0, 0.0], [-1.7430770550733623, -3.3990209831111793, 5.423020977367101],
-                      [-1.482239354564638, -1.1804210417038317, 7.731462353156961],
-                      [-1.236651588321227, -3.503550688084539, 9.936429220630608],
-                      [-1.4974892888299558, -5.722150629491884, 7.62798784484074],
-                      [-1.7430770550733623, -3.3990209831111793, 5.423020977367101],
-                      [0.7674320627572127, -3.453093814065644, 7.426404038521409],
-                      [-1.482239354564638, -1.1804210417038317, 7.731462353156961],
-                      [-3.747160706151803, -3.4494778571300726, 7.9330461594762935],
-                      [-1.4974892888299558, -5.722150629491884, 7.62798784484074],
-                      [0.7674320627572127, -3.453093814065644, 7.426404038521409],
-                      [-1.7430770550733623, -3.3990209831111793, 5.423020977367101],
-                      [0.0, 0.0, 0.0], [17.599136509119166, -11.14489906377664, -18.277790842991823],
-                      [20.520446071852284, -11.718355668341689, -18.169583906364426],
-                      [18.690237016865932, -13.575804076503394, -19.610011275527032],
-                      [17.677797662270173, -11.305291073596377, -21.251458209383106],
-                      [19.50800671725651, -9.447842665434703, -19.811030840220493],
-                      [20.520446071852284, -11.718355668341689, -18.169583906364426]],
-            'knot': [float(i) for i in range(34)]},
-
-        'clavicleR': {'degree': 1,
-                     'point': [[1.743, 3.399, -5.423], [3.747, 3.45, -7.933], [1.237, 3.504, -9.936],
-                               [-0.767, 3.453, -7.426], [1.743, 3.399, -5.423], [0.0, 0.0, -0.0],
-                               [-17.599, 11.145, 18.278], [-17.678, 11.305, 21.251], [-20.599, 11.879, 21.143],
-                               [-20.52, 11.718, 18.17], [-17.599, 11.145, 18.278], [-19.508, 9.448, 19.811],
-                               [-20.599, 11.879, 21.143], [-18.69, 13.576, 19.61], [-17.599, 11.145, 18.278],
-                               [0.0, 0.0, -0.0], [1.743, 3.399, -5.423], [1.482, 1.18, -7.731], [1.237, 3.504, -9.936],
-                               [1.497, 5.722, -7.628], [1.743, 3.399, -5.423], [-0.767, 3.453, -7.426],
-                               [1.482, 1.18, -7.731], [3.747, 3.45, -7.933], [1.497, 5.722, -7.628],
-                               [-0.767, 3.453, -7.426], [1.743, 3.399, -5.423], [0.0, 0.0, -0.0],
-                               [-17.599, 11.145, 18.278], [-20.52, 11.718, 18.17], [-18.69, 13.576, 19.61],
-                               [-17.678, 11.305, 21.251], [-19.508, 9.448, 19.811], [-20.52, 11.718, 18.17]],
-                     'knot': [float(i) for i in range(34)]},
-
-        'ankle': {
-                    'degree': 1,  # 1 次 B 样条（线性插值，即多段线）
-                    'point': [
-                        [6.754, 2.008, 6.877], [6.754, 2.008, -6.39], [-6.754, 2.008, -6.39], [-6.754, 2.008, 6.877],
-                        [6.754, 2.008, 6.877], [6.754, -7.158, 23.239], [-6.754, -7.158, 23.239], [-6.754, 2.008, 6.877],
-                        [6.754, 2.008, 6.877], [6.754, 2.008, -6.39], [6.754, -11.423, -7.246], [-6.754, -11.423, -7.246],
-                        [-6.754, 2.008, -6.39], [6.754, 2.008, -6.39], [6.754, -11.423, -7.246], [6.754, -11.423, 23.239],
-                        [-6.754, -11.423, 23.239], [-6.754, -11.423, -7.246], [6.754, -11.423, -7.246], [6.754, -11.423, 23.239],
-                        [6.754, -7.158, 23.239], [-6.754, -7.158, 23.239], [-6.754, -11.423, 23.239], [6.754, -11.423, 23.239]
-                    ],
-                    'knot': [float(i) for i in range(24)]},
-
-
-        'circleY': 'circleY',
-        'circleX': 'circleX'
-    },
+# 定义控制器颜色信息
+CTRL_INFO = {
     'color': {
         'm': [17, 25],  # 中间控制器的颜色
         'l': [6, 15],  # 左侧控制器的颜色
@@ -222,6 +63,183 @@ CTRL_INFO = {
 }
 DEFAULT_LOCK_HIDE_ATTRS = ['visibility']
 
+# 子控制器是否与主控制器共享（实例化）形状节点，而不是复制一份曲线
+SHARE_SUB_SHAPES = False
+SUB_CTRL_SCALE = 0.9
+
+# 构建状态保存的节点名称，以及无论指纹是否变化都要重建的阶段
+BUILD_STATE_NODE = 'rigBuild_state'
+FORCE_REBUILD_STAGES = []
+
+# IK/FK 混合方式: 'constraint' 每个关节一个 orientConstraint；
+# 'matrix' 每个关节一组 blendMatrix -> multMatrix -> decomposeMatrix（需要 Maya 2020 及以上）
+# 修改后需将 'ikfk' 加入 FORCE_REBUILD_STAGES
+IKFK_BLEND_MODES = ('constraint', 'matrix')
+IKFK_BLEND_MODE = 'constraint'
+
+try:
+    _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+except NameError:
+    # 在脚本编辑器中直接执行时没有 __file__
+    _SCRIPT_DIR = cmds.internalVar(userScriptDir=True)
+
+
+def _find_data_file(file_name):
+    """在脚本目录中查找数据文件，找不到时依次查找 sys.path（工具界面会将模块目录加入 sys.path）"""
+    for directory in [_SCRIPT_DIR] + [path for path in sys.path if path]:
+        path = os.path.join(directory, file_name)
+        if os.path.exists(path):
+            return path
+    return os.path.join(_SCRIPT_DIR, file_name)
+
+# 预处理后的形状缓冲：points 为只读 numpy 数组，point_list 可直接传给 cmds.curve
+ShapeBuffer = namedtuple('ShapeBuffer', ['degree', 'points', 'point_list', 'knots', 'periodic'])
+
+
+def _make_shape_buffer(degree, points, knots, periodic=False):
+    points = np.array(points, dtype=float).reshape(-1, 3)
+    points.setflags(write=False)
+    return ShapeBuffer(int(degree), points, tuple(map(tuple, points.tolist())),
+                       tuple(float(k) for k in knots), periodic)
+
+
+def _plane_points(angles, axis):
+    """在垂直于 axis 的平面上生成单位圆上的点"""
+    cos, sin = np.cos(angles), np.sin(angles)
+    zeros = np.zeros_like(angles)
+    if axis == 'x':
+        return np.stack([zeros, cos, sin], axis=1)
+    if axis == 'z':
+        return np.stack([cos, sin, zeros], axis=1)
+    return np.stack([cos, zeros, sin], axis=1)
+
+
+@lru_cache(maxsize=64)
+def parametric_shape(kind, args=()):
+    """
+    按参数生成控制器形状（结果缓存）
+
+    Args:
+        kind (str): 'ngon'(多边形) / 'circle'(平滑圆) / 'sphere'(三环球) / 'arrow'(箭头)
+        args (tuple): 形状参数，例如 ('6', 'y')
+
+    Returns:
+        ShapeBuffer: 预处理后的形状缓冲
+    """
+    if kind == 'ngon':
+        sides = int(args[0]) if args else 8
+        axis = args[1] if len(args) > 1 else 'y'
+        points = _plane_points(np.linspace(0, 2 * np.pi, sides + 1), axis)
+        return _make_shape_buffer(1, points, range(sides + 1))
+
+    if kind == 'circle':
+        # 周期三次曲线，节点处恰好位于单位圆上
+        sections = int(args[0]) if args else 8
+        axis = args[1] if len(args) > 1 else 'y'
+        radius = 6.0 / (4.0 + 2.0 * np.cos(2 * np.pi / sections))
+        points = _plane_points(np.arange(sections + 3) * 2 * np.pi / sections, axis) * radius
+        return _make_shape_buffer(3, points, range(-2, sections + 3), periodic=True)
+
+    if kind == 'sphere':
+        # YZ、XY 两环经过 (0, 1, 0) 相接，再沿 XY 环回到 (1, 0, 0) 画 XZ 环
+        sections = max(4, int(args[0]) // 4 * 4) if args else 8
+        full = np.linspace(0, 2 * np.pi, sections + 1)
+        yz = _plane_points(full, 'x')
+        xy = _plane_points(np.pi / 2 - full, 'z')
+        back = _plane_points(np.linspace(np.pi / 2, 0, sections // 4 + 1), 'z')[1:]
+        xz = _plane_points(full, 'y')[1:]
+        points = np.concatenate([yz, xy[1:], back, xz])
+        return _make_shape_buffer(1, points, range(len(points)))
+
+    if kind == 'arrow':
+        length = float(args[0]) if args else 1.0
+        points = [[-0.5, 0, -length], [-0.5, 0, 0], [-1, 0, 0], [0, 0, 1], [1, 0, 0], [0.5, 0, 0],
+                  [0.5, 0, -length], [-0.5, 0, -length]]
+        return _make_shape_buffer(1, points, range(len(points)))
+
+    raise ValueError(f"未知的参数化形状: {kind}")
+
+
+class ControllerShapeLibrary(object):
+    """
+    控制器形状库
+
+    形状源数据保存在 json 中，首次使用时编译为 npz 缓存（源文件更新后自动重新编译），
+    之后按需读取单个形状并缓存处理好的点/节点缓冲。
+    形状名带冒号时按参数生成，例如 'ngon:6'、'circle:16:x'、'sphere:12'、'arrow:2'
+    """
+
+    def __init__(self, source_path, cache_path=None):
+        self.source_path = source_path
+        self.cache_path = cache_path or os.path.splitext(source_path)[0] + '.npz'
+        self._archive = None
+        self._buffers = {}
+
+    def _cache_is_stale(self):
+        if not os.path.exists(self.cache_path):
+            return True
+        return os.path.getmtime(self.cache_path) < os.path.getmtime(self.source_path)
+
+    def compile(self):
+        """将 json 源数据编译为 npz 缓存"""
+        with open(self.source_path, 'r', encoding='utf-8') as f:
+            shapes = json.load(f)
+
+        arrays = {}
+        for name, info in shapes.items():
+            arrays[f'{name}.degree'] = np.array(info['degree'], dtype=np.int32)
+            arrays[f'{name}.point'] = np.array(info['point'], dtype=np.float64)
+            arrays[f'{name}.knot'] = np.array(info['knot'], dtype=np.float64)
+
+        try:
+            np.savez(self.cache_path, **arrays)
+        except OSError:
+            # 脚本目录不可写时改存到用户临时目录
+            self.cache_path = os.path.join(cmds.internalVar(userTmpDir=True), os.path.basename(self.cache_path))
+            np.savez(self.cache_path, **arrays)
+        print(f"已编译控制器形状库: {self.cache_path} ({len(shapes)} 个形状)")
+
+    def _load_archive(self):
+        if self._archive is None:
+            if self._cache_is_stale():
+                self.compile()
+            self._archive = np.load(self.cache_path)
+        return self._archive
+
+    def names(self):
+        """返回形状库中的全部形状名称"""
+        return sorted({key.rsplit('.', 1)[0] for key in self._load_archive().files})
+
+    def __contains__(self, name):
+        return ':' in name or f'{name}.point' in self._load_archive().files
+
+    def get(self, name):
+        """
+        获取形状缓冲
+
+        Args:
+            name (str): 形状名称或参数化形状描述
+
+        Returns:
+            ShapeBuffer: 预处理后的形状缓冲
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None:
+            if ':' in name:
+                kind, *args = name.split(':')
+                buffer = parametric_shape(kind, tuple(args))
+            else:
+                archive = self._load_archive()
+                if f'{name}.point' not in archive.files:
+                    raise KeyError(f"未知的控制器形状: {name}")
+                buffer = _make_shape_buffer(archive[f'{name}.degree'], archive[f'{name}.point'],
+                                            archive[f'{name}.knot'])
+            self._buffers[name] = buffer
+        return buffer
+
+
+SHAPE_LIBRARY = ControllerShapeLibrary(_find_data_file('controller_shapes.json'))
+
 
 # 添加属性函数
 def add_attribute(node, attr, config):
@@ -235,20 +253,24 @@ def add_attribute(node, attr, config):
         print(f"属性 {attr} 已存在，跳过添加。")
 
 
-def create_controller_hierarchy(ctrls):
+def create_controller_hierarchy(ctrls, shared_sub_shape=None):
     """
     为指定的控制器创建层次结构
 
     参数:
         ctrls (str|list): 单个控制器名称或控制器名称列表
+        shared_sub_shape (bool): 子控制器是否共享主控制器的形状节点，None时使用SHARE_SUB_SHAPES
     """
+    if shared_sub_shape is None:
+        shared_sub_shape = SHARE_SUB_SHAPES
+
     # 处理输入参数
     if isinstance(ctrls, str):
         ctrls = [ctrls]  # 转换为列表
 
     for ctrl in ctrls:
         # 验证控制器是否存在
-        if not cmds.objExists(ctrl):
+        if not SCENE_INDEX.exists(ctrl):
             cmds.warning(f"控制器不存在: {ctrl}")
             continue
 
@@ -285,10 +307,14 @@ def create_controller_hierarchy(ctrls):
         cmds.delete(ctrl, constructionHistory=True)
 
         # 创建子控制器
-        sub = cmds.duplicate(ctrl, name=ctrl.replace(name_parts[2], name_parts[2] + 'Sub'))[0]
-        cmds.parent(sub, ctrl)
-        cmds.setAttr(f"{sub}.scale", 0.9, 0.9, 0.9)
-        cmds.makeIdentity(sub, apply=True, scale=True)
+        sub_name = ctrl.replace(name_parts[2], name_parts[2] + 'Sub')
+        if shared_sub_shape:
+            sub = create_shared_sub_controller(ctrl, sub_name)
+        else:
+            sub = cmds.duplicate(ctrl, name=sub_name)[0]
+            cmds.parent(sub, ctrl)
+            cmds.setAttr(f"{sub}.scale", SUB_CTRL_SCALE, SUB_CTRL_SCALE, SUB_CTRL_SCALE)
+            cmds.makeIdentity(sub, apply=True, scale=True)
 
         # 创建输出节点
         output = cmds.createNode('transform', name=ctrl.replace('ctrl_', 'output_'), parent=ctrl)
@@ -313,29 +339,92 @@ def create_controller_hierarchy(ctrls):
                 cmds.setAttr(f"{node}.{attr}", keyable=False, channelBox=False, lock=True)
 
         # 设置颜色 (使用新的颜色配置方式)
-        for node, color_idx in zip([ctrl, sub], [ctrl_color_idx, sub_color_idx]):
-            shapes = cmds.listRelatives(node, shapes=True) or []
-            for shape in shapes:
-                cmds.setAttr(f"{shape}.overrideEnabled", 1)
-                cmds.setAttr(f"{shape}.overrideColor", color_idx)
+        if shared_sub_shape:
+            set_shared_controller_color(ctrl, sub, ctrl_color_idx, sub_color_idx)
+        else:
+            for node, color_idx in zip([ctrl, sub], [ctrl_color_idx, sub_color_idx]):
+                shapes = cmds.listRelatives(node, shapes=True) or []
+                for shape in shapes:
+                    cmds.setAttr(f"{shape}.overrideEnabled", 1)
+                    cmds.setAttr(f"{shape}.overrideColor", color_idx)
+
+def get_shape_points(shape):
+    """
+    一次性读取形状节点的全部控制点（物体空间）
+
+    Args:
+        shape (str): 曲线形状节点
+
+    Returns:
+        numpy.ndarray: (N, 3) 的控制点数组
+    """
+    points = cmds.getAttr(f"{shape}.controlPoints[*]") or []
+    return np.array(points, dtype=float).reshape(-1, 3)
+
+
+def set_shape_points(shape, points):
+    """
+    一次性写回形状节点的全部控制点（物体空间）
+
+    Args:
+        shape (str): 曲线形状节点
+        points (numpy.ndarray): (N, 3) 的控制点数组
+    """
+    if not len(points):
+        return
+    cmds.setAttr(f"{shape}.controlPoints[0:{len(points) - 1}]", *np.asarray(points, dtype=float).ravel().tolist())
+
 
 def scale_controller_shape(ctrl, scale_factor):
     """
     放大控制器的形状点，而不改变其 scale 属性
 
+    每个形状只读写一次 controlPoints，围绕控制器的枢轴整体缩放
+
     Args:
         ctrl (str): 控制器的名称
         scale_factor (float): 放大倍数
     """
-    shapes = cmds.listRelatives(ctrl, shapes=True)
+    shapes = cmds.listRelatives(ctrl, shapes=True, fullPath=True)
     if not shapes:
         print(f"Warning: No shape found for controller {ctrl}.")
         return
 
+    # 与 xform 相对缩放一致，以物体空间的枢轴为中心
+    pivot = np.array(cmds.xform(ctrl, query=True, rotatePivot=True, objectSpace=True), dtype=float)
+    for shape in shapes:
+        points = get_shape_points(shape)
+        set_shape_points(shape, (points - pivot) * scale_factor + pivot)
+
+
+def scale_all_controller_shapes(scale_factor, pattern='ctrl_*'):
+    """
+    一次性缩放场景中所有控制器的形状点（例如按角色身高整体适配）
+
+    Args:
+        scale_factor (float): 放大倍数
+        pattern (str): 控制器名称的匹配规则
+
+    Returns:
+        int: 被缩放的形状数量
+    """
+    ctrls = cmds.ls(pattern, type='transform', long=True) or []
+    shapes = cmds.listRelatives(ctrls, shapes=True, type='nurbsCurve', fullPath=True) if ctrls else []
+    if not shapes:
+        cmds.warning(f"未找到匹配 '{pattern}' 的控制器形状")
+        return 0
+
+    # 按完整路径找到形状所属的控制器，只查询一次各控制器的枢轴
+    pivots = {}
     for shape in shapes:
-        points = cmds.getAttr(f"{shape}.cv[*]")
-        for i in range(len(points)):
-            cmds.xform(f"{shape}.cv[{i}]", relative=True, scale=(scale_factor, scale_factor, scale_factor))
+        ctrl = shape.rsplit('|', 1)[0]
+        if ctrl not in pivots:
+            pivots[ctrl] = np.array(cmds.xform(ctrl, query=True, rotatePivot=True, objectSpace=True), dtype=float)
+        points = get_shape_points(shape)
+        set_shape_points(shape, (points - pivots[ctrl]) * scale_factor + pivots[ctrl])
+
+    print(f"已缩放 {len(shapes)} 个控制器形状 (x{scale_factor})")
+    return len(shapes)
 
 
 def create_curve(ctrl_name, shape):
@@ -349,17 +438,14 @@ def create_curve(ctrl_name, shape):
     Returns:
         str: 创建的曲线节点
     """
-    if shape == 'circleY':
+    if shape in NATIVE_CIRCLE_SHAPES:
         # 使用circle命令创建圆形
-        circle = cmds.circle(name=ctrl_name, normal=(0, 1, 0), radius=1)[0]
-        return circle
-    elif shape == 'circleX':
-        circle = cmds.circle(name=ctrl_name, normal=(1, 0, 0), radius=1)[0]
+        circle = cmds.circle(name=ctrl_name, normal=NATIVE_CIRCLE_SHAPES[shape], radius=1)[0]
         return circle
     else:
-        curve_info = CTRL_INFO['shape'][shape]
-        return cmds.curve(degree=curve_info['degree'], point=curve_info['point'], knot=curve_info['knot'],
-                          name=ctrl_name)
+        shape_buffer = SHAPE_LIBRARY.get(shape)
+        return cmds.curve(degree=shape_buffer.degree, point=shape_buffer.point_list, knot=shape_buffer.knots,
+                          periodic=shape_buffer.periodic, name=ctrl_name)
 
 
 
@@ -381,24 +467,139 @@ def create_hierarchy_nodes(ctrl_name):
     return nodes
 
 
-def setup_sub_controller(ctrl, ctrl_nodes):
+def create_shared_sub_controller(ctrl, sub_name, scale=SUB_CTRL_SCALE):
+    """
+    创建与主控制器共享形状节点的子控制器
+
+    子控制器只是 ctrl 下的一个 transform，形状节点以实例方式挂在其下，
+    通过锁定的 scale 得到缩小的显示效果
+
+    Args:
+        ctrl (str): 主控制器的名称
+        sub_name (str): 子控制器的名称
+        scale (float): 子控制器形状的缩放
+
+    Returns:
+        str: 子控制器的名称
+    """
+    sub_ctrl = cmds.createNode('transform', name=sub_name, parent=ctrl)
+    shapes = cmds.listRelatives(ctrl, shapes=True, fullPath=True) or []
+    if shapes:
+        cmds.parent(*shapes, sub_ctrl, shape=True, add=True)
+    cmds.setAttr(sub_ctrl + '.scale', scale, scale, scale)
+    for attr in ['scaleX', 'scaleY', 'scaleZ']:
+        cmds.setAttr(f'{sub_ctrl}.{attr}', keyable=False, lock=True, channelBox=False)
+    return sub_ctrl
+
+
+def set_transform_color(node, color_idx):
+    """
+    在 transform 上设置颜色覆盖（共享形状的子控制器通过自身 transform 区分颜色）
+
+    Args:
+        node (str): transform 节点
+        color_idx (int): 颜色索引
+    """
+    cmds.setAttr(node + '.overrideEnabled', 1)
+    cmds.setAttr(node + '.overrideColor', color_idx)
+
+
+def set_shared_controller_color(ctrl, sub_ctrl, ctrl_color, sub_ctrl_color):
+    """
+    设置共享形状的主控制器与子控制器的颜色
+
+    形状节点自身启用的颜色覆盖优先于从 transform 继承的覆盖，会让子控制器显示为主控制器的颜色，
+    因此共享的形状节点关闭颜色覆盖，两种颜色分别设置在两个 transform 上
+
+    Args:
+        ctrl (str): 主控制器
+        sub_ctrl (str): 共享形状的子控制器
+        ctrl_color (int): 主控制器颜色索引
+        sub_ctrl_color (int): 子控制器颜色索引
+    """
+    for shape in cmds.listRelatives(ctrl, shapes=True, fullPath=True) or []:
+        cmds.setAttr(shape + '.overrideEnabled', 0)
+    set_transform_color(ctrl, ctrl_color)
+    set_transform_color(sub_ctrl, sub_ctrl_color)
+
+
+# 曲线形状在 .ma 中占用字节数的粗略估算参数（未实际保存文件，仅用于比较数量级）:
+# 每个节点声明约 200 字节，每个控制点约 60 字节，每个节点值约 6 字节
+ESTIMATED_NODE_BYTES = 200
+ESTIMATED_CV_BYTES = 60
+ESTIMATED_KNOT_BYTES = 6
+
+
+def _estimate_curve_ascii_bytes(shape):
+    """粗略估算曲线形状节点在 .ma 文件中占用的字节数（节点声明 + cc 数据），不是实际保存的大小"""
+    cv_count = cmds.getAttr(f'{shape}.controlPoints', size=True)
+    knot_count = cv_count + cmds.getAttr(f'{shape}.degree') - 1
+    return ESTIMATED_NODE_BYTES + cv_count * ESTIMATED_CV_BYTES + knot_count * ESTIMATED_KNOT_BYTES
+
+
+def report_sub_shape_sharing(pattern='ctrl_*Sub*'):
+    """
+    统计场景中子控制器共享形状节省的节点数量，并粗略估算节省的文件体积
+
+    Args:
+        pattern (str): 子控制器名称的匹配规则
+
+    Returns:
+        dict: 子控制器数量、已共享/可共享的形状节点数与粗略估算的 .ma 字节数（按 ESTIMATED_*_BYTES 计算）
+    """
+    report = {'sub_controllers': 0, 'shared_shapes': 0, 'shared_bytes': 0,
+              'copied_shapes': 0, 'copied_bytes': 0}
+    for sub in cmds.ls(pattern, type='transform') or []:
+        report['sub_controllers'] += 1
+        for shape in cmds.listRelatives(sub, shapes=True, fullPath=True) or []:
+            size = _estimate_curve_ascii_bytes(shape)
+            if len(cmds.listRelatives(shape, allParents=True) or []) > 1:
+                report['shared_shapes'] += 1
+                report['shared_bytes'] += size
+            else:
+                report['copied_shapes'] += 1
+                report['copied_bytes'] += size
+
+    print(f"子控制器: {report['sub_controllers']} 个")
+    print(f"共享形状: {report['shared_shapes']} 个, 已节省节点 {report['shared_shapes']} 个, "
+          f"粗略估算约 {report['shared_bytes'] / 1024.0:.1f} KB")
+    print(f"复制形状: {report['copied_shapes']} 个, 改为共享可再节省节点 {report['copied_shapes']} 个, "
+          f"粗略估算约 {report['copied_bytes'] / 1024.0:.1f} KB")
+    print("（文件体积为按控制点数量的粗略估算，实际大小以保存的 .ma 文件为准）")
+    return report
+
+
+def setup_sub_controller(ctrl, ctrl_nodes, shared_shape=None):
     """
     设置子控制器并连接到输出节点
 
     Args:
         ctrl (str): 主控制器的名称
         ctrl_nodes (list): 层级节点列表
+        shared_shape (bool): 是否与主控制器共享形状节点，None时使用SHARE_SUB_SHAPES
     """
-    # 创建子控制器
-    sub_ctrl = cmds.duplicate(ctrl, name=ctrl + 'Sub')[0]
-    cmds.setAttr(sub_ctrl + '.scale', 0.9, 0.9, 0.9)
-    cmds.makeIdentity(sub_ctrl, apply=True, translate=True, rotate=True, scale=True)
+    if shared_shape is None:
+        shared_shape = SHARE_SUB_SHAPES
+
+    if shared_shape:
+        # sub_ctrl 直接创建在 ctrl 下
+        sub_ctrl = create_shared_sub_controller(ctrl, ctrl + 'Sub')
+    else:
+        # 创建子控制器
+        sub_ctrl = cmds.duplicate(ctrl, name=ctrl + 'Sub')[0]
+        cmds.setAttr(sub_ctrl + '.scale', SUB_CTRL_SCALE, SUB_CTRL_SCALE, SUB_CTRL_SCALE)
+        cmds.makeIdentity(sub_ctrl, apply=True, translate=True, rotate=True, scale=True)
 
-    # 调整层级关系
-    # sub_ctrl 是 ctrl 的子物体
-    cmds.parent(sub_ctrl, ctrl)
-    # output 是 sub_ctrl 的子物体
-    cmds.parent(ctrl_nodes[5], sub_ctrl)
+        # 调整层级关系
+        # sub_ctrl 是 ctrl 的子物体
+        cmds.parent(sub_ctrl, ctrl)
+
+    if shared_shape:
+        # 共享形状的子控制器带有缩放，output 直接放在 ctrl 下
+        cmds.parent(ctrl_nodes[5], ctrl)
+    else:
+        # output 是 sub_ctrl 的子物体
+        cmds.parent(ctrl_nodes[5], sub_ctrl)
 
     # 连接属性
     for attr in ['translate', 'rotate', 'rotateOrder']:
@@ -428,7 +629,8 @@ def set_controller_color(ctrl_shape, sub_ctrl_shape=None, side='l'):
 
 
 def create_control(description, side='m', index=1, pos=None, parent=None, lock_hide=None, rotate_order=0,
-                   shape=None, size=1, match_type=None, match_target=None, scale_factor=1.0):
+                   shape=None, size=1, match_type=None, match_target=None, scale_factor=1.0,
+                   shared_sub_shape=None):
     """
     创建控制器
 
@@ -445,10 +647,14 @@ def create_control(description, side='m', index=1, pos=None, parent=None, lock_h
         match_type (str): 匹配类型，'position' 仅匹配位置，'transform' 匹配位置和旋转
         match_target (str): 匹配的目标物体名称
         scale_factor (float): 控制器形状点的放大倍数
+        shared_sub_shape (bool): 子控制器是否共享主控制器的形状节点，None时使用SHARE_SUB_SHAPES
 
     Returns:
         str: 控制器的名称
     """
+    if shared_sub_shape is None:
+        shared_sub_shape = SHARE_SUB_SHAPES
+
     ctrl_name = f'ctrl_{side}_{description}_{index:03d}'
     ctrl = create_curve(ctrl_name, shape)
     ctrl_shape = cmds.listRelatives(ctrl, shapes=True)[0]
@@ -462,7 +668,7 @@ def create_control(description, side='m', index=1, pos=None, parent=None, lock_h
         cmds.parent(ctrl_nodes[i], ctrl_nodes[i - 1])
     cmds.parent(ctrl, ctrl_nodes[4])
 
-    setup_sub_controller(ctrl, ctrl_nodes)
+    setup_sub_controller(ctrl, ctrl_nodes, shared_shape=shared_sub_shape)
 
     if parent:
         cmds.parent(ctrl_nodes[0], parent)
@@ -492,18 +698,214 @@ def create_control(description, side='m', index=1, pos=None, parent=None, lock_h
         cmds.setAttr(f'{ctrl}.{attr}', keyable=False, lock=True, channelBox=False)
         cmds.setAttr(f'{ctrl}Sub.{attr}', keyable=False, lock=True, channelBox=False)
 
-    sub_ctrl_shape = cmds.listRelatives(f'{ctrl}Sub', shapes=True)[0]
-    set_controller_color(ctrl_shape, sub_ctrl_shape, side)
+    if shared_sub_shape:
+        # 共享的形状节点只缩放一次，主/子控制器颜色分别设置在各自的 transform 上
+        set_shared_controller_color(ctrl, f'{ctrl}Sub', *CTRL_INFO['color'][side])
+        if scale_factor != 1.0:
+            scale_controller_shape(ctrl, scale_factor)
+    else:
+        sub_ctrl_shape = cmds.listRelatives(f'{ctrl}Sub', shapes=True)[0]
+        set_controller_color(ctrl_shape, sub_ctrl_shape, side)
 
-    if scale_factor != 1.0:
-        scale_controller_shape(ctrl, scale_factor)
-        scale_controller_shape(f'{ctrl}Sub', scale_factor)
+        if scale_factor != 1.0:
+            scale_controller_shape(ctrl, scale_factor)
+            scale_controller_shape(f'{ctrl}Sub', scale_factor)
 
-    cmds.parent(ctrl_nodes[5], f'{ctrl}')
+        cmds.parent(ctrl_nodes[5], f'{ctrl}')
 
     return ctrl
 
 
+def _create_scaled_curve(name, shape, scale):
+    """
+    直接以最终尺寸创建控制器曲线，省去 setAttr scale + makeIdentity
+
+    Args:
+        name (str): 曲线名称
+        shape (str): 控制器的形状
+        scale (float): 形状点的缩放倍数
+
+    Returns:
+        str: 创建的曲线节点
+    """
+    if shape in NATIVE_CIRCLE_SHAPES:
+        return cmds.circle(name=name, normal=NATIVE_CIRCLE_SHAPES[shape], radius=scale, constructionHistory=False)[0]
+
+    shape_buffer = SHAPE_LIBRARY.get(shape)
+    if scale == 1:
+        points = shape_buffer.point_list
+    else:
+        points = (shape_buffer.points * scale).tolist()
+    return cmds.curve(degree=shape_buffer.degree, point=points, knot=shape_buffer.knots,
+                    periodic=shape_buffer.periodic, name=name)
+
+
+def create_controls(specs):
+    """
+    批量创建控制器，结果与逐个调用 create_control 相同
+
+    - 层级节点通过 createNode 的 parent 参数一次建好，无需逐级 parent
+    - 控制器与子控制器直接以最终尺寸创建，无需 duplicate/冻结/逐点缩放
+    - 形状节点一次性查询
+
+    Args:
+        specs (list): 控制器配置字典列表，键与 create_control 的参数相同
+            (description, side, index, pos, parent, lock_hide, rotate_order,
+            shape, size, match_type, match_target, scale_factor, shared_sub_shape)。
+            parent 可以引用同一批次中更早创建的节点。
+            可选的 matrix 键为 zero 组相对父节点的局部矩阵（16 个数或 4x4），在创建时直接设置；
+            没有 matrix 时 zero 组与 create_control 一样保持世界原点的变换（不继承父节点的位置和旋转）
+
+    Returns:
+        list: 控制器名称列表，顺序与 specs 一致
+    """
+    ctrls = []
+    subs = []
+    shared = [spec.get('shared_sub_shape', SHARE_SUB_SHAPES) for spec in specs]
+
+    # 1. 创建层级节点与曲线
+    for spec, shared_sub_shape in zip(specs, shared):
+        side = spec.get('side', 'm')
+        ctrl_name = f"ctrl_{side}_{spec['description']}_{spec.get('index', 1):03d}"
+        scale = spec.get('size', 1) * spec.get('scale_factor', 1.0)
+
+        parent = spec.get('parent')
+        matrix = spec.get('matrix')
+        for node_type in ['zero', 'driven', 'space', 'connect', 'offset']:
+            node_name = ctrl_name.replace('ctrl', node_type)
+            if parent:
+                parent = cmds.createNode('transform', name=node_name, parent=parent)
+            else:
+                parent = cmds.createNode('transform', name=node_name)
+            if node_type == 'zero' and matrix is not None:
+                # 在创建子节点之前设置局部矩阵，避免对已有的下层节点反复脏传播
+                cmds.xform(parent, matrix=np.asarray(matrix, dtype=np.float64).ravel().tolist(), objectSpace=True)
+
+        ctrl = _create_scaled_curve(ctrl_name, spec['shape'], scale)
+        cmds.parent(ctrl, parent, relative=True)
+        if shared_sub_shape:
+            # 形状节点在命名后再以实例方式挂到子控制器下
+            sub_ctrl = cmds.createNode('transform', name=ctrl_name + 'Sub', parent=ctrl)
+        else:
+            sub_ctrl = _create_scaled_curve(ctrl_name + 'Sub', spec['shape'], scale * SUB_CTRL_SCALE)
+            cmds.parent(sub_ctrl, ctrl, relative=True)
+        cmds.createNode('transform', name=ctrl_name.replace('ctrl', 'output'), parent=ctrl)
+
+        ctrls.append(ctrl)
+        subs.append(sub_ctrl)
+
+    # 2. 一次查询全部形状并统一命名
+    curves = ctrls + [sub_ctrl for sub_ctrl, shared_sub_shape in zip(subs, shared) if not shared_sub_shape]
+    shapes = cmds.listRelatives(curves, shapes=True, fullPath=True) or []
+    shape_names = {}
+    for shape, node in zip(shapes, curves):
+        if shape.rsplit('|', 1)[-1] != node + 'Shape':
+            shape = cmds.rename(shape, node + 'Shape')
+        else:
+            shape = node + 'Shape'
+        shape_names[node] = shape
+
+    # 3. 定位、子控制器连接、属性锁定与颜色
+    for spec, ctrl, sub_ctrl, shared_sub_shape in zip(specs, ctrls, subs, shared):
+        ctrl_shape = shape_names[ctrl]
+        if shared_sub_shape:
+            # 实例化形状，缩放与颜色都放在子控制器的 transform 上
+            cmds.parent(ctrl_shape, sub_ctrl, shape=True, add=True)
+            cmds.setAttr(sub_ctrl + '.scale', SUB_CTRL_SCALE, SUB_CTRL_SCALE, SUB_CTRL_SCALE)
+            for attr in ['scaleX', 'scaleY', 'scaleZ']:
+                cmds.setAttr(f'{sub_ctrl}.{attr}', keyable=False, lock=True, channelBox=False)
+        zero = ctrl.replace('ctrl', 'zero')
+        output = ctrl.replace('ctrl', 'output')
+
+        if spec.get('parent') and spec.get('matrix') is None:
+            # 与 create_control 相同: zero 在世界原点创建后 parent 到父节点（保持世界变换），局部矩阵为父节点世界矩阵的逆。
+            # 按 specs 顺序在定位阶段设置，父节点为同一批次中更早的节点时此时已定位
+            parent_inverse = np.linalg.inv(get_world_matrices([zero], parent=True)[0])
+            cmds.xform(zero, matrix=parent_inverse.ravel().tolist(), objectSpace=True)
+
+        pos = spec.get('pos')
+        if pos:
+            if isinstance(pos, str):
+                cmds.matchTransform(zero, pos, position=True, rotation=True)
+            else:
+                if len(pos) >= 1:
+                    cmds.xform(zero, translation=pos[0], worldSpace=True)
+                if len(pos) >= 2:
+                    cmds.xform(zero, rotation=pos[1], worldSpace=True)
+
+        match_type = spec.get('match_type')
+        match_target = spec.get('match_target')
+        if match_target and match_type:
+            if match_type == 'position':
+                cmds.matchTransform(zero, match_target, position=True, rotation=False)
+            elif match_type == 'transform':
+                cmds.matchTransform(zero, match_target, position=True, rotation=True)
+            else:
+                print("Warning: Invalid match_type. Use 'position' or 'transform'.")
+
+        for attr in ['translate', 'rotate', 'rotateOrder']:
+            cmds.connectAttr(f'{sub_ctrl}.{attr}', f'{output}.{attr}')
+        cmds.addAttr(ctrl, longName='subCtrlVis', attributeType='bool', keyable=False)
+        cmds.setAttr(ctrl + '.subCtrlVis', channelBox=True)
+        cmds.connectAttr(ctrl + '.subCtrlVis', sub_ctrl + '.visibility')
+
+        rotate_order = spec.get('rotate_order', 0)
+        cmds.setAttr(ctrl + '.rotateOrder', rotate_order, channelBox=True)
+        cmds.setAttr(sub_ctrl + '.rotateOrder', rotate_order, channelBox=True)
+
+        for attr in DEFAULT_LOCK_HIDE_ATTRS + (spec.get('lock_hide') or []):
+            cmds.setAttr(f'{ctrl}.{attr}', keyable=False, lock=True, channelBox=False)
+            cmds.setAttr(f'{sub_ctrl}.{attr}', keyable=False, lock=True, channelBox=False)
+
+        ctrl_color, sub_ctrl_color = CTRL_INFO['color'][spec.get('side', 'm')]
+        if shared_sub_shape:
+            set_shared_controller_color(ctrl, sub_ctrl, ctrl_color, sub_ctrl_color)
+        else:
+            cmds.setAttr(ctrl_shape + '.overrideEnabled', 1)
+            cmds.setAttr(ctrl_shape + '.overrideColor', ctrl_color)
+            sub_shape = shape_names[sub_ctrl]
+            cmds.setAttr(sub_shape + '.overrideEnabled', 1)
+            cmds.setAttr(sub_shape + '.overrideColor', sub_ctrl_color)
+
+    return ctrls
+
+
+def compare_control_creation(count=50, shape='square'):
+    """
+    用 CmdsProfiler 实测逐个 create_control 与批量 create_controls 创建相同控制器的 cmds 调用次数与耗时
+
+    两种方式各创建 count 个测试控制器，测完即删除。
+
+    Args:
+        count (int): 控制器数量
+        shape (str): 控制器形状
+
+    Returns:
+        dict: {'create_control': (调用次数, 秒), 'create_controls': (调用次数, 秒)}
+    """
+    results = {}
+    for label in ('create_control', 'create_controls'):
+        specs = [{'description': f'{label.replace("_", "")}Bench', 'index': i + 1, 'shape': shape,
+                  'pos': [(i * 2.0, 0, 0), (0, 0, 0)]} for i in range(count)]
+        before = set(cmds.ls(uuid=True) or [])
+        with CmdsProfiler() as profiler:
+            if label == 'create_control':
+                for spec in specs:
+                    create_control(**spec)
+            else:
+                create_controls(specs)
+        data = profiler.to_dict()
+        results[label] = (data['total_calls'], data['total_time'])
+        created = cmds.ls(list(set(cmds.ls(uuid=True) or []) - before), long=True) or []
+        zeros = [node for node in created if node.rsplit('|', 1)[-1].startswith('zero_')]
+        if zeros:
+            cmds.delete(zeros)
+
+    for label, (calls, seconds) in results.items():
+        print(f"{label:<18}{calls:>8} 次 cmds 调用{seconds * 1000:>10.1f} ms")
+    return results
+
+
 def create_spine_ik(joint_list, curve_name_input, ik_handle_name_input, start_joint_input, end_joint_input,
                     new_joint_1_name_input, new_joint_2_name_input):
     """
@@ -565,7 +967,61 @@ def create_spine_ik(joint_list, curve_name_input, ik_handle_name_input, start_jo
 
 
 def duplicate_joint_chain(original_joints, suffix):
-    """复制关节链并添加指定后缀"""
+    """
+    复制关节链并添加指定后缀
+
+    整条链只复制一次根关节，删除不属于链的分支（手指、约束等），
+    再从最深的关节开始按后缀规则重命名，最后一次性重置旋转值。
+    关节不是逐级父子关系时退回逐个复制的方式。
+
+    Args:
+        original_joints (list): 按层级顺序排列的关节
+        suffix (str): 后缀，例如 'Fk'，jnt_l_elbow_001 -> jnt_l_elbowFk_001
+
+    Returns:
+        list: 新关节链名称，顺序与 original_joints 一致
+    """
+    if not original_joints:
+        return []
+
+    long_names = cmds.ls(original_joints, long=True) or []
+    is_direct_chain = len(long_names) == len(original_joints) and all(
+        child.rsplit('|', 1)[0] == parent for parent, child in zip(long_names, long_names[1:]))
+    if not is_direct_chain:
+        return _duplicate_joint_chain_legacy(original_joints, suffix)
+
+    new_names = [jnt.replace("_001", f"{suffix}_001") for jnt in original_joints]
+
+    # 复制整条层级并放到世界下（相当于shift+p）
+    new_root = cmds.duplicate(original_joints[0], name=new_names[0])[0]
+    if cmds.listRelatives(new_root, parent=True):
+        new_root = cmds.parent(new_root, world=True)[0]
+
+    # 复制结果中的链路径：子关节沿用原名称，位于新根关节下
+    chain_paths = [f'|{new_root}']
+    for long_name in long_names[1:]:
+        chain_paths.append(f"{chain_paths[-1]}|{long_name.rsplit('|', 1)[-1]}")
+
+    # 删除不属于链的分支
+    chain_set = set(chain_paths)
+    extra = [path for path in cmds.listRelatives(new_root, allDescendents=True, fullPath=True) or []
+             if path not in chain_set and path.rsplit('|', 1)[0] in chain_set]
+    if extra:
+        cmds.delete(extra)
+
+    # 从最深的关节开始重命名，保证上层路径在重命名过程中仍然有效
+    new_chain = [new_root] + [None] * (len(chain_paths) - 1)
+    for i in range(len(chain_paths) - 1, 0, -1):
+        new_chain[i] = cmds.rename(chain_paths[i], new_names[i])
+
+    # 一次性重置旋转值
+    cmds.xform(new_chain, rotation=(0, 0, 0))
+
+    return new_chain
+
+
+def _duplicate_joint_chain_legacy(original_joints, suffix):
+    """逐个复制关节再重建父子关系（用于不是逐级父子关系的关节列表）"""
     new_chain = []
 
     # 先复制所有关节（不保持父子关系）
@@ -589,65 +1045,109 @@ def duplicate_joint_chain(original_joints, suffix):
     return new_chain
 
 
+def benchmark_duplicate_joint_chain(chain_length=100, branch_every=10, repeat=3):
+    """
+    对比逐个复制与整链复制的耗时
+
+    在场景中创建一条测试关节链（每隔 branch_every 个关节带一个分支），
+    分别用两种方式复制 repeat 次，输出平均耗时，最后删除测试节点。
+
+    Args:
+        chain_length (int): 测试链长度
+        branch_every (int): 分支间隔
+        repeat (int): 重复次数
+
+    Returns:
+        dict: {'legacy': 秒, 'single_pass': 秒}
+    """
+    cmds.select(clear=True)
+    chain = []
+    for i in range(chain_length):
+        chain.append(cmds.joint(name=f'jnt_m_benchChain{i}_001', position=(0, i * 2.0, 0)))
+        if branch_every and i % branch_every == 0:
+            cmds.joint(name=f'jnt_m_benchBranch{i}_001', position=(2.0, i * 2.0, 0))
+            cmds.select(chain[-1])
+    cmds.select(clear=True)
+
+    results = {}
+    for label, func in [('legacy', _duplicate_joint_chain_legacy), ('single_pass', duplicate_joint_chain)]:
+        elapsed = 0.0
+        for i in range(repeat):
+            start = time.perf_counter()
+            new_chain = func(chain, f'Bench{label.title().replace("_", "")}{i}')
+            elapsed += time.perf_counter() - start
+            cmds.delete(new_chain[0])
+        results[label] = elapsed / repeat
+        print(f"{label}: {results[label] * 1000:.1f} ms / 次 ({chain_length} 个关节)")
+
+    cmds.delete(chain[0])
+    print(f"整链复制提速 {results['legacy'] / max(results['single_pass'], 1e-9):.1f} 倍")
+    return results
+
+
 def create_fk_chain(joint_chain, ctrl_shape='square', ctrl_size=1.0):
     """
     为关节链创建FK控制器系统
 
+    一次读取全部关节的世界矩阵，用 NumPy 计算每个 zero 组相对上一级 output 的局部矩阵，
+    控制器层级在一次批量创建中逐级建好并直接定位，耗时随关节数量线性增长。
+
     参数:
         joint_chain (list): 关节名称列表，按层级顺序排列
         ctrl_shape (str): 控制器形状，默认为'square'
         ctrl_size (float): 控制器大小，默认为1.0
+
+    返回:
+        list: 创建的控制器名称列表
     """
     if not joint_chain:
         cmds.warning("警告：未提供有效的关节链")
-        return
-
-    # 存储所有创建的控制器
-    created_ctrls = []
+        return []
 
+    # 从关节名称提取side和description
+    chain_joints = []
+    names = []
     for i, joint in enumerate(joint_chain):
-        # 从关节名称提取description和side
         parts = joint.split('_')
         if len(parts) < 3:
             cmds.warning(f"警告：关节名称格式不正确 {joint}")
             continue
-
-        side = parts[1]  # 获取侧边标识 (l/r/m)
-        description = parts[2] # 构建description
-
-        # 创建FK控制器
-        ctrl = create_control(
-            description=description,
-            side=side,
-            index=i + 1,  # 从1开始编号
-            shape=ctrl_shape,
-            size=ctrl_size,
-            match_type='transform',  # 匹配位置和旋转
-            match_target=joint  # 匹配到当前关节
-        )
-
-        # 获取控制器的output节点（约束用）
-        output_node = ctrl.replace('ctrl', 'output')
-
-        # 对关节进行父子约束
-        cmds.orientConstraint(output_node, joint, maintainOffset=False)
-
-        # 如果是第一个控制器，只记录不处理层级
-        if i == 0:
-            created_ctrls.append(ctrl)
-            continue
-
-        # 从第二个控制器开始，处理层级关系
-        prev_output = created_ctrls[-1].replace('ctrl', 'output')
-        current_zero = ctrl.replace('ctrl', 'zero')
-
-        # 将当前控制器的zero组放到上一个控制器的output组下
-        cmds.parent(current_zero, prev_output)
-
-        created_ctrls.append(ctrl)
+        chain_joints.append(joint)
+        names.append((parts[1], parts[2], i + 1))  # (侧边标识 l/r/m, description, 从1开始的编号)
+
+    if not chain_joints:
+        return []
+
+    # 一次读取世界矩阵，去掉缩放后计算链式局部矩阵（zero 组只匹配位置与旋转）
+    world_matrices = remove_scale(get_world_matrices(chain_joints))
+    local_matrices = chain_local_matrices(world_matrices)
+
+    # 每个控制器的zero组直接建在上一个控制器的output组下
+    specs = []
+    prev_output = None
+    for (side, description, index), matrix in zip(names, local_matrices):
+        specs.append({
+            'description': description,
+            'side': side,
+            'index': index,
+            'shape': ctrl_shape,
+            'size': ctrl_size,
+            'parent': prev_output,
+            'matrix': matrix,
+        })
+        prev_output = f'output_{side}_{description}_{index:03d}'
+
+    # 批量创建FK控制器
+    created_ctrls = create_controls(specs)
+
+    # 对关节进行旋转约束
+    for ctrl, joint in zip(created_ctrls, chain_joints):
+        cmds.orientConstraint(ctrl.replace('ctrl', 'output'), joint, maintainOffset=False)
 
     cmds.select(clear=True)
     print(f"FK绑定完成，共创建 {len(created_ctrls)} 个控制器")
+    return created_ctrls
+
 
 def create_ik_with_pole_vector(
         start_joint,
@@ -656,7 +1156,8 @@ def create_ik_with_pole_vector(
         axis="-z",
         pole_loc_name="loc_ikGuide",
         ik_handle_name="ctrl_ikHandle",
-        pole_distance=None
+        pole_distance=None,
+        pole_position=None
 ):
     """创建带有极向量约束的IK系统
 
@@ -668,10 +1169,14 @@ def create_ik_with_pole_vector(
         pole_loc_name (str): 极向量定位器名称
         ik_handle_name (str): IK手柄名称
         pole_distance (float): 极向量延伸距离（None时自动计算）
+        pole_position (list): 预先计算好的极向量世界位置（例如来自 compute_pole_positions），
+            传入时忽略 axis 和 pole_distance
 
     返回:
         tuple: (极向量定位器名称, IK手柄名称)
     """
+    if pole_position is not None:
+        return _create_pole_ik(start_joint, end_joint, pole_position, pole_loc_name, ik_handle_name)
 
     # 解析轴向参数
     axis_direction = 1
@@ -721,9 +1226,14 @@ def create_ik_with_pole_vector(
         mid_pos[2] + normalized[2] * pole_distance
     ]
 
+    return _create_pole_ik(start_joint, end_joint, pole_position, pole_loc_name, ik_handle_name)
+
+
+def _create_pole_ik(start_joint, end_joint, pole_position, pole_loc_name, ik_handle_name):
+    """在 pole_position 处创建极向量定位器并创建RP IK手柄"""
     # 创建定位器
     pole_loc = cmds.spaceLocator(name=pole_loc_name)[0]
-    cmds.xform(pole_loc, t=pole_position, ws=True)
+    cmds.xform(pole_loc, t=list(pole_position), ws=True)
 
     # 创建IK手柄
     ik_handle, _ = cmds.ikHandle(
@@ -735,6 +1245,55 @@ def create_ik_with_pole_vector(
     )
     return pole_loc, ik_handle
 
+
+def _parse_pole_axis(axis):
+    """解析"-z"/"+y"形式的轴向，返回 (世界矩阵行号, 方向)"""
+    direction = -1 if axis.startswith("-") else 1
+    axis = axis.lstrip("+-").lower()
+    if axis not in ("x", "y", "z"):
+        raise ValueError("无效轴向，请输入x/y/z")
+    return "xyz".index(axis), direction
+
+
+def compute_pole_positions(triplets, axes=None, pole_distance=None):
+    """批量计算多条肢体的极向量位置
+
+    一次读取所有关节的世界矩阵，在肢体平面内沿中间关节的弯曲方向放置极向量；
+    肢体完全伸直时退回到中间关节的 axes 轴向（与 create_ik_with_pole_vector 的旧行为相同）。
+
+    参数:
+        triplets (list): [(起始关节, 中间关节, 结束关节), ...]
+        axes (list): 每条肢体伸直时使用的中间关节轴向（如"-z"），None 时取与肢体垂直的任意方向
+        pole_distance (float): 极向量延伸距离（None时使用起始关节到中间关节的距离）
+
+    返回:
+        list: 每条肢体的极向量世界位置 [x, y, z]
+    """
+    triplets = [tuple(triplet) for triplet in triplets]
+    if not triplets:
+        return []
+    if any(len(triplet) != 3 for triplet in triplets):
+        raise ValueError("每条肢体需要提供 (起始关节, 中间关节, 结束关节)")
+    if axes is not None and len(axes) != len(triplets):
+        raise ValueError("axes 数量必须与肢体数量一致")
+
+    matrices = get_world_matrices([jnt for triplet in triplets for jnt in triplet]).reshape(-1, 3, 4, 4)
+    positions = matrices[:, :, 3, :3]
+
+    fallback = None
+    if axes is not None:
+        parsed = [_parse_pole_axis(axis) for axis in axes]
+        rows = np.array([row for row, _ in parsed])
+        signs = np.array([direction for _, direction in parsed], dtype=np.float64)
+        fallback = matrices[np.arange(len(triplets)), 1, rows, :3] * signs[:, None]
+
+    poles, straight = solve_pole_positions(positions[:, 0], positions[:, 1], positions[:, 2],
+                                           distance=pole_distance, fallback_directions=fallback)
+    for triplet, is_straight in zip(triplets, straight):
+        if is_straight:
+            print(f"肢体 {triplet[0]} -> {triplet[2]} 处于伸直状态，极向量使用备用方向")
+    return poles.tolist()
+
 def create_connection_line(source, target, site, side="l"):
     # 创建两个定位器，使用side参数
     locator1 = cmds.spaceLocator(name=f"loc_{side}_{site}IkGuide_001")[0]
@@ -780,7 +1339,8 @@ def create_hand_ik_system(
         pole_loc_name="elbowIkGuide",
         ik_handle_name="armIk",
         hand_ctrl_name="handIk",
-        pole_distance=None
+        pole_distance=None,
+        pole_position=None
 ):
     """创建完整的手部IK系统，包括极向量IK和手部IK
 
@@ -795,6 +1355,7 @@ def create_hand_ik_system(
         ik_handle_name (str): IK手柄基础名称
         hand_ctrl_name (str): 手部控制器基础名称
         pole_distance (float): 极向量延伸距离(None为自动计算)
+        pole_position (list): 预先计算好的极向量世界位置(None时按axis计算)
 
     返回:
         dict: 包含所有创建元素的字典
@@ -813,7 +1374,8 @@ def create_hand_ik_system(
         axis=axis,
         pole_loc_name=pole_loc_name,
         ik_handle_name=ik_handle_name,
-        pole_distance=pole_distance
+        pole_distance=pole_distance,
+        pole_position=pole_position
     )
 
     # 2. 创建肘部控制器
@@ -901,7 +1463,8 @@ def create_leg_ik_system(
         pole_loc_name="kneeIkGuide",
         ik_handle_name="legIk",
         hand_ctrl_name="ankleIk",
-        pole_distance=None
+        pole_distance=None,
+        pole_position=None
 ):
     """创建完整的腿部IK系统，包括极向量IK和腿部IK
 
@@ -917,6 +1480,7 @@ def create_leg_ik_system(
         ik_handle_name (str): IK手柄基础名称
         hand_ctrl_name (str): 手部控制器基础名称
         pole_distance (float): 极向量延伸距离(None为自动计算)
+        pole_position (list): 预先计算好的极向量世界位置(None时按axis计算)
 
     返回:
         dict: 包含所有创建元素的字典
@@ -935,7 +1499,8 @@ def create_leg_ik_system(
         axis=axis,
         pole_loc_name=pole_loc_name,
         ik_handle_name=ik_handle_name,
-        pole_distance=pole_distance
+        pole_distance=pole_distance,
+        pole_position=pole_position
     )
 
     # 2. 创建膝盖控制器
@@ -1026,14 +1591,129 @@ def create_leg_ik_system(
         'pole_locator': pole_loc
     }
 
-def setup_ik_fk_switch(side='l'):
+def _create_limb_ik_systems(create_func, specs, pole_distance=None):
+    """批量计算极向量后逐侧创建IK系统，specs 为 create_func 的参数字典列表"""
+    specs = [dict(spec) for spec in specs]
+    triplets = [(spec['start_joint'], spec['mid_joint'], spec['end_joint']) for spec in specs]
+    axes = [spec.get('axis', '-z') for spec in specs]
+    poles = compute_pole_positions(triplets, axes=axes, pole_distance=pole_distance)
+    results = []
+    for spec, pole in zip(specs, poles):
+        spec['pole_position'] = pole
+        results.append(create_func(**spec))
+    return results
+
+
+def create_hand_ik_systems(specs, pole_distance=None):
+    """一次创建多侧手部IK系统，极向量位置由 compute_pole_positions 一次性批量计算
+
+    参数:
+        specs (list): create_hand_ik_system 的参数字典列表，axis 仅作为手臂伸直时的备用方向
+        pole_distance (float): 极向量延伸距离(None为自动计算)
+
+    返回:
+        list: 每侧 create_hand_ik_system 的返回值
+    """
+    return _create_limb_ik_systems(create_hand_ik_system, specs, pole_distance)
+
+
+def create_leg_ik_systems(specs, pole_distance=None):
+    """一次创建多侧腿部IK系统，极向量位置由 compute_pole_positions 一次性批量计算
+
+    参数:
+        specs (list): create_leg_ik_system 的参数字典列表，axis 仅作为腿伸直时的备用方向
+        pole_distance (float): 极向量延伸距离(None为自动计算)
+
+    返回:
+        list: 每侧 create_leg_ik_system 的返回值
+    """
+    return _create_limb_ik_systems(create_leg_ik_system, specs, pole_distance)
+
+
+def _inverse_rotation_matrix(angles):
+    """返回 xyz 欧拉角（角度制）对应旋转的逆矩阵，展开为 setAttr 可用的 16 个数"""
+    matrix = np.identity(4)
+    matrix[:3, :3] = euler_xyz_to_matrix(angles).T
+    return matrix.flatten().tolist()
+
+
+def _connect_ikfk_matrix_blend(jnt, jnt_ik, jnt_fk, blend_attr):
+    """
+    用矩阵节点混合 IK/FK 关节的世界旋转，驱动 jnt.rotate
+
+    blendMatrix 在 IK (权重0) 与 FK (权重1) 的世界矩阵之间插值，
+    multMatrix 转换到 jnt 的父空间并去除 rotateAxis 与 jointOrient，decomposeMatrix 输出旋转。
+
+    返回:
+        list: 创建的节点
+    """
+    blend = cmds.createNode('blendMatrix', name=f"bmx_{jnt}_ikfk")
+    cmds.connectAttr(f"{jnt_ik}.worldMatrix[0]", f"{blend}.inputMatrix")
+    cmds.connectAttr(f"{jnt_fk}.worldMatrix[0]", f"{blend}.target[0].targetMatrix")
+    cmds.connectAttr(blend_attr, f"{blend}.target[0].weight")
+
+    # 关节局部旋转 = rotateAxis * rotate * jointOrient，求 rotate 需要左乘 rotateAxis 的逆、右乘 jointOrient 的逆
+    mult = cmds.createNode('multMatrix', name=f"mmx_{jnt}_ikfk")
+    index = 0
+    rotate_axis = cmds.getAttr(f"{jnt}.rotateAxis")[0]
+    if any(abs(v) > 1e-6 for v in rotate_axis):
+        cmds.setAttr(f"{mult}.matrixIn[0]", _inverse_rotation_matrix(rotate_axis), type='matrix')
+        index = 1
+    cmds.connectAttr(f"{blend}.outputMatrix", f"{mult}.matrixIn[{index}]")
+    cmds.connectAttr(f"{jnt}.parentInverseMatrix[0]", f"{mult}.matrixIn[{index + 1}]")
+    cmds.setAttr(f"{mult}.matrixIn[{index + 2}]",
+                 _inverse_rotation_matrix(cmds.getAttr(f"{jnt}.jointOrient")[0]), type='matrix')
+
+    decompose = cmds.createNode('decomposeMatrix', name=f"dcm_{jnt}_ikfk")
+    cmds.connectAttr(f"{mult}.matrixSum", f"{decompose}.inputMatrix")
+    cmds.connectAttr(f"{jnt}.rotateOrder", f"{decompose}.inputRotateOrder")
+    cmds.connectAttr(f"{decompose}.outputRotate", f"{jnt}.rotate", force=True)
+    return [blend, mult, decompose]
+
+
+def connect_ikfk_blend(jnt, jnt_ik, jnt_fk, blend_attr, reverse_attr, mode=None):
+    """
+    让 jnt 的旋转在 jnt_ik (blend_attr=0) 与 jnt_fk (blend_attr=1) 之间混合
+
+    参数:
+        jnt (str): 被驱动的关节
+        jnt_ik (str): IK关节
+        jnt_fk (str): FK关节
+        blend_attr (str): 混合属性，例如 'ctrl_l_armIkFkBlend_001.ikFkBlend'
+        reverse_attr (str): 1 - blend_attr 的输出属性（约束模式下驱动IK权重）
+        mode (str): 'constraint' 或 'matrix'，None 时使用 IKFK_BLEND_MODE
+
+    返回:
+        list: 创建的节点
+    """
+    mode = mode or IKFK_BLEND_MODE
+    if mode not in IKFK_BLEND_MODES:
+        raise ValueError(f"无效的IK/FK混合方式 '{mode}'，请使用: {', '.join(IKFK_BLEND_MODES)}")
+    if mode == 'matrix':
+        return _connect_ikfk_matrix_blend(jnt, jnt_ik, jnt_fk, blend_attr)
+
+    # 创建旋转约束
+    constraint = cmds.orientConstraint(jnt_ik, jnt_fk, jnt, maintainOffset=False, name=f"oc_{jnt}_ikfk")[0]
+    cmds.setAttr(f"{constraint}.interpType", 2)  # 设置为最短路径插值
+
+    # 连接权重
+    cmds.connectAttr(blend_attr, f"{constraint}.{jnt_fk}W1")
+    cmds.connectAttr(reverse_attr, f"{constraint}.{jnt_ik}W0")
+    return [constraint]
+
+
+def setup_ik_fk_switch(side='l', mode=None):
     """
     设置IK/FK切换系统
     :param side: 身体侧边 ('l' 或 'r')
+    :param mode: 混合方式 ('constraint' 或 'matrix')，None 时使用 IKFK_BLEND_MODE
     """
     # 验证输入参数
     if side not in ['l', 'r']:
         raise ValueError("side参数必须是'l'或'r'")
+    mode = mode or IKFK_BLEND_MODE
+    if mode not in IKFK_BLEND_MODES:
+        raise ValueError(f"无效的IK/FK混合方式 '{mode}'，请使用: {', '.join(IKFK_BLEND_MODES)}")
 
     # 定义关节链结构
     base_chains = {
@@ -1077,7 +1757,7 @@ def setup_ik_fk_switch(side='l'):
         ctrl_name = f"ctrl_{side}_{chain_type}IkFkBlend_001"
 
         # 检查控制器是否存在
-        if not cmds.objExists(ctrl_name):
+        if not SCENE_INDEX.exists(ctrl_name):
             cmds.warning(f"控制器 {ctrl_name} 不存在，跳过 {chain_type} 链设置")
             continue
 
@@ -1087,18 +1767,18 @@ def setup_ik_fk_switch(side='l'):
 
         # 设置可见性控制
         # FK可见性
-        if cmds.objExists(visibility_controls[chain_type]["fk"]):
+        if SCENE_INDEX.exists(visibility_controls[chain_type]["fk"]):
             cmds.connectAttr(f"{ctrl_name}.ikFkBlend", visibility_controls[chain_type]["fk"])
 
         # IK可见性
         for ik_vis in visibility_controls[chain_type]["ik"]:
-            if cmds.objExists(ik_vis):
+            if SCENE_INDEX.exists(ik_vis):
                 cmds.connectAttr(f"{rev_node}.outputX", ik_vis)
 
         # 设置关节约束
         for jnt in joints:
             # 检查基础关节是否存在
-            if not cmds.objExists(jnt):
+            if not SCENE_INDEX.exists(jnt):
                 cmds.warning(f"基础关节 {jnt} 不存在，跳过")
                 continue
 
@@ -1107,60 +1787,227 @@ def setup_ik_fk_switch(side='l'):
             jnt_fk = jnt.replace("_001", "Fk_001")
 
             # 检查IK/FK关节是否存在
-            if not cmds.objExists(jnt_ik) or not cmds.objExists(jnt_fk):
+            if not SCENE_INDEX.exists(jnt_ik) or not SCENE_INDEX.exists(jnt_fk):
                 cmds.warning(f"IK/FK关节 {jnt_ik} 或 {jnt_fk} 不存在，跳过")
                 continue
 
-            # 创建旋转约束
-            constraint = cmds.orientConstraint(jnt_ik, jnt_fk, jnt, maintainOffset=False, name=f"oc_{jnt}_ikfk")[0]
-            cmds.setAttr(f"{constraint}.interpType", 2)  # 设置为最短路径插值
+            # 混合IK/FK旋转
+            connect_ikfk_blend(jnt, jnt_ik, jnt_fk, f"{ctrl_name}.ikFkBlend", f"{rev_node}.outputX", mode=mode)
 
-            # 连接权重
-            cmds.connectAttr(f"{ctrl_name}.ikFkBlend", f"{constraint}.{jnt_fk}W1")
-            cmds.connectAttr(f"{rev_node}.outputX", f"{constraint}.{jnt_ik}W0")
 
-def orient_joint_chain(root_joint, orient_order="xyz", secondary_axis_orient="yup"):
+def _build_ikfk_test_rig(name, chain_length, modes, frames=100, seed=0, animate_blend=True):
     """
-    定向整个关节链，从根关节到末端关节
+    创建 IK/FK 混合测试绑定
 
-    参数:
-        root_joint: 关节链的根关节名称
-        orient_order: 轴向顺序 (如 "xyz", "yzx"等)，默认为"xyz"
-        secondary_axis_orient: 次轴方向 ("yup", "ydown", "zup", "zdown")，默认为"yup"
+    一组带随机旋转动画的 IK/FK 链，以及每种混合方式各一条被驱动链（放在旋转过的组下，以覆盖父空间转换）。
+
+    返回:
+        dict: {'nodes': 需要删除的顶层节点, 'blend_attr': 混合属性, 'chains': {混合方式: 被驱动关节链}}
+    """
+    rng = np.random.default_rng(seed)
+    bind_root = _build_test_chain(name, chain_length, seed)
+    orient_joint_chain(bind_root)
+    bind = get_joint_chain(bind_root)
+    ik = duplicate_joint_chain(bind, 'Ik')
+    fk = duplicate_joint_chain(bind, 'Fk')
+
+    for jnt in ik + fk:
+        for frame in (1, frames // 2, frames):
+            for axis in 'XYZ':
+                cmds.setKeyframe(jnt, attribute=f'rotate{axis}', time=frame, value=float(rng.uniform(-60, 60)))
+
+    ctrl = cmds.createNode('transform', name=f'{name}_blend')
+    cmds.addAttr(ctrl, longName='ikFkBlend', attributeType='float', minValue=0, maxValue=1, keyable=True)
+    blend_attr = f'{ctrl}.ikFkBlend'
+    if animate_blend:
+        cmds.setKeyframe(ctrl, attribute='ikFkBlend', time=1, value=0)
+        cmds.setKeyframe(ctrl, attribute='ikFkBlend', time=frames, value=1)
+    reverse = cmds.createNode('reverse', name=f'rvs_{name}_ikfk')
+    cmds.connectAttr(blend_attr, f'{reverse}.inputX')
+
+    offset = cmds.group(empty=True, name=f'{name}_offset')
+    cmds.xform(offset, rotation=[float(v) for v in rng.uniform(-45, 45, 3)])
+    chains = {}
+    for mode in modes:
+        chain = duplicate_joint_chain(bind, mode.capitalize())
+        chain = [cmds.parent(chain[0], offset)[0]] + chain[1:]
+        for jnt, jnt_ik, jnt_fk in zip(chain, ik, fk):
+            connect_ikfk_blend(jnt, jnt_ik, jnt_fk, blend_attr, f'{reverse}.outputX', mode=mode)
+        chains[mode] = chain
+
+    return {'nodes': [bind[0], ik[0], fk[0], ctrl, reverse, offset], 'blend_attr': blend_attr, 'chains': chains}
+
+
+def verify_ikfk_blend(chain_length=8, blend_values=(0.0, 0.25, 0.5, 0.75, 1.0), frames=(1, 30, 70), tolerance=1e-3):
+    """
+    校验矩阵混合与 orientConstraint 混合的结果是否一致
+
+    同一组 IK/FK 链分别驱动两条关节链，在多个帧和混合值下比较两条链的世界矩阵，最后删除测试绑定。
+
+    Returns:
+        float: 世界矩阵的最大差值
+    """
+    rig = _build_ikfk_test_rig('ikfkCheck', chain_length, IKFK_BLEND_MODES, frames=max(frames),
+                               animate_blend=False)
+    original_time = cmds.currentTime(query=True)
+    max_error = 0.0
+    try:
+        for frame in frames:
+            cmds.currentTime(frame, update=True)
+            for value in blend_values:
+                cmds.setAttr(rig['blend_attr'], value)
+                constraint = get_world_matrices(rig['chains']['constraint'])
+                matrix = get_world_matrices(rig['chains']['matrix'])
+                error = float(np.max(np.abs(constraint - matrix)))
+                max_error = max(max_error, error)
+                if error > tolerance:
+                    cmds.warning(f"第 {frame} 帧 ikFkBlend={value} 时两种混合方式相差 {error:.6f}")
+    finally:
+        cmds.currentTime(original_time, update=True)
+        cmds.delete(rig['nodes'])
+
+    print(f"IK/FK 混合校验: 最大差值 {max_error:.2e} ({'通过' if max_error <= tolerance else '未通过'})")
+    return max_error
+
+
+def benchmark_ikfk_blend(chain_length=10, chain_count=10, frames=100, repeat=3):
+    """
+    对比 orientConstraint 混合与矩阵混合的逐帧求值耗时
+
+    每种方式分别创建 chain_count 组带动画的测试绑定（ikFkBlend 从 0 过渡到 1），逐帧播放并拉取链末端的世界矩阵。
+
+    Returns:
+        dict: {混合方式: 每帧秒数}
     """
+    results = {}
+    for mode in IKFK_BLEND_MODES:
+        rigs = [_build_ikfk_test_rig(f'ikfkBench{i}Jnt', chain_length, [mode], frames=frames, seed=i)
+                for i in range(chain_count)]
+        pull_attrs = [f"{rig['chains'][mode][-1]}.worldMatrix[0]" for rig in rigs]
+        results[mode] = time_playback(pull_attrs, 1, frames, repeat)
+        cmds.delete([node for rig in rigs for node in rig['nodes']])
+
+    print(f"IK/FK 混合播放耗时 ({chain_count} 条链 x {chain_length} 个关节, {frames} 帧):")
+    print_comparison(results, 'constraint')
+    return results
+
+def _validate_orient_args(root_joint, orient_order, secondary_axis_orient):
+    """验证关节定向参数，无效时给出警告并返回 False"""
     # 验证根关节
-    if not cmds.objExists(root_joint) or cmds.objectType(root_joint) != 'joint':
+    if not SCENE_INDEX.exists(root_joint) or cmds.objectType(root_joint) != 'joint':
         cmds.warning(f"对象 '{root_joint}' 不存在或不是关节!")
-        return
+        return False
 
     # 验证参数
     valid_orient_orders = ["xyz", "xzy", "yxz", "yzx", "zxy", "zyx"]
     if orient_order.lower() not in valid_orient_orders:
         cmds.warning(f"无效的轴向顺序 '{orient_order}'! 请使用: {', '.join(valid_orient_orders)}")
+        return False
+
+    if secondary_axis_orient.lower() not in SECONDARY_AXIS_VECTORS:
+        cmds.warning(f"无效的次轴方向 '{secondary_axis_orient}'! 请使用: {', '.join(SECONDARY_AXIS_VECTORS)}")
+        return False
+    return True
+
+
+def orient_joint_chain(root_joint, orient_order="xyz", secondary_axis_orient="yup"):
+    """
+    定向整个关节链，从根关节到末端关节
+
+    与 cmds.joint(edit=True, orientJoint=..., children=True) 的结果相同：有子关节的关节主轴指向第一个子关节，
+    次轴朝向 secondary_axis_orient 指定的世界方向，末端关节的 jointOrient 为 0。
+    所有关节位置一次读取，朝向在 NumPy 中求解，不再逐个关节调用 cmds.joint。
+    结果仍逐个关节用 setAttr 写回：MDGModifier/MFnIkJoint 在脚本中的写入不进入撤销队列，
+    工具窗口按撤销块撤回构建时无法恢复。
+
+    参数:
+        root_joint: 关节链的根关节名称
+        orient_order: 轴向顺序 (如 "xyz", "yzx"等)，默认为"xyz"
+        secondary_axis_orient: 次轴方向 ("yup", "ydown", "zup", "zdown")，默认为"yup"
+    """
+    if not _validate_orient_args(root_joint, orient_order, secondary_axis_orient):
         return
 
-    valid_secondary_axis = ["yup", "ydown", "zup", "zdown"]
-    if secondary_axis_orient.lower() not in valid_secondary_axis:
-        cmds.warning(f"无效的次轴方向 '{secondary_axis_orient}'! 请使用: {', '.join(valid_secondary_axis)}")
+    skeleton = SkeletonIndex(root_joint)
+    print(f"定向关节链: {' -> '.join(get_joint_chain(root_joint, skeleton))}")
+    print(f"参数: 轴向顺序={orient_order}, 次轴方向={secondary_axis_orient}")
+
+    # 冻结变换（确保骨骼处于初始状态）
+    cmds.makeIdentity(skeleton.paths, apply=True, translate=False, rotate=True, scale=True)
+
+    # 在根关节父级空间中求解：位置转换到父级空间，次轴方向只做旋转变换
+    parent_matrix = get_world_matrices(skeleton.paths[:1], parent=True)[0]
+    world = get_world_matrices(skeleton.paths)
+    positions = np.matmul(world[:, 3, :], np.linalg.inv(parent_matrix))[:, :3]
+    parent_rotation = remove_scale(parent_matrix)[:3, :3]
+    up_vector = np.asarray(SECONDARY_AXIS_VECTORS[secondary_axis_orient.lower()]).dot(parent_rotation.T)
+    aim_targets = [kids[0] if kids else -1 for kids in skeleton.children]
+
+    _, orients, translates = solve_joint_orients(positions, skeleton.parents, aim_targets, up_vector,
+                                                 orient_order.lower())
+
+    # 写回 jointOrient、子关节位移，并清零 rotateAxis（zeroScaleOrient）
+    for i, path in enumerate(skeleton.paths):
+        cmds.setAttr(f'{path}.jointOrient', *orients[i])
+        cmds.setAttr(f'{path}.rotateAxis', 0, 0, 0)
+        if i:
+            cmds.setAttr(f'{path}.translate', *translates[i])
+
+    print("关节链定向完成!")
+
+
+def orient_joints_along(specs, orient_order="xyz", secondary_axis_orient="yup"):
+    """
+    按指定的起止关节为一组关节设置相同的朝向，无需临时调整父子关系
+
+    主轴从 start 指向 end，次轴规则与 orient_joint_chain 相同。
+    用于反向脚枢轴这类互相瞄准的关节：等价于"临时将 end 放到 start 下、定向后再取消父子关系"。
+    子关节不做位移补偿，应在建立层级之前调用。
+
+    Args:
+        specs (list): [(关节列表, start, end)]
+        orient_order (str): 轴向顺序
+        secondary_axis_orient (str): 次轴方向
+    """
+    joints = [jnt for spec_joints, _, _ in specs for jnt in spec_joints]
+    for jnt in joints:
+        if not _validate_orient_args(jnt, orient_order, secondary_axis_orient):
+            return
+
+    cmds.makeIdentity(joints, apply=True, translate=False, rotate=True, scale=True)
+
+    # 一次读取所有起止关节的位置与所有关节父级的世界矩阵
+    points = get_world_matrices([name for _, start, end in specs for name in (start, end)])[:, 3, :3]
+    rotations = aim_matrices(points[1::2] - points[0::2], SECONDARY_AXIS_VECTORS[secondary_axis_orient.lower()],
+                             orient_order.lower())
+    parent_rotations = iter(remove_scale(get_world_matrices(joints, parent=True))[:, :3, :3])
+
+    # 逐个关节 setAttr 写回（保持可撤销，见 orient_joint_chain）
+    for (spec_joints, _, _), rotation in zip(specs, rotations):
+        for jnt in spec_joints:
+            orient = matrix_to_euler_xyz(rotation.dot(next(parent_rotations).T))
+            cmds.setAttr(f'{jnt}.jointOrient', *orient)
+            cmds.setAttr(f'{jnt}.rotateAxis', 0, 0, 0)
+
+
+def _orient_joint_chain_legacy(root_joint, orient_order="xyz", secondary_axis_orient="yup"):
+    """逐个关节调用 cmds.joint 定向（用于校验与性能对比）"""
+    if not _validate_orient_args(root_joint, orient_order, secondary_axis_orient):
         return
 
-    # 获取整个关节链
-    joint_chain = get_joint_chain(root_joint)
+    # 获取整个关节链（一次查询建立骨骼索引，后续子关节判断不再访问 Maya）
+    skeleton = SkeletonIndex(root_joint)
+    joint_chain = get_joint_chain(root_joint, skeleton)
     if not joint_chain:
         cmds.warning(f"在 '{root_joint}' 下未找到关节链!")
         return
 
-    print(f"定向关节链: {' -> '.join(joint_chain)}")
-    print(f"参数: 轴向顺序={orient_order}, 次轴方向={secondary_axis_orient}")
-
     # 冻结变换（确保骨骼处于初始状态）
     cmds.makeIdentity(joint_chain, apply=True, translate=False, rotate=True, scale=True)
 
     # 从底部向上定向（确保父关节方向正确）
     for joint in reversed(joint_chain[:-1]):  # 跳过末端关节
-        children = cmds.listRelatives(joint, children=True, type='joint') or []
-
-        if children:
+        if skeleton.child_joints(joint):
             # 定向当前关节
             cmds.joint(
                 joint,
@@ -1170,39 +2017,94 @@ def orient_joint_chain(root_joint, orient_order="xyz", secondary_axis_orient="yu
                 zeroScaleOrient=True,
                 children=True
             )
-            print(f"定向关节: {joint}")
         else:
             print(f"警告: 关节 '{joint}' 没有子关节，但不在链末端")
 
-    print("关节链定向完成!")
+
+def _build_test_chain(name, chain_length, seed=0):
+    """创建一条随机弯曲的测试关节链，返回根关节"""
+    rng = np.random.default_rng(seed)
+    cmds.select(clear=True)
+    position = np.zeros(3)
+    chain = []
+    for i in range(chain_length):
+        position = position + rng.normal(0.0, 1.0, 3) + (0.0, 2.0, 0.0)
+        chain.append(cmds.joint(name=f'jnt_m_{name}{i}_001', position=tuple(position)))
+    cmds.select(clear=True)
+    return chain[0]
 
 
-def get_joint_chain(start_joint):
+def verify_orient_solver(root_joint=None, orient_order="xyz", secondary_axis_orient="yup", tolerance=1e-4):
     """
-    从起始关节获取整个关节链
+    校验 NumPy 定向结果与 cmds.joint 逐个定向的结果是否一致
 
-    参数:
-        start_joint: 起始关节名称
+    复制两份关节树，分别用两种方式定向，比较所有关节的世界矩阵，最后删除副本。
+    root_joint 为 None 时使用随机生成的测试链。
 
-    返回:
-        list: 按层级顺序排列的关节链
+    Returns:
+        float: 世界矩阵的最大差值
     """
-    chain = [start_joint]
-    current = start_joint
+    test_root = root_joint or _build_test_chain('orientCheck', 30)
+    legacy_root = cmds.duplicate(test_root, renameChildren=True)[0]
+    solver_root = cmds.duplicate(test_root, renameChildren=True)[0]
+
+    _orient_joint_chain_legacy(legacy_root, orient_order, secondary_axis_orient)
+    orient_joint_chain(solver_root, orient_order, secondary_axis_orient)
+
+    legacy = get_world_matrices(SkeletonIndex(legacy_root).paths)
+    solved = get_world_matrices(SkeletonIndex(solver_root).paths)
+    max_error = float(np.abs(legacy - solved).max())
+
+    cmds.delete(legacy_root, solver_root)
+    if root_joint is None:
+        cmds.delete(test_root)
 
-    while True:
-        # 获取直接子关节（仅限关节类型）
-        children = cmds.listRelatives(current, children=True, type='joint') or []
+    if max_error > tolerance:
+        cmds.warning(f"定向结果不一致: 最大误差 {max_error:.6f}")
+    else:
+        print(f"定向结果一致: 最大误差 {max_error:.2e}")
+    return max_error
+
+
+def benchmark_orient_joint_chain(chain_length=200, repeat=3):
+    """
+    对比 cmds.joint 逐个定向与 NumPy 求解定向的耗时
 
-        if not children:
-            break  # 到达链末端
+    Returns:
+        dict: {'legacy': 秒, 'solver': 秒}
+    """
+    test_root = _build_test_chain('orientBench', chain_length)
+    results = {}
+    for label, func in [('legacy', _orient_joint_chain_legacy), ('solver', orient_joint_chain)]:
+        elapsed = 0.0
+        for _ in range(repeat):
+            copy_root = cmds.duplicate(test_root, renameChildren=True)[0]
+            start = time.perf_counter()
+            func(copy_root)
+            elapsed += time.perf_counter() - start
+            cmds.delete(copy_root)
+        results[label] = elapsed / repeat
+        print(f"{label}: {results[label] * 1000:.1f} ms / 次 ({chain_length} 个关节)")
+
+    cmds.delete(test_root)
+    print(f"NumPy 定向提速 {results['legacy'] / max(results['solver'], 1e-9):.1f} 倍")
+    return results
+
+
+def get_joint_chain(start_joint, skeleton=None):
+    """
+    从起始关节获取整个关节链
 
-        # 如果有多个子关节，取第一个（假设是主链）
-        next_joint = children[0]
-        chain.append(next_joint)
-        current = next_joint
+    参数:
+        start_joint: 起始关节名称
+        skeleton: 已建立的 SkeletonIndex，None 时以 start_joint 为根建立一次
 
-    return chain
+    返回:
+        list: 按层级顺序排列的关节链（有多个子关节时取第一个，假设是主链）
+    """
+    if skeleton is None:
+        skeleton = SkeletonIndex(start_joint)
+    return skeleton.chain(start_joint)
 
 def setup_foot(side='l'):
     # 验证side参数有效性
@@ -1277,358 +2179,383 @@ def setup_foot(side='l'):
     cmds.transformLimits(f'connect_{side}_footInnPivot_001', erz=(True, False), rz=(0, 0))
     cmds.transformLimits(f'connect_{side}_footOutPivot_001', erz=(True, False), rz=(0, 0))
 
+def parent_matching(pattern, parent):
+    """
+    将名称匹配通配符的节点放到指定父节点下（通过场景索引查找，不做整场景扫描）
 
-# 创建一个顶级空组
-master_group = cmds.group(em=True, name='master')
-if not cmds.objExists('master'):
-    raise ValueError("master组创建失败")
-
-# 遍历属性字典并添加属性
-for attr, config in master_attributes.items():
-    add_attribute('master', attr, config)
-
-# 锁定并隐藏不需要的属性
-all_attributes = cmds.listAttr('master', visible=True, keyable=True, scalar=True) or []
-for attr in all_attributes:
-    if attr not in master_attributes:
-        cmds.setAttr(f'master.{attr}', lock=True, keyable=False, channelBox=False)
-        print(f"已锁定并隐藏属性: {attr}")
-
-# 创建组并存储到字典中
-group_dict = {group_name: cmds.group(em=True, name=group_name) for group_name in groups}
-for group in group_dict.values():
-    cmds.parent(group, master_group)
-
-# 启用 geometry 组的 overrideEnabled 属性
-cmds.setAttr('geometry.overrideEnabled', 1)
-
-# 整理 master 组
-rigNodesLocal_group = cmds.group(em=True, name='rigNodesLocal')
-rigNodesWorld_group = cmds.group(em=True, name='rigNodesWorld')
-cmds.parent(rigNodesLocal_group, group_dict['rigNodes'])
-cmds.parent(rigNodesWorld_group, group_dict['rigNodes'])
-cmds.parent('jnt_m_spine_001', group_dict['joints'])
-
-# 用户输入模型组的名称，暂时省略
-# resolution_groups = {}
-# for resolution in ["Low", "Medium", "High"]:
-#     while True:
-#         # 使用传统的 cmds.promptDialog 调用方式
-#         result = cmds.promptDialog(
-#             title=f"输入 {resolution} 分辨率组",
-#             message=f"请输入 {resolution} 分辨率模型组的名称：\n\n示例：low_res_group",
-#             button=["确认", "取消"],
-#             defaultButton="确认",
-#             cancelButton="取消",
-#             dismissString="取消"
-#         )
-#
-#         if result == "取消":
-#             raise ValueError("用户取消了操作。")
-#
-#         # 获取用户输入的组名称
-#         group_name = cmds.promptDialog(query=True, text=True)
-#
-#         # 检查输入的组是否存在
-#         if cmds.objExists(group_name):
-#             resolution_groups[resolution] = group_name
-#             print(f"{resolution} 分辨率模型组已设置为: {group_name}")
-#             break
-#         else:
-#             cmds.warning(f"组 '{group_name}' 不存在！请重新输入。")
-
-##############################################################################################
-# 硬编码生成模型组
-
-resolution_groups = {
-    "Low": "grp_m_low_body_001",
-    "Medium": "grp_m_mid_body_001",
-    "High": "grp_m_high_body_001"
-}
+    Args:
+        pattern (str): 名称通配符，例如 'zero_?_handIk_001'
+        parent (str): 父节点名称
 
-# 验证组是否存在
-for resolution, group_name in resolution_groups.items():
-    if not cmds.objExists(group_name):
-        cmds.warning(f"组 '{group_name}' 不存在！请检查场景。")
-    else:
-        print(f"{resolution} 分辨率模型组已设置为: {group_name}")
-
-##############################################################################################
-
-# 遍历 master_attributes 字典，将 master 的属性连接到对应的组
-for attr, config in master_attributes.items():
-    if attr == "resolution":
-        for i, resolution in enumerate(["Low", "Medium", "High"]):
-            target_group = resolution_groups[resolution]
-            cmds.parent(target_group, 'geometry')
-            condition_node = cmds.createNode('condition', name=f'resolution_{resolution}_condition')
-            cmds.setAttr(f'{condition_node}.firstTerm', i)
-            cmds.setAttr(f'{condition_node}.secondTerm', i)
-            cmds.setAttr(f'{condition_node}.operation', 0)
-            cmds.setAttr(f'{condition_node}.colorIfTrueR', 1)
-            cmds.setAttr(f'{condition_node}.colorIfFalseR', 0)
-            cmds.connectAttr(f'master.resolution', f'{condition_node}.firstTerm')
-            cmds.connectAttr(f'{condition_node}.outColorR', f'{target_group}.visibility')
-            print(f"已连接属性: master.resolution -> {condition_node}.firstTerm -> {target_group}.visibility")
-    else:
-        source_attr = f"master.{attr}"
-        target_attr = f"{config['target_group']}.{config['target_attribute']}"
-        if cmds.objExists(target_attr.split('.')[0]) and cmds.attributeQuery(config['target_attribute'],
-                                                                             node=config['target_group'], exists=True):
-            cmds.connectAttr(source_attr, target_attr)
-            print(f"已连接属性: {source_attr} -> {target_attr}")
+    Returns:
+        list: 被设置父子关系的节点
+    """
+    nodes = SCENE_INDEX.glob(pattern)
+    if not nodes:
+        cmds.warning(f"没有匹配 {pattern} 的节点，跳过父子关系设置")
+        return []
+    cmds.parent(*nodes, parent)
+    return nodes
+
+
+# 构建阶段：每个阶段声明输入关节与上游阶段，由调度器按指纹判断是否需要重建
+BuildStage = namedtuple('BuildStage', ['name', 'func', 'inputs', 'depends'])
+
+
+def _code_signature(code):
+    """生成函数字节码签名（忽略行号，嵌套的推导式/lambda一并计入）"""
+    parts = [code.co_code, repr(code.co_names).encode()]
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            parts.append(_code_signature(const))
         else:
-            print(f"目标属性不存在: {target_attr}")
-
-# 创建世界控制器
-circle = cmds.circle(name="ctrl_m_world_001", nr=(0, 1, 0), r=65)[0]
-cmds.delete(circle, constructionHistory=True)
-zero_m_world_group = cmds.group(em=True, name='zero_m_world_001')
-cmds.parent(circle, zero_m_world_group)
-cmds.parent(zero_m_world_group, group_dict['controls'])
-
-# 世界控制器进行父子与缩放约束
-cmds.parentConstraint('|master|controls|zero_m_world_001|ctrl_m_world_001', '|master|rigNodes|rigNodesLocal')
-cmds.scaleConstraint('|master|controls|zero_m_world_001|ctrl_m_world_001', '|master|rigNodes|rigNodesLocal')
-cmds.parentConstraint('|master|controls|zero_m_world_001|ctrl_m_world_001', '|master|joints')
-cmds.scaleConstraint('|master|controls|zero_m_world_001|ctrl_m_world_001', '|master|joints')
-
-# 锁定并隐藏master组的子组的所有属性
-for group in groups:
-    all_attributes = cmds.listAttr(group, visible=True, keyable=True) or []
-    for attr in all_attributes:
-        cmds.setAttr(f'{group}.{attr}', lock=True, keyable=False, channelBox=False)
-
-# 胸腔控制器创建
-
-create_control(description='cog', shape='octagon', size=50, match_type='position',
-               match_target='|master|joints|jnt_m_spine_001', scale_factor=1)
-create_control(description='pelvisIk', shape='cube', size=35, match_type='position',
-               match_target='|master|joints|jnt_m_spine_001')
-create_control(description='chestIk', shape='cube', size=35, match_type='position',
-               match_target='|master|joints|jnt_m_spine_001|jnt_m_spine_002|jnt_m_spine_003'
-                            '|jnt_m_spine_004|jnt_m_spine_005')
-create_control(description='pelvisLocal', shape='circleY', parent='output_m_pelvisIk_001', size=1, match_type='position',
-               match_target='|master|joints|jnt_m_spine_001', scale_factor=25)
-
-create_control(description='spineIkBendA', shape='square', size=1, match_type='position',
-               match_target='jnt_m_spine_002', scale_factor=25)
-create_control(description='spineIkBendB', shape='square', parent='output_m_spineIkBendA_001', size=1,
-               match_type='position', match_target='jnt_m_spine_003', scale_factor=25)
-create_control(description='spineIkBendC', shape='square', parent='output_m_spineIkBendB_001', size=1,
-               match_type='position', match_target='jnt_m_spine_004', scale_factor=25)
-
-cmds.parent('jnt_l_upperLeg_001', world=True)
-cmds.parent('jnt_r_upperLeg_001', world=True)
-cmds.parent('jnt_l_clavicle_001', world=True)
-cmds.parent('jnt_r_clavicle_001', world=True)
-
-
-
-# 胸腔splineIk曲线创建
-joints = ['jnt_m_spine_001', 'jnt_m_spine_002', 'jnt_m_spine_003', 'jnt_m_spine_004', 'jnt_m_spine_005',
-          'jnt_m_spine_006']
-curve_name = 'crv_m_spineIk_001'
-ik_handle_name = 'ikHnd_m_spineIk_001'
-start_joint = 'jnt_m_spine_001'
-end_joint = 'jnt_m_spine_005'
-new_joint_1_name = 'jnt_m_pelvisIkCrv_001'
-new_joint_2_name = 'jnt_m_chestIkCrv_001'
-
-create_spine_ik(joints, curve_name, ik_handle_name, start_joint, end_joint, new_joint_1_name, new_joint_2_name)
-
-cmds.parent('jnt_l_upperLeg_001', 'jnt_m_spine_001')
-cmds.parent('jnt_r_upperLeg_001', 'jnt_m_spine_001')
-
-# 胸腔控制器绑定
-# 脊柱Ik关节控制器归位
-cmds.parent('jnt_m_pelvisIkCrv_001', 'output_m_pelvisIk_001')
-cmds.parent('jnt_m_chestIkCrv_001', 'output_m_chestIk_001')
-
-# 创建用于IK扭转控制的定位器
-chestIkTwist = cmds.spaceLocator(name='loc_m_chestIkTwist_001')[0]
-pelvisIkTwist = cmds.spaceLocator(name='loc_m_pelvisIkTwist_001')[0]
-chestIkTwist_group = cmds.group(em=True, name='zero_m_chestIkTwist_001')
-pelvisIkTwist_group = cmds.group(em=True, name='zero_m_pelvisIkTwist_001')
-cmds.parent(chestIkTwist, chestIkTwist_group)
-cmds.parent(pelvisIkTwist, pelvisIkTwist_group)
-cmds.matchTransform(chestIkTwist_group, 'jnt_m_spine_006', position=True, rotation=True)
-cmds.matchTransform(pelvisIkTwist_group, 'jnt_m_spine_001', position=True, rotation=True)
-cmds.parent(chestIkTwist_group, 'output_m_chestIk_001')
-cmds.parent(pelvisIkTwist_group, 'output_m_pelvisIk_001')
-
-# 设置IK手柄的扭转控制参数
-cmds.setAttr("ikHnd_m_spineIk_001.dTwistControlEnable", 1)
-cmds.setAttr("ikHnd_m_spineIk_001.dWorldUpType", 4)
-# 连接定位器的世界矩阵到IK手柄属性
-cmds.connectAttr('loc_m_pelvisIkTwist_001.worldMatrix[0]', 'ikHnd_m_spineIk_001.dWorldUpMatrix')
-cmds.connectAttr('loc_m_chestIkTwist_001.worldMatrix[0]', 'ikHnd_m_spineIk_001.dWorldUpMatrixEnd')
-
-# 清除当前选择
-cmds.select(clear=True)
-
-# 创建骨盆局部关节并匹配到脊椎起始位置
-jnt_pelvisLocal = cmds.joint(name='jnt_m_pelvisLocal_001', position=(0, 0, 0))
-cmds.matchTransform(jnt_pelvisLocal, 'jnt_m_spine_001', position=True, rotation=True)
-
-# 设置骨盆局部控制约束
-cmds.parentConstraint('output_m_pelvisLocal_001', '|master|rigNodes|rigNodesLocal')
-cmds.setAttr('ctrl_m_pelvisLocal_001.translate', lock=True, keyable=False, channelBox=False)
-
-# 约束骨盆局部关节到输出节点
-cmds.parentConstraint('output_m_pelvisLocal_001', 'jnt_m_pelvisLocal_001')
-
-# 设置骨盆局部关节的层级关系
-cmds.parent('jnt_m_pelvisLocal_001', 'jnt_m_spine_001')
-cmds.parent('jnt_l_upperLeg_001', 'jnt_m_pelvisLocal_001')
-cmds.parent('jnt_r_upperLeg_001', 'jnt_m_pelvisLocal_001')
-cmds.parent('jnt_l_clavicle_001', 'jnt_m_spine_006')
-cmds.parent('jnt_r_clavicle_001', 'jnt_m_spine_006')
-
-# 添加骨盆IK控制器的可见性属性
-cmds.addAttr('ctrl_m_pelvisIk_001', longName='localCtrlVis', attributeType='bool', defaultValue=0, keyable=True)
-
-# 连接可见性属性到骨盆局部控制组的可见性
-cmds.connectAttr('ctrl_m_pelvisIk_001.localCtrlVis', 'zero_m_pelvisLocal_001.visibility')
-
-# 胸腔控制器整理
-cmds.parent('zero_m_chestIk_001', 'output_m_spineIkBendC_001')
-cmds.parent('zero_m_cog_001', 'ctrl_m_world_001')
-cmds.parent('zero_m_pelvisIk_001', 'output_m_cog_001')
-cmds.parent('zero_m_spineIkBendA_001', 'output_m_cog_001')
-cmds.parent('crv_m_spineIk_001', 'rigNodesWorld')
-cmds.parent('ikHnd_m_spineIk_001', 'rigNodesLocal')
-
-# 创建头部Ik控制器
-create_control(description='headIk', shape='cube', size=1, match_type='position',
-               match_target='jnt_m_neck_005', scale_factor=20)
-create_control(description='headIkLocal', shape='headLocal', size=1, match_type='transform',
-               match_target='jnt_m_neck_005', scale_factor=15)
-cmds.addAttr('ctrl_m_headIk_001', longName='localCtrlVis', attributeType='bool', defaultValue=0, keyable=True)
-cmds.connectAttr('ctrl_m_headIk_001.localCtrlVis', 'zero_m_headIkLocal_001.visibility')
-
-create_control(description='headIkBendA', shape='square', size=1, match_type='position',
-               match_target='jnt_m_neck_002', scale_factor=10)
-create_control(description='headIkBendB', shape='square', parent='output_m_headIkBendA_001', size=1,
-               match_type='position', match_target='jnt_m_neck_003', scale_factor=10)
-cmds.setAttr('zero_m_headIkBendA_001.rotateX', 17)
-
-cmds.parent('jnt_m_neck_001', world=True)
-joints = ['jnt_m_neck_001', 'jnt_m_neck_002', 'jnt_m_neck_003', 'jnt_m_neck_004', 'jnt_m_neck_005']
-curve_name = 'crv_m_neckIk_001'
-ik_handle_name = 'ikHnd_m_neckIk_001'
-start_joint = 'jnt_m_neck_001'
-end_joint = 'jnt_m_neck_005'
-neck_joint_1_name = 'jnt_m_neckIkCrv_001'
-neck_joint_2_name = 'jnt_m_headIkCrv_001'
-print(-1)
-create_spine_ik(joints, curve_name, ik_handle_name, start_joint, end_joint, neck_joint_1_name, neck_joint_2_name)
-
-cmds.parent('jnt_m_headIkCrv_001', 'output_m_headIk_001')
-cmds.parent('jnt_m_neckIkCrv_001', 'jnt_m_spine_006')
-cmds.orientConstraint('output_m_headIkLocal_001', 'jnt_m_headLocal_001')
-cmds.pointConstraint('jnt_m_neck_005', 'driven_m_headIkLocal_001')
-cmds.orientConstraint('output_m_headIk_001', 'driven_m_headIkLocal_001', maintainOffset=True)
-
-neckIkTwist = cmds.spaceLocator(name='loc_m_neckIkTwist_001')[0]
-headIkTwist = cmds.spaceLocator(name='loc_m_headIkTwist_001')[0]
-neckIkTwist_group = cmds.group(em=True, name='zero_m_neckIkTwist_001')
-headIkTwist_group = cmds.group(em=True, name='zero_m_headIkTwist_001')
-cmds.parent(neckIkTwist, neckIkTwist_group)
-cmds.parent(headIkTwist, headIkTwist_group)
-cmds.matchTransform(neckIkTwist_group, 'jnt_m_neck_001', position=True, rotation=True)
-cmds.matchTransform(headIkTwist_group, 'jnt_m_neck_005', position=True, rotation=True)
-cmds.parent(neckIkTwist_group, 'jnt_m_spine_006')
-cmds.parent(headIkTwist_group, 'output_m_headIk_001')
-
-# 设置IK手柄的扭转控制参数
-cmds.setAttr("ikHnd_m_neckIk_001.dTwistControlEnable", 1)
-cmds.setAttr("ikHnd_m_neckIk_001.dWorldUpType", 4)
-# 连接定位器的世界矩阵到IK手柄属性
-cmds.connectAttr('loc_m_neckIkTwist_001.worldMatrix[0]', 'ikHnd_m_neckIk_001.dWorldUpMatrix')
-cmds.connectAttr('loc_m_headIkTwist_001.worldMatrix[0]', 'ikHnd_m_neckIk_001.dWorldUpMatrixEnd')
-cmds.select(clear=True)
-
-cmds.parent('zero_m_headIk_001', 'output_m_headIkBendB_001')
-cmds.parent('zero_m_headIkLocal_001', 'output_m_headIk_001')
-cmds.parent('jnt_m_neck_001', 'jnt_m_spine_006')
-
-chestCtrls_group = cmds.group(em=True, name='grp_m_chestCtrls_001')
-cmds.parentConstraint('jnt_m_spine_006', 'grp_m_chestCtrls_001')
-cmds.parent('grp_m_chestCtrls_001', 'output_m_cog_001')
-cmds.parent('zero_m_headIkBendA_001', 'grp_m_chestCtrls_001')
-cmds.parent('crv_m_neckIk_001', 'rigNodesWorld')
-cmds.parent('ikHnd_m_neckIk_001', 'rigNodesLocal')
-
-
-# 创建锁骨与肩胛骨控制器
-create_control(description='clavicle', side='l', shape='clavicleL', size=1, match_type='transform',
-               match_target='jnt_l_clavicle_001', scale_factor=1)
-create_control(description='clavicle', side='r', shape='clavicleR', size=1, match_type='transform',
-               match_target='jnt_r_clavicle_001', scale_factor=1)
-create_control(description='scapula', side='l', shape='scapulaL', size=1, match_type='transform',
-               match_target='jnt_l_scapula_001', scale_factor=1)
-create_control(description='scapula', side='r', shape='scapulaR', size=1, match_type='transform',
-               match_target='jnt_r_scapula_001', scale_factor=1)
-cmds.parent('zero_r_scapula_001', 'output_r_clavicle_001')
-cmds.parent('zero_l_scapula_001', 'output_l_clavicle_001')
-
-cmds.orientConstraint('output_l_clavicle_001', 'jnt_l_clavicle_001')
-cmds.orientConstraint('output_r_clavicle_001', 'jnt_r_clavicle_001')
-cmds.orientConstraint('output_l_scapula_001', 'jnt_l_scapula_001')
-cmds.orientConstraint('output_r_scapula_001', 'jnt_r_scapula_001')
-cmds.parent('zero_l_clavicle_001', 'grp_m_chestCtrls_001')
-cmds.parent('zero_r_clavicle_001', 'grp_m_chestCtrls_001')
-
-
-# shrug控制器创建
-create_control(description='shrug', side='l', shape='cube', size=1, match_type='position',
-               match_target='jnt_l_scapula_001', scale_factor=10)
-create_control(description='shrug', side='r', shape='cube', size=1, match_type='position',
-               match_target='jnt_r_scapula_001', scale_factor=10)
-cmds.parent('zero_l_shrug_001', 'grp_m_chestCtrls_001')
-cmds.parent('zero_r_shrug_001', 'grp_m_chestCtrls_001')
-# 创建目标约束
-cmds.aimConstraint(
-    'output_l_shrug_001',
-    'driven_l_clavicle_001',
-    aimVector=(1, 0, 0),  # Z轴指向目标
-    upVector=(0, 1, 0),   # Y轴朝上
-    worldUpType="objectrotation",
-    worldUpVector=(0, 1, 0),
-    worldUpObject='zero_l_clavicle_001'
-)
-cmds.aimConstraint(
-    'output_r_shrug_001',
-    'driven_r_clavicle_001',
-    aimVector=(-1, 0, 0),  # Z轴指向目标
-    upVector=(0, 1, 0),   # Y轴朝上
-    worldUpType="objectrotation",
-    worldUpVector=(0, 1, 0),
-    worldUpObject='zero_r_clavicle_001'
-)
-
-# 为每个部位生成左右侧的IK/FK链
-for limb_type in ["arm", "leg"]:
-    for side in ["l", "r"]:  # 处理左右侧
-        # 获取原始链并替换侧边前缀
-        original_chain = [jnt.replace("_l_", f"_{side}_") for jnt in base_chains[limb_type]]
-
-        # 验证原始关节是否存在
-        if not all(cmds.objExists(jnt) for jnt in original_chain):
-            print(f"Warning: {side.upper()} {limb_type} chain not found, skipping...")
+            parts.append(repr(const).encode())
+    return b'|'.join(parts)
+
+
+def _rest_signature(jnt):
+    """
+    生成关节静止数据的签名: 父节点、jointOrient、rotateAxis 以及未被驱动（连接或动画）的局部 translate/rotate
+
+    绑定驱动的通道和世界矩阵随姿势变化，不计入，因此摆姿势或不在静止帧运行不会改变签名，
+    上游关节的移动也不会影响只以下游关节为输入的阶段
+    """
+    parts = [(cmds.listRelatives(jnt, parent=True) or [''])[0]]
+    for attr in ('jointOrient', 'rotateAxis', 'translate', 'rotate'):
+        plugs = [f'{jnt}.{attr}'] + [f'{jnt}.{attr}{axis}' for axis in 'XYZ']
+        if attr in ('translate', 'rotate') and any(cmds.connectionInfo(plug, isDestination=True) for plug in plugs):
+            parts.append(f'{attr}=driven')
             continue
+        parts.append(f"{attr}={','.join(f'{v:.4f}' for v in cmds.getAttr(plugs[0])[0])}")
+    return f"{jnt}:{';'.join(parts)};"
+
+
+def _plug_node(plug):
+    return plug.split('.', 1)[0] if isinstance(plug, str) and '.' in plug else None
+
+
+def _set_plug_value(plug, value, attr_type):
+    """将 getAttr 读取的值写回属性"""
+    if attr_type == 'string':
+        cmds.setAttr(plug, value or '', type='string')
+    elif attr_type == 'matrix':
+        cmds.setAttr(plug, value, type='matrix')
+    elif isinstance(value, list) and value and isinstance(value[0], (list, tuple)):
+        cmds.setAttr(plug, *value[0])
+    else:
+        cmds.setAttr(plug, value)
+
+
+class _StageEditRecorder(object):
+    """
+    记录构建阶段对已有节点的修改: addAttr 添加的属性、setAttr 修改的值与锁定/可见状态、connectAttr 替换的输入连接
+
+    只在阶段执行期间替换这三个 cmds 命令，并且只记录本模块代码中的调用，其他模块的调用不受影响；
+    退出时无论是否出错都还原原始命令。
+    """
+    COMMANDS = ('addAttr', 'setAttr', 'connectAttr')
+    FLAG_NAMES = ('lock', 'l', 'keyable', 'k', 'channelBox', 'cb')
+
+    def __init__(self, existing_uuids):
+        self.existing_uuids = existing_uuids
+        self.added_attrs = []
+        self.edits = []
+        self._seen = set()
+        self._originals = {}
+
+    def __enter__(self):
+        for name in self.COMMANDS:
+            self._originals[name] = getattr(cmds, name)
+            setattr(cmds, name, self._wrap(name, self._originals[name]))
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        for name, command in self._originals.items():
+            setattr(cmds, name, command)
+        self._originals = {}
+        return False
+
+    def _wrap(self, name, command):
+        recorder = self
+        module_globals = globals()
+
+        def wrapper(*args, **kwargs):
+            if sys._getframe(1).f_globals is not module_globals:
+                return command(*args, **kwargs)
+            if name != 'addAttr':
+                recorder._record_before(name, args, kwargs)
+            result = command(*args, **kwargs)
+            if name == 'addAttr':
+                recorder._record_add_attr(args, kwargs)
+            return result
+
+        return wrapper
+
+    def _existing_uuid(self, node):
+        uuid = (cmds.ls(node, uuid=True) or [None])[0] if node else None
+        return uuid if uuid in self.existing_uuids else None
+
+    def _record_add_attr(self, args, kwargs):
+        if any(kwargs.get(flag) for flag in ('query', 'q', 'edit', 'e')):
+            return
+        attr = kwargs.get('longName') or kwargs.get('ln') or kwargs.get('shortName') or kwargs.get('sn')
+        for node in (args or cmds.ls(selection=True) or []):
+            uuid = self._existing_uuid(node)
+            if attr and uuid:
+                self.added_attrs.append([uuid, attr])
+
+    def _record_before(self, name, args, kwargs):
+        """在修改前记录属性的原始状态（每个属性每种修改只记录第一次）"""
+        plug = args[1] if name == 'connectAttr' and len(args) > 1 else (args[0] if args else None)
+        node = _plug_node(plug)
+        uuid = self._existing_uuid(node)
+        # 范围写入（例如 cv[0:7]）不记录
+        if not uuid or ':' in plug:
+            return
+        attr = plug.split('.', 1)[1]
+
+        def read_value():
+            return [cmds.getAttr(plug), cmds.getAttr(plug, type=True)]
+
+        # (修改类型, 读取原始状态, 读取失败时是否警告)
+        if name == 'connectAttr':
+            # 连接前的值只在可读取时记录（message 等属性没有值）
+            kinds = [('connection', lambda: (cmds.listConnections(plug, source=True, destination=False,
+                                                                  plugs=True) or [None])[0], True),
+                     ('value', read_value, False)]
+        else:
+            kinds = []
+            if any(flag in kwargs for flag in self.FLAG_NAMES):
+                kinds.append(('flags', lambda: [cmds.getAttr(plug, lock=True), cmds.getAttr(plug, keyable=True),
+                                                cmds.getAttr(plug, channelBox=True)], True))
+            if len(args) > 1:
+                kinds.append(('value', read_value, True))
+
+        for kind, read, warn in kinds:
+            if (kind, uuid, attr) in self._seen:
+                continue
+            self._seen.add((kind, uuid, attr))
+            try:
+                self.edits.append([kind, uuid, attr, read()])
+            except (RuntimeError, ValueError) as exc:
+                if warn:
+                    cmds.warning(f"无法记录 {plug} 的原始状态，拆除时不会还原: {exc}")
+
+
+class BuildScheduler(object):
+    """
+    绑定构建调度器
+
+    每个阶段的指纹由输入关节的静止数据（父节点、jointOrient、rotateAxis、未被驱动的局部 translate/rotate，
+    不使用随姿势变化的世界矩阵）、阶段代码以及上游阶段的指纹组成。
+    重新运行时只拆除并重建指纹发生变化的阶段及其下游阶段，其余阶段保持不动。
+    每个阶段创建的节点、对已有节点的父子关系修改，以及阶段代码通过 addAttr/setAttr/connectAttr 对已有节点
+    所做的修改（添加的属性、属性值、锁定与可见状态、输入连接）都会被记录，拆除时按相反顺序还原。
+    其他命令对已有节点的修改（例如 makeIdentity、joint -e）不会被记录，这类阶段修改后需从干净的场景重新构建。
+    构建状态以 json 形式保存在场景中的 network 节点上。
+    """
+
+    def __init__(self, state_node=BUILD_STATE_NODE):
+        self.state_node = state_node
+        self.stages = []
+
+    def stage(self, name, inputs=(), depends=()):
+        """注册构建阶段的装饰器，阶段按注册顺序执行"""
+        known = {stage.name for stage in self.stages}
+        for dep in depends:
+            if dep not in known:
+                raise ValueError(f"阶段 {name} 依赖的阶段 {dep} 未注册或注册顺序在其之后")
+
+        def decorator(func):
+            self.stages.append(BuildStage(name, func, tuple(inputs), tuple(depends)))
+            return func
+
+        return decorator
+
+    def _load_state(self):
+        if not cmds.objExists(f'{self.state_node}.buildState'):
+            return {}
+        data = cmds.getAttr(f'{self.state_node}.buildState')
+        return json.loads(data) if data else {}
+
+    def _save_state(self, state):
+        if not cmds.objExists(self.state_node):
+            cmds.createNode('network', name=self.state_node)
+        if not cmds.attributeQuery('buildState', node=self.state_node, exists=True):
+            cmds.addAttr(self.state_node, longName='buildState', dataType='string')
+        cmds.setAttr(f'{self.state_node}.buildState', json.dumps(state), type='string')
+
+    def _fingerprint(self, stage, fingerprints):
+        """计算阶段指纹"""
+        digest = hashlib.sha1(_code_signature(stage.func.__code__))
+        joints = sorted(set(cmds.ls(list(stage.inputs), type='joint') or [])) if stage.inputs else []
+        for jnt in joints:
+            digest.update(_rest_signature(jnt).encode())
+        for dep in stage.depends:
+            digest.update(f"{dep}={fingerprints.get(dep)};".encode())
+        return digest.hexdigest()
+
+    def _compute_fingerprints(self):
+        fingerprints = {}
+        for stage in self.stages:
+            fingerprints[stage.name] = self._fingerprint(stage, fingerprints)
+        return fingerprints
+
+    @staticmethod
+    def _snapshot():
+        """记录场景中全部节点的 uuid 以及 transform 的父节点 uuid"""
+        uuids = set(cmds.ls(uuid=True) or [])
+        paths = cmds.ls(type='transform', long=True) or []
+        path_uuids = cmds.ls(type='transform', uuid=True) or []
+        by_path = dict(zip(paths, path_uuids))
+        parents = {}
+        for path, uuid in by_path.items():
+            parents[uuid] = by_path.get(path.rsplit('|', 1)[0])
+        return uuids, parents
+
+    def _run_stage(self, stage):
+        """执行单个阶段并记录其对场景的修改，返回 (记录, 异常)"""
+        before_uuids, before_parents = self._snapshot()
+        recorder = _StageEditRecorder(before_uuids)
+
+        error = None
+        try:
+            with recorder:
+                stage.func()
+        except Exception as exc:
+            error = exc
+
+        after_uuids, after_parents = self._snapshot()
+        record = {
+            'created': sorted(after_uuids - before_uuids),
+            'reparented': [[uuid, parent] for uuid, parent in before_parents.items()
+                           if uuid in after_parents and after_parents[uuid] != parent],
+            'added_attrs': recorder.added_attrs,
+            'edits': recorder.edits,
+        }
+        return record, error
+
+    @staticmethod
+    def _restore_edits(edits):
+        """还原已有节点的输入连接，再还原属性值与锁定/可见状态"""
+        connections = [edit for edit in edits if edit[0] == 'connection']
+        others = [edit for edit in edits if edit[0] != 'connection']
+        for kind, uuid, attr, data in connections[::-1] + others[::-1]:
+            node = cmds.ls(uuid)
+            if not node or not cmds.objExists(f'{node[0]}.{attr}'):
+                continue
+            plug = f'{node[0]}.{attr}'
+            try:
+                if kind == 'connection':
+                    current = (cmds.listConnections(plug, source=True, destination=False, plugs=True) or [None])[0]
+                    if current != data:
+                        if current:
+                            cmds.disconnectAttr(current, plug)
+                        if data and cmds.objExists(data):
+                            cmds.connectAttr(data, plug)
+                elif kind == 'flags':
+                    lock, keyable, channel_box = data
+                    cmds.setAttr(plug, lock=False)
+                    cmds.setAttr(plug, keyable=keyable)
+                    if not keyable:
+                        cmds.setAttr(plug, channelBox=channel_box)
+                    cmds.setAttr(plug, lock=lock)
+                elif not cmds.listConnections(plug, source=True, destination=False):
+                    locked = cmds.getAttr(plug, lock=True)
+                    cmds.setAttr(plug, lock=False)
+                    _set_plug_value(plug, *data)
+                    cmds.setAttr(plug, lock=locked)
+            except (RuntimeError, ValueError) as exc:
+                cmds.warning(f"无法还原 {plug}: {exc}")
+
+    @classmethod
+    def _teardown(cls, record):
+        """拆除阶段：还原已有节点的连接与属性，删除添加的属性，还原父子关系，删除创建的节点"""
+        cls._restore_edits(record.get('edits', []))
+
+        for uuid, attr in reversed(record.get('added_attrs', [])):
+            node = cmds.ls(uuid)
+            if node and cmds.attributeQuery(attr, node=node[0], exists=True):
+                cmds.setAttr(f'{node[0]}.{attr}', lock=False)
+                cmds.deleteAttr(f'{node[0]}.{attr}')
+
+        for uuid, parent_uuid in reversed(record.get('reparented', [])):
+            node = cmds.ls(uuid, long=True)
+            if not node:
+                continue
+            current = cmds.listRelatives(node[0], parent=True, fullPath=True)
+            if parent_uuid is None:
+                if current:
+                    cmds.parent(node[0], world=True)
+                continue
+            parent = cmds.ls(parent_uuid, long=True)
+            if parent and (not current or current[0] != parent[0]):
+                cmds.parent(node[0], parent[0])
+
+        created = cmds.ls(record.get('created', []), long=True) or []
+        if created:
+            cmds.delete(created)
+
+    def run(self, force=()):
+        """
+        执行构建，只重建指纹变化的阶段及其下游
+
+        Args:
+            force (list): 强制重建的阶段名称（例如只修改了阶段调用的工具函数时）
+
+        Returns:
+            list: 本次重建的阶段名称
+        """
+        for name in force:
+            if name not in {stage.name for stage in self.stages}:
+                raise ValueError(f"未知的构建阶段: {name}")
+
+        state = self._load_state()
+        fingerprints = self._compute_fingerprints()
+
+        dirty = []
+        for stage in self.stages:
+            record = state.get(stage.name)
+            if (stage.name in force or record is None or record.get('fingerprint') != fingerprints[stage.name]
+                    or any(dep in dirty for dep in stage.depends)):
+                dirty.append(stage.name)
+
+        if not dirty:
+            print("所有构建阶段均为最新，无需重建")
+            return []
+
+        # 先按相反顺序拆除脏阶段，再按注册顺序重建
+        for stage in reversed(self.stages):
+            if stage.name in dirty and stage.name in state:
+                self._teardown(state.pop(stage.name))
+                print(f"已拆除阶段: {stage.name}")
+
+        for stage in self.stages:
+            if stage.name not in dirty:
+                continue
+            start = time.perf_counter()
+            record, error = self._run_stage(stage)
+            state[stage.name] = record
+            self._save_state(state)
+            if error is not None:
+                # 失败前创建的节点已记录，下次运行时会先拆除再重建
+                raise error
+            cmds.select(clear=True)
+            print(f"已构建阶段: {stage.name} ({time.perf_counter() - start:.2f}s)")
+
+        # 以完整构建后的场景为准记录指纹
+        for name, fingerprint in self._compute_fingerprints().items():
+            if name in state:
+                state[name]['fingerprint'] = fingerprint
+        self._save_state(state)
+
+        skipped = [stage.name for stage in self.stages if stage.name not in dirty]
+        print(f"重建阶段: {', '.join(dirty)}；跳过阶段: {', '.join(skipped) or '无'}")
+        return dirty
 
-        # 生成FK和IK链
-        for system_type in ["Fk", "Ik"]:
-            new_chain = duplicate_joint_chain(original_chain, system_type)
-            print(f"Created {side.upper()} {limb_type} {system_type} chain: {'|'.join(new_chain)}")
 
-            # 如果是FK链，自动创建FK控制器（排除最后一个关节）
-            if system_type == "Fk":
-                # 排除最后一个关节（如wristEnd/toeEnd）
-                fk_joints = new_chain[:-1]
-                create_fk_chain(fk_joints, ctrl_shape='circleX', ctrl_size=8)
+BUILD = BuildScheduler()
+
 
 # 手指控制器创建
 finger_patterns = {
@@ -1639,177 +2566,579 @@ finger_patterns = {
     'ring': ['Metacarpal_001', 'Base_001', 'Mid_001', 'Tip_001']
 }
 
+# 各阶段的输入关节，关节位置变化时对应阶段会被重建
+LIMB_INPUT_JOINTS = [jnt.replace('_l_', '_?_') for jnt in base_chains['arm'] + base_chains['leg']]
+FINGER_INPUT_JOINTS = [f'jnt_?_{finger}*' for finger in finger_patterns] + ['jnt_?_wristEnd_001']
+
+
+@BUILD.stage('master')
+def build_master():
+    """master组、世界控制器及显示属性"""
+    # 创建一个顶级空组
+    master_group = cmds.group(em=True, name='master')
+    if not SCENE_INDEX.exists('master'):
+        raise ValueError("master组创建失败")
 
+    # 遍历属性字典并添加属性
+    for attr, config in master_attributes.items():
+        add_attribute('master', attr, config)
+
+    # 锁定并隐藏不需要的属性
+    all_attributes = cmds.listAttr('master', visible=True, keyable=True, scalar=True) or []
+    for attr in all_attributes:
+        if attr not in master_attributes:
+            cmds.setAttr(f'master.{attr}', lock=True, keyable=False, channelBox=False)
+            print(f"已锁定并隐藏属性: {attr}")
+
+    # 创建组并存储到字典中
+    group_dict = {group_name: cmds.group(em=True, name=group_name) for group_name in groups}
+    for group in group_dict.values():
+        cmds.parent(group, master_group)
+
+    # 启用 geometry 组的 overrideEnabled 属性
+    cmds.setAttr('geometry.overrideEnabled', 1)
+
+    # 整理 master 组
+    rigNodesLocal_group = cmds.group(em=True, name='rigNodesLocal')
+    rigNodesWorld_group = cmds.group(em=True, name='rigNodesWorld')
+    cmds.parent(rigNodesLocal_group, group_dict['rigNodes'])
+    cmds.parent(rigNodesWorld_group, group_dict['rigNodes'])
+    cmds.parent('jnt_m_spine_001', group_dict['joints'])
+
+    # 用户输入模型组的名称，暂时省略
+    # resolution_groups = {}
+    # for resolution in ["Low", "Medium", "High"]:
+    #     while True:
+    #         # 使用传统的 cmds.promptDialog 调用方式
+    #         result = cmds.promptDialog(
+    #             title=f"输入 {resolution} 分辨率组",
+    #             message=f"请输入 {resolution} 分辨率模型组的名称：\n\n示例：low_res_group",
+    #             button=["确认", "取消"],
+    #             defaultButton="确认",
+    #             cancelButton="取消",
+    #             dismissString="取消"
+    #         )
+    #
+    #         if result == "取消":
+    #             raise ValueError("用户取消了操作。")
+    #
+    #         # 获取用户输入的组名称
+    #         group_name = cmds.promptDialog(query=True, text=True)
+    #
+    #         # 检查输入的组是否存在
+    #         if cmds.objExists(group_name):
+    #             resolution_groups[resolution] = group_name
+    #             print(f"{resolution} 分辨率模型组已设置为: {group_name}")
+    #             break
+    #         else:
+    #             cmds.warning(f"组 '{group_name}' 不存在！请重新输入。")
+
+    ##############################################################################################
+    # 硬编码生成模型组
+
+    resolution_groups = {
+        "Low": "grp_m_low_body_001",
+        "Medium": "grp_m_mid_body_001",
+        "High": "grp_m_high_body_001"
+    }
+
+    # 验证组是否存在
+    for resolution, group_name in resolution_groups.items():
+        if not SCENE_INDEX.exists(group_name):
+            cmds.warning(f"组 '{group_name}' 不存在！请检查场景。")
+        else:
+            print(f"{resolution} 分辨率模型组已设置为: {group_name}")
+
+    ##############################################################################################
+
+    # 遍历 master_attributes 字典，将 master 的属性连接到对应的组
+    for attr, config in master_attributes.items():
+        if attr == "resolution":
+            for i, resolution in enumerate(["Low", "Medium", "High"]):
+                target_group = resolution_groups[resolution]
+                cmds.parent(target_group, 'geometry')
+                condition_node = cmds.createNode('condition', name=f'resolution_{resolution}_condition')
+                cmds.setAttr(f'{condition_node}.firstTerm', i)
+                cmds.setAttr(f'{condition_node}.secondTerm', i)
+                cmds.setAttr(f'{condition_node}.operation', 0)
+                cmds.setAttr(f'{condition_node}.colorIfTrueR', 1)
+                cmds.setAttr(f'{condition_node}.colorIfFalseR', 0)
+                cmds.connectAttr(f'master.resolution', f'{condition_node}.firstTerm')
+                cmds.connectAttr(f'{condition_node}.outColorR', f'{target_group}.visibility')
+                print(f"已连接属性: master.resolution -> {condition_node}.firstTerm -> {target_group}.visibility")
+        else:
+            source_attr = f"master.{attr}"
+            target_attr = f"{config['target_group']}.{config['target_attribute']}"
+            if SCENE_INDEX.exists(target_attr.split('.')[0]) and cmds.attributeQuery(config['target_attribute'],
+                                                                                 node=config['target_group'], exists=True):
+                cmds.connectAttr(source_attr, target_attr)
+                print(f"已连接属性: {source_attr} -> {target_attr}")
+            else:
+                print(f"目标属性不存在: {target_attr}")
+
+    # 创建世界控制器
+    circle = cmds.circle(name="ctrl_m_world_001", nr=(0, 1, 0), r=65)[0]
+    cmds.delete(circle, constructionHistory=True)
+    zero_m_world_group = cmds.group(em=True, name='zero_m_world_001')
+    cmds.parent(circle, zero_m_world_group)
+    cmds.parent(zero_m_world_group, group_dict['controls'])
+
+    # 世界控制器进行父子与缩放约束
+    cmds.parentConstraint('|master|controls|zero_m_world_001|ctrl_m_world_001', '|master|rigNodes|rigNodesLocal')
+    cmds.scaleConstraint('|master|controls|zero_m_world_001|ctrl_m_world_001', '|master|rigNodes|rigNodesLocal')
+    cmds.parentConstraint('|master|controls|zero_m_world_001|ctrl_m_world_001', '|master|joints')
+    cmds.scaleConstraint('|master|controls|zero_m_world_001|ctrl_m_world_001', '|master|joints')
+
+    # 锁定并隐藏master组的子组的所有属性
+    for group in groups:
+        all_attributes = cmds.listAttr(group, visible=True, keyable=True) or []
+        for attr in all_attributes:
+            cmds.setAttr(f'{group}.{attr}', lock=True, keyable=False, channelBox=False)
+
+
+@BUILD.stage('spine', inputs=['jnt_m_spine_*', 'jnt_?_upperLeg_001', 'jnt_?_clavicle_001'], depends=['master'])
+def build_spine():
+    """胸腔控制器与脊柱splineIk"""
+    # 胸腔控制器创建
+
+    create_controls([
+        dict(description='cog', shape='octagon', size=50, match_type='position',
+             match_target='|master|joints|jnt_m_spine_001', scale_factor=1),
+        dict(description='pelvisIk', shape='cube', size=35, match_type='position',
+             match_target='|master|joints|jnt_m_spine_001'),
+        dict(description='chestIk', shape='cube', size=35, match_type='position',
+             match_target='|master|joints|jnt_m_spine_001|jnt_m_spine_002|jnt_m_spine_003'
+                          '|jnt_m_spine_004|jnt_m_spine_005'),
+        dict(description='pelvisLocal', shape='circleY', parent='output_m_pelvisIk_001', size=1, match_type='position',
+             match_target='|master|joints|jnt_m_spine_001', scale_factor=25),
+        dict(description='spineIkBendA', shape='square', size=1, match_type='position',
+             match_target='jnt_m_spine_002', scale_factor=25),
+        dict(description='spineIkBendB', shape='square', parent='output_m_spineIkBendA_001', size=1,
+             match_type='position', match_target='jnt_m_spine_003', scale_factor=25),
+        dict(description='spineIkBendC', shape='square', parent='output_m_spineIkBendB_001', size=1,
+             match_type='position', match_target='jnt_m_spine_004', scale_factor=25),
+    ])
+
+    cmds.parent('jnt_l_upperLeg_001', world=True)
+    cmds.parent('jnt_r_upperLeg_001', world=True)
+    cmds.parent('jnt_l_clavicle_001', world=True)
+    cmds.parent('jnt_r_clavicle_001', world=True)
+
+
+
+    # 胸腔splineIk曲线创建
+    joints = ['jnt_m_spine_001', 'jnt_m_spine_002', 'jnt_m_spine_003', 'jnt_m_spine_004', 'jnt_m_spine_005',
+              'jnt_m_spine_006']
+    curve_name = 'crv_m_spineIk_001'
+    ik_handle_name = 'ikHnd_m_spineIk_001'
+    start_joint = 'jnt_m_spine_001'
+    end_joint = 'jnt_m_spine_005'
+    new_joint_1_name = 'jnt_m_pelvisIkCrv_001'
+    new_joint_2_name = 'jnt_m_chestIkCrv_001'
+
+    create_spine_ik(joints, curve_name, ik_handle_name, start_joint, end_joint, new_joint_1_name, new_joint_2_name)
+
+    cmds.parent('jnt_l_upperLeg_001', 'jnt_m_spine_001')
+    cmds.parent('jnt_r_upperLeg_001', 'jnt_m_spine_001')
+
+    # 胸腔控制器绑定
+    # 脊柱Ik关节控制器归位
+    cmds.parent('jnt_m_pelvisIkCrv_001', 'output_m_pelvisIk_001')
+    cmds.parent('jnt_m_chestIkCrv_001', 'output_m_chestIk_001')
+
+    # 创建用于IK扭转控制的定位器
+    chestIkTwist = cmds.spaceLocator(name='loc_m_chestIkTwist_001')[0]
+    pelvisIkTwist = cmds.spaceLocator(name='loc_m_pelvisIkTwist_001')[0]
+    chestIkTwist_group = cmds.group(em=True, name='zero_m_chestIkTwist_001')
+    pelvisIkTwist_group = cmds.group(em=True, name='zero_m_pelvisIkTwist_001')
+    cmds.parent(chestIkTwist, chestIkTwist_group)
+    cmds.parent(pelvisIkTwist, pelvisIkTwist_group)
+    cmds.matchTransform(chestIkTwist_group, 'jnt_m_spine_006', position=True, rotation=True)
+    cmds.matchTransform(pelvisIkTwist_group, 'jnt_m_spine_001', position=True, rotation=True)
+    cmds.parent(chestIkTwist_group, 'output_m_chestIk_001')
+    cmds.parent(pelvisIkTwist_group, 'output_m_pelvisIk_001')
+
+    # 设置IK手柄的扭转控制参数
+    cmds.setAttr("ikHnd_m_spineIk_001.dTwistControlEnable", 1)
+    cmds.setAttr("ikHnd_m_spineIk_001.dWorldUpType", 4)
+    # 连接定位器的世界矩阵到IK手柄属性
+    cmds.connectAttr('loc_m_pelvisIkTwist_001.worldMatrix[0]', 'ikHnd_m_spineIk_001.dWorldUpMatrix')
+    cmds.connectAttr('loc_m_chestIkTwist_001.worldMatrix[0]', 'ikHnd_m_spineIk_001.dWorldUpMatrixEnd')
+
+    # 清除当前选择
+    cmds.select(clear=True)
+
+    # 创建骨盆局部关节并匹配到脊椎起始位置
+    jnt_pelvisLocal = cmds.joint(name='jnt_m_pelvisLocal_001', position=(0, 0, 0))
+    cmds.matchTransform(jnt_pelvisLocal, 'jnt_m_spine_001', position=True, rotation=True)
+
+    # 设置骨盆局部控制约束
+    cmds.parentConstraint('output_m_pelvisLocal_001', '|master|rigNodes|rigNodesLocal')
+    cmds.setAttr('ctrl_m_pelvisLocal_001.translate', lock=True, keyable=False, channelBox=False)
+
+    # 约束骨盆局部关节到输出节点
+    cmds.parentConstraint('output_m_pelvisLocal_001', 'jnt_m_pelvisLocal_001')
+
+    # 设置骨盆局部关节的层级关系
+    cmds.parent('jnt_m_pelvisLocal_001', 'jnt_m_spine_001')
+    cmds.parent('jnt_l_upperLeg_001', 'jnt_m_pelvisLocal_001')
+    cmds.parent('jnt_r_upperLeg_001', 'jnt_m_pelvisLocal_001')
+    cmds.parent('jnt_l_clavicle_001', 'jnt_m_spine_006')
+    cmds.parent('jnt_r_clavicle_001', 'jnt_m_spine_006')
+
+    # 添加骨盆IK控制器的可见性属性
+    cmds.addAttr('ctrl_m_pelvisIk_001', longName='localCtrlVis', attributeType='bool', defaultValue=0, keyable=True)
+
+    # 连接可见性属性到骨盆局部控制组的可见性
+    cmds.connectAttr('ctrl_m_pelvisIk_001.localCtrlVis', 'zero_m_pelvisLocal_001.visibility')
+
+    # 胸腔控制器整理
+    cmds.parent('zero_m_chestIk_001', 'output_m_spineIkBendC_001')
+    cmds.parent('zero_m_cog_001', 'ctrl_m_world_001')
+    cmds.parent('zero_m_pelvisIk_001', 'output_m_cog_001')
+    cmds.parent('zero_m_spineIkBendA_001', 'output_m_cog_001')
+    cmds.parent('crv_m_spineIk_001', 'rigNodesWorld')
+    cmds.parent('ikHnd_m_spineIk_001', 'rigNodesLocal')
+
+
+@BUILD.stage('neck', inputs=['jnt_m_neck_*', 'jnt_m_headLocal_001'], depends=['spine'])
+def build_neck():
+    """头部控制器与颈部splineIk"""
+    # 创建头部Ik控制器
+    create_controls([
+        dict(description='headIk', shape='cube', size=1, match_type='position',
+             match_target='jnt_m_neck_005', scale_factor=20),
+        dict(description='headIkLocal', shape='headLocal', size=1, match_type='transform',
+             match_target='jnt_m_neck_005', scale_factor=15),
+        dict(description='headIkBendA', shape='square', size=1, match_type='position',
+             match_target='jnt_m_neck_002', scale_factor=10),
+        dict(description='headIkBendB', shape='square', parent='output_m_headIkBendA_001', size=1,
+             match_type='position', match_target='jnt_m_neck_003', scale_factor=10),
+    ])
+    cmds.addAttr('ctrl_m_headIk_001', longName='localCtrlVis', attributeType='bool', defaultValue=0, keyable=True)
+    cmds.connectAttr('ctrl_m_headIk_001.localCtrlVis', 'zero_m_headIkLocal_001.visibility')
+
+    cmds.setAttr('zero_m_headIkBendA_001.rotateX', 17)
+
+    cmds.parent('jnt_m_neck_001', world=True)
+    joints = ['jnt_m_neck_001', 'jnt_m_neck_002', 'jnt_m_neck_003', 'jnt_m_neck_004', 'jnt_m_neck_005']
+    curve_name = 'crv_m_neckIk_001'
+    ik_handle_name = 'ikHnd_m_neckIk_001'
+    start_joint = 'jnt_m_neck_001'
+    end_joint = 'jnt_m_neck_005'
+    neck_joint_1_name = 'jnt_m_neckIkCrv_001'
+    neck_joint_2_name = 'jnt_m_headIkCrv_001'
+    print(-1)
+    create_spine_ik(joints, curve_name, ik_handle_name, start_joint, end_joint, neck_joint_1_name, neck_joint_2_name)
+
+    cmds.parent('jnt_m_headIkCrv_001', 'output_m_headIk_001')
+    cmds.parent('jnt_m_neckIkCrv_001', 'jnt_m_spine_006')
+    cmds.orientConstraint('output_m_headIkLocal_001', 'jnt_m_headLocal_001')
+    cmds.pointConstraint('jnt_m_neck_005', 'driven_m_headIkLocal_001')
+    cmds.orientConstraint('output_m_headIk_001', 'driven_m_headIkLocal_001', maintainOffset=True)
+
+    neckIkTwist = cmds.spaceLocator(name='loc_m_neckIkTwist_001')[0]
+    headIkTwist = cmds.spaceLocator(name='loc_m_headIkTwist_001')[0]
+    neckIkTwist_group = cmds.group(em=True, name='zero_m_neckIkTwist_001')
+    headIkTwist_group = cmds.group(em=True, name='zero_m_headIkTwist_001')
+    cmds.parent(neckIkTwist, neckIkTwist_group)
+    cmds.parent(headIkTwist, headIkTwist_group)
+    cmds.matchTransform(neckIkTwist_group, 'jnt_m_neck_001', position=True, rotation=True)
+    cmds.matchTransform(headIkTwist_group, 'jnt_m_neck_005', position=True, rotation=True)
+    cmds.parent(neckIkTwist_group, 'jnt_m_spine_006')
+    cmds.parent(headIkTwist_group, 'output_m_headIk_001')
+
+    # 设置IK手柄的扭转控制参数
+    cmds.setAttr("ikHnd_m_neckIk_001.dTwistControlEnable", 1)
+    cmds.setAttr("ikHnd_m_neckIk_001.dWorldUpType", 4)
+    # 连接定位器的世界矩阵到IK手柄属性
+    cmds.connectAttr('loc_m_neckIkTwist_001.worldMatrix[0]', 'ikHnd_m_neckIk_001.dWorldUpMatrix')
+    cmds.connectAttr('loc_m_headIkTwist_001.worldMatrix[0]', 'ikHnd_m_neckIk_001.dWorldUpMatrixEnd')
+    cmds.select(clear=True)
+
+    cmds.parent('zero_m_headIk_001', 'output_m_headIkBendB_001')
+    cmds.parent('zero_m_headIkLocal_001', 'output_m_headIk_001')
+    cmds.parent('jnt_m_neck_001', 'jnt_m_spine_006')
+
+    chestCtrls_group = cmds.group(em=True, name='grp_m_chestCtrls_001')
+    cmds.parentConstraint('jnt_m_spine_006', 'grp_m_chestCtrls_001')
+    cmds.parent('grp_m_chestCtrls_001', 'output_m_cog_001')
+    cmds.parent('zero_m_headIkBendA_001', 'grp_m_chestCtrls_001')
+    cmds.parent('crv_m_neckIk_001', 'rigNodesWorld')
+    cmds.parent('ikHnd_m_neckIk_001', 'rigNodesLocal')
+
+
+@BUILD.stage('clavicle', inputs=['jnt_?_clavicle_001', 'jnt_?_scapula_001'], depends=['neck'])
+def build_clavicle():
+    """锁骨、肩胛骨与shrug控制器"""
+    # 创建锁骨与肩胛骨控制器
+    create_controls([
+        dict(description='clavicle', side='l', shape='clavicleL', size=1, match_type='transform',
+             match_target='jnt_l_clavicle_001', scale_factor=1),
+        dict(description='clavicle', side='r', shape='clavicleR', size=1, match_type='transform',
+             match_target='jnt_r_clavicle_001', scale_factor=1),
+        dict(description='scapula', side='l', shape='scapulaL', size=1, parent='output_l_clavicle_001',
+             match_type='transform', match_target='jnt_l_scapula_001', scale_factor=1),
+        dict(description='scapula', side='r', shape='scapulaR', size=1, parent='output_r_clavicle_001',
+             match_type='transform', match_target='jnt_r_scapula_001', scale_factor=1),
+    ])
+
+    cmds.orientConstraint('output_l_clavicle_001', 'jnt_l_clavicle_001')
+    cmds.orientConstraint('output_r_clavicle_001', 'jnt_r_clavicle_001')
+    cmds.orientConstraint('output_l_scapula_001', 'jnt_l_scapula_001')
+    cmds.orientConstraint('output_r_scapula_001', 'jnt_r_scapula_001')
+    cmds.parent('zero_l_clavicle_001', 'grp_m_chestCtrls_001')
+    cmds.parent('zero_r_clavicle_001', 'grp_m_chestCtrls_001')
+
+
+    # shrug控制器创建
+    create_controls([
+        dict(description='shrug', side='l', shape='cube', size=1, match_type='position',
+             match_target='jnt_l_scapula_001', scale_factor=10),
+        dict(description='shrug', side='r', shape='cube', size=1, match_type='position',
+             match_target='jnt_r_scapula_001', scale_factor=10),
+    ])
+    cmds.parent('zero_l_shrug_001', 'zero_r_shrug_001', 'grp_m_chestCtrls_001')
+    # 创建目标约束
+    cmds.aimConstraint(
+        'output_l_shrug_001',
+        'driven_l_clavicle_001',
+        aimVector=(1, 0, 0),  # Z轴指向目标
+        upVector=(0, 1, 0),   # Y轴朝上
+        worldUpType="objectrotation",
+        worldUpVector=(0, 1, 0),
+        worldUpObject='zero_l_clavicle_001'
+    )
+    cmds.aimConstraint(
+        'output_r_shrug_001',
+        'driven_r_clavicle_001',
+        aimVector=(-1, 0, 0),  # Z轴指向目标
+        upVector=(0, 1, 0),   # Y轴朝上
+        worldUpType="objectrotation",
+        worldUpVector=(0, 1, 0),
+        worldUpObject='zero_r_clavicle_001'
+    )
 
-cmds.group(em=True, name="grp_l_fingerCtrls_001")
-cmds.select(clear=True)
-cmds.group(em=True, name="grp_r_fingerCtrls_001")
-cmds.select(clear=True)
-cmds.parentConstraint("jnt_l_wristEnd_001", "grp_l_fingerCtrls_001")
-cmds.select(clear=True)
-cmds.parentConstraint("jnt_r_wristEnd_001", "grp_r_fingerCtrls_001")
-cmds.select(clear=True)
-
-# 为左右手创建FK控制器
-for side in ['r', 'l']:  # r: 右手, l: 左手
-    for finger, parts in finger_patterns.items():
-        # 生成完整关节名，例如: jnt_r_indexMetacarpal_001
-        joints = [f'jnt_{side}_{finger}{part}' for part in parts]
-        create_fk_chain(joints, ctrl_shape='circleX', ctrl_size=1.5)
-        cmds.parent(f'zero_{side}_{finger}Metacarpal_001', f'grp_{side}_fingerCtrls_001')
-
-
-
-# 创建双手ik控制器
-create_hand_ik_system(
-    start_joint="jnt_l_upperArmIk_001",
-    mid_joint="jnt_l_elbowFk_001",
-    end_joint="jnt_l_wristIk_001",
-    wrist_end_joint="jnt_l_wristEndIk_001",
-    side="l",
-    axis="-z"
-)
-create_hand_ik_system(
-    start_joint="jnt_r_upperArmIk_001",
-    mid_joint="jnt_r_elbowFk_001",
-    end_joint="jnt_r_wristIk_001",
-    wrist_end_joint="jnt_r_wristEndIk_001",
-    side="r",
-    axis="z"
-)
-
-# 创建双腿ik控制器
-create_leg_ik_system(
-    start_joint="jnt_l_upperLegIk_001",
-    mid_joint="jnt_l_kneeFk_001",
-    end_joint="jnt_l_ankleIk_001",
-    ball_joint="jnt_l_ballIk_001",
-    toe_joint="jnt_l_toeEndIk_001",
-    side="l",
-    axis="y"
-)
-
-create_leg_ik_system(
-    start_joint="jnt_r_upperLegIk_001",
-    mid_joint="jnt_r_kneeFk_001",
-    end_joint="jnt_r_ankleIk_001",
-    ball_joint="jnt_r_ballIk_001",
-    toe_joint="jnt_r_toeEndIk_001",
-    side="r",
-    axis="-y"
-)
-
-
-# 创建ikFkBlend控制器
-for side, x_pos in [('l', 30), ('r', -30)]:
-    # 创建手部和腿部的控制器
-    for part, y_pos, z_pos in [('arm', 160, -10), ('leg', 94, 0)]:
-        ctrl_name = 'ctrl_{}_{}IkFkBlend_001'.format(side, part)
-        zero_name = 'zero_{}_{}IkFkBlend_001'.format(side, part)
-        # 创建控制器和组
-        create_curve(ctrl_name, 'cross')
-        cmds.group(em=True, name=zero_name)
-        cmds.parent(ctrl_name, zero_name)
-        cmds.move(x_pos, y_pos, z_pos, zero_name, absolute=True)
-        set_controller_color(ctrl_name, side=side)
-        cmds.rename(cmds.listRelatives(ctrl_name, shapes=True)[0], ctrl_name + 'Shape')
-        # 设置控制器属性
-        for attr in cmds.listAttr(ctrl_name, visible=True, keyable=True) or []:
-            cmds.setAttr(f'{ctrl_name}.{attr}', lock=True, keyable=False, channelBox=False)
-        cmds.addAttr(ctrl_name, longName="ikFkBlend", attributeType="float", minValue=0, maxValue=1,
-                     defaultValue=0, keyable=True)
-
-# 设置ikFkBlend系统
-setup_ik_fk_switch(side='l')
-setup_ik_fk_switch(side='r')
-
-# 设置脚部细化操作
-cmds.select(clear=True)
-
-cmds.joint(n='jntRvs_l_toeTapIk_001')
-cmds.matchTransform('jntRvs_l_toeTapIk_001', 'jnt_l_ball_001', position=True, rotation=False)
-
-cmds.select(clear=True)
-
-cmds.joint(n='jntRvs_l_toeTapIk_002')
-cmds.matchTransform('jntRvs_l_toeTapIk_002', 'jnt_l_toeEnd_001', position=True, rotation=False)
-cmds.parent('jntRvs_l_toeTapIk_002', 'jntRvs_l_toeTapIk_001')
-orient_joint_chain('jntRvs_l_toeTapIk_001', orient_order="xyz", secondary_axis_orient="yup")
-
-cmds.select(clear=True)
-
-cmds.joint(n='jntRvs_l_ballIk_001')
-cmds.matchTransform('jntRvs_l_ballIk_001', 'jnt_l_ball_001', position=True, rotation=False)
-
-cmds.select(clear=True)
-
-cmds.joint(n='jntRvs_l_ballIk_002')
-cmds.matchTransform('jntRvs_l_ballIk_002', 'jnt_l_ankle_001', position=True, rotation=False)
-cmds.parent('jntRvs_l_ballIk_002', 'jntRvs_l_ballIk_001')
-orient_joint_chain('jntRvs_l_ballIk_001', orient_order="xyz", secondary_axis_orient="yup")
-
-cmds.select(clear=True)
-
-cmds.parent('jntRvs_l_footInnPivot_001', 'jntRvs_l_footOutPivot_001')
-orient_joint_chain('jntRvs_l_footOutPivot_001', orient_order="xyz", secondary_axis_orient="yup")
-cmds.parent('jntRvs_l_footInnPivot_001', world=True)
-cmds.parent('jntRvs_l_footOutPivot_001', 'jntRvs_l_footInnPivot_001')
-orient_joint_chain('jntRvs_l_footInnPivot_001', orient_order="xyz", secondary_axis_orient="yup")
-cmds.parent('jntRvs_l_footOutPivot_001', world=True)
-
-cmds.parent('jntRvs_l_toePivot_001', 'jntRvs_l_heelPivot_001')
-orient_joint_chain('jntRvs_l_heelPivot_001', orient_order="xyz", secondary_axis_orient="yup")
-cmds.parent('jntRvs_l_toePivot_001', world=True)
-cmds.parent('jntRvs_l_heelPivot_001', 'jntRvs_l_toePivot_001')
-orient_joint_chain('jntRvs_l_toePivot_001', orient_order="xyz", secondary_axis_orient="yup")
-cmds.parent('jntRvs_l_heelPivot_001', world=True)
-
-cmds.parent('jntRvs_l_ballIk_001', 'jntRvs_l_footInnPivot_001')
-cmds.parent('jntRvs_l_toeTapIk_001', 'jntRvs_l_footInnPivot_001')
-cmds.parent('jntRvs_l_footInnPivot_001', 'jntRvs_l_footOutPivot_001')
-cmds.parent('jntRvs_l_footOutPivot_001', 'jntRvs_l_toePivot_001')
-cmds.parent('jntRvs_l_toePivot_001', 'jntRvs_l_heelPivot_001')
-
-# 镜像脚部定位关节链
-cmds.mirrorJoint('jntRvs_l_heelPivot_001', mirrorBehavior=True, mirrorYZ=True, searchReplace=['_l_', '_r_'])
-
-setup_foot(side='l')  # 设置左脚
-setup_foot(side='r')  # 设置右脚
-
-# 隐藏ikFk关节链
-cmds.hide('jnt_?_upperArm??_001', 'jnt_?_upperLeg??_001', 'ikHnd_*_*_001')
-
-# 调整层级结构
-cmds.parent('jnt_l_upperArm?k_001', 'jnt_l_scapula_001')
-cmds.parent('jnt_r_upperArm?k_001', 'jnt_r_scapula_001')
-cmds.parent('zero_l_upperArmFk_001', 'output_l_scapula_001')
-cmds.parent('zero_r_upperArmFk_001', 'output_r_scapula_001')
-cmds.parent('jnt_?_upperLeg?k_001', 'jnt_m_pelvisLocal_001')
-cmds.group(em=True, n='grp_m_pelvisLocalCtrls_001')
-cmds.parentConstraint('jnt_m_pelvisLocal_001', 'grp_m_pelvisLocalCtrls_001')
-cmds.parent('grp_m_pelvisLocalCtrls_001', 'output_m_cog_001')
-cmds.parent('zero_?_upperLegFk_001', 'grp_m_pelvisLocalCtrls_001')
-cmds.parent('grp_?_fingerCtrls_001', 'output_m_cog_001')
-cmds.parent('zero_?_elbowIkGuide_001', 'output_m_cog_001')
-cmds.parent('crv_?_elbowIkGuide_001', 'output_m_cog_001')
-cmds.parent('zero_?_handIk_001', 'output_m_cog_001')
-cmds.parent('zero_?_kneeIkGuide_001', 'output_m_cog_001')
-cmds.parent('crv_?_kneeIkGuide_001', 'output_m_cog_001')
-cmds.parent('zero_?_ankleIk_001', 'output_m_cog_001')
-cmds.parent('zero_?_armIkFkBlend_001', 'grp_m_chestCtrls_001')
-cmds.parent('zero_?_legIkFkBlend_001', 'output_m_cog_001')
-cmds.parent('zero_l_heelPivot_001', 'output_l_ankleIk_001')
-cmds.parent('zero_r_heelPivot_001', 'output_r_ankleIk_001')
-
-# 设置指引线属性，防止double transform
-cmds.setAttr('crv_l_kneeIkGuide_001.inheritsTransform', 0)
-cmds.setAttr('crv_r_kneeIkGuide_001.inheritsTransform', 0)
-cmds.setAttr('crv_l_elbowIkGuide_001.inheritsTransform', 0)
-cmds.setAttr('crv_r_elbowIkGuide_001.inheritsTransform', 0)
-cmds.setAttr('crv_l_kneeIkGuide_001.translate', 0, 0, 0)
-cmds.setAttr('crv_r_kneeIkGuide_001.translate', 0, 0, 0)
-cmds.setAttr('crv_l_elbowIkGuide_001.translate', 0, 0, 0)
-cmds.setAttr('crv_r_elbowIkGuide_001.translate', 0, 0, 0)
 
+@BUILD.stage('limbs', inputs=LIMB_INPUT_JOINTS, depends=['master'])
+def build_limbs():
+    """四肢IK/FK关节链与FK控制器"""
+    # 为每个部位生成左右侧的IK/FK链
+    for limb_type in ["arm", "leg"]:
+        for side in ["l", "r"]:  # 处理左右侧
+            # 获取原始链并替换侧边前缀
+            original_chain = [jnt.replace("_l_", f"_{side}_") for jnt in base_chains[limb_type]]
 
+            # 验证原始关节是否存在
+            if not all(SCENE_INDEX.exists(jnt) for jnt in original_chain):
+                print(f"Warning: {side.upper()} {limb_type} chain not found, skipping...")
+                continue
+
+            # 生成FK和IK链
+            for system_type in ["Fk", "Ik"]:
+                new_chain = duplicate_joint_chain(original_chain, system_type)
+                print(f"Created {side.upper()} {limb_type} {system_type} chain: {'|'.join(new_chain)}")
+
+                # 如果是FK链，自动创建FK控制器（排除最后一个关节）
+                if system_type == "Fk":
+                    # 排除最后一个关节（如wristEnd/toeEnd）
+                    fk_joints = new_chain[:-1]
+                    create_fk_chain(fk_joints, ctrl_shape='circleX', ctrl_size=8)
+
+
+@BUILD.stage('fingers', inputs=FINGER_INPUT_JOINTS, depends=['master'])
+def build_fingers():
+    """手指FK控制器"""
+    cmds.group(em=True, name="grp_l_fingerCtrls_001")
+    cmds.select(clear=True)
+    cmds.group(em=True, name="grp_r_fingerCtrls_001")
+    cmds.select(clear=True)
+    cmds.parentConstraint("jnt_l_wristEnd_001", "grp_l_fingerCtrls_001")
+    cmds.select(clear=True)
+    cmds.parentConstraint("jnt_r_wristEnd_001", "grp_r_fingerCtrls_001")
+    cmds.select(clear=True)
+
+    # 为左右手创建FK控制器
+    for side in ['r', 'l']:  # r: 右手, l: 左手
+        for finger, parts in finger_patterns.items():
+            # 生成完整关节名，例如: jnt_r_indexMetacarpal_001
+            joints = [f'jnt_{side}_{finger}{part}' for part in parts]
+            create_fk_chain(joints, ctrl_shape='circleX', ctrl_size=1.5)
+            cmds.parent(f'zero_{side}_{finger}Metacarpal_001', f'grp_{side}_fingerCtrls_001')
+
+
+@BUILD.stage('ik', depends=['limbs'])
+def build_ik():
+    """手臂与腿部IK系统"""
+    # 创建双手ik控制器（axis 为手臂伸直时的备用极向量方向）
+    create_hand_ik_systems([
+        dict(
+            start_joint="jnt_l_upperArmIk_001",
+            mid_joint="jnt_l_elbowFk_001",
+            end_joint="jnt_l_wristIk_001",
+            wrist_end_joint="jnt_l_wristEndIk_001",
+            side="l",
+            axis="-z"
+        ),
+        dict(
+            start_joint="jnt_r_upperArmIk_001",
+            mid_joint="jnt_r_elbowFk_001",
+            end_joint="jnt_r_wristIk_001",
+            wrist_end_joint="jnt_r_wristEndIk_001",
+            side="r",
+            axis="z"
+        ),
+    ])
+
+    # 创建双腿ik控制器
+    create_leg_ik_systems([
+        dict(
+            start_joint="jnt_l_upperLegIk_001",
+            mid_joint="jnt_l_kneeFk_001",
+            end_joint="jnt_l_ankleIk_001",
+            ball_joint="jnt_l_ballIk_001",
+            toe_joint="jnt_l_toeEndIk_001",
+            side="l",
+            axis="y"
+        ),
+        dict(
+            start_joint="jnt_r_upperLegIk_001",
+            mid_joint="jnt_r_kneeFk_001",
+            end_joint="jnt_r_ankleIk_001",
+            ball_joint="jnt_r_ballIk_001",
+            toe_joint="jnt_r_toeEndIk_001",
+            side="r",
+            axis="-y"
+        ),
+    ])
+
+
+@BUILD.stage('ikfk', depends=['ik'])
+def build_ikfk():
+    """ikFkBlend控制器与切换"""
+    # 创建ikFkBlend控制器
+    for side, x_pos in [('l', 30), ('r', -30)]:
+        # 创建手部和腿部的控制器
+        for part, y_pos, z_pos in [('arm', 160, -10), ('leg', 94, 0)]:
+            ctrl_name = 'ctrl_{}_{}IkFkBlend_001'.format(side, part)
+            zero_name = 'zero_{}_{}IkFkBlend_001'.format(side, part)
+            # 创建控制器和组
+            create_curve(ctrl_name, 'cross')
+            cmds.group(em=True, name=zero_name)
+            cmds.parent(ctrl_name, zero_name)
+            cmds.move(x_pos, y_pos, z_pos, zero_name, absolute=True)
+            set_controller_color(ctrl_name, side=side)
+            cmds.rename(cmds.listRelatives(ctrl_name, shapes=True)[0], ctrl_name + 'Shape')
+            # 设置控制器属性
+            for attr in cmds.listAttr(ctrl_name, visible=True, keyable=True) or []:
+                cmds.setAttr(f'{ctrl_name}.{attr}', lock=True, keyable=False, channelBox=False)
+            cmds.addAttr(ctrl_name, longName="ikFkBlend", attributeType="float", minValue=0, maxValue=1,
+                         defaultValue=0, keyable=True)
+
+    # 设置ikFkBlend系统
+    setup_ik_fk_switch(side='l')
+    setup_ik_fk_switch(side='r')
+
+
+@BUILD.stage('foot', inputs=['jntRvs_l_*Pivot_001', 'jnt_?_ankle_001', 'jnt_?_ball_001', 'jnt_?_toeEnd_001'],
+             depends=['ik'])
+def build_foot():
+    """反向脚关节与脚部控制器"""
+    # 设置脚部细化操作
+    cmds.select(clear=True)
+
+    cmds.joint(n='jntRvs_l_toeTapIk_001')
+    cmds.matchTransform('jntRvs_l_toeTapIk_001', 'jnt_l_ball_001', position=True, rotation=False)
+
+    cmds.select(clear=True)
+
+    cmds.joint(n='jntRvs_l_toeTapIk_002')
+    cmds.matchTransform('jntRvs_l_toeTapIk_002', 'jnt_l_toeEnd_001', position=True, rotation=False)
+    cmds.parent('jntRvs_l_toeTapIk_002', 'jntRvs_l_toeTapIk_001')
+    orient_joint_chain('jntRvs_l_toeTapIk_001', orient_order="xyz", secondary_axis_orient="yup")
+
+    cmds.select(clear=True)
+
+    cmds.joint(n='jntRvs_l_ballIk_001')
+    cmds.matchTransform('jntRvs_l_ballIk_001', 'jnt_l_ball_001', position=True, rotation=False)
+
+    cmds.select(clear=True)
+
+    cmds.joint(n='jntRvs_l_ballIk_002')
+    cmds.matchTransform('jntRvs_l_ballIk_002', 'jnt_l_ankle_001', position=True, rotation=False)
+    cmds.parent('jntRvs_l_ballIk_002', 'jntRvs_l_ballIk_001')
+    orient_joint_chain('jntRvs_l_ballIk_001', orient_order="xyz", secondary_axis_orient="yup")
+
+    cmds.select(clear=True)
 
+    # 内外侧枢轴都朝向"内侧指向外侧"，脚跟/脚尖枢轴都朝向"脚尖指向脚跟"
+    orient_joints_along([
+        (['jntRvs_l_footInnPivot_001', 'jntRvs_l_footOutPivot_001'],
+         'jntRvs_l_footInnPivot_001', 'jntRvs_l_footOutPivot_001'),
+        (['jntRvs_l_toePivot_001', 'jntRvs_l_heelPivot_001'],
+         'jntRvs_l_toePivot_001', 'jntRvs_l_heelPivot_001'),
+    ], orient_order="xyz", secondary_axis_orient="yup")
+
+    cmds.parent('jntRvs_l_ballIk_001', 'jntRvs_l_footInnPivot_001')
+    cmds.parent('jntRvs_l_toeTapIk_001', 'jntRvs_l_footInnPivot_001')
+    cmds.parent('jntRvs_l_footInnPivot_001', 'jntRvs_l_footOutPivot_001')
+    cmds.parent('jntRvs_l_footOutPivot_001', 'jntRvs_l_toePivot_001')
+    cmds.parent('jntRvs_l_toePivot_001', 'jntRvs_l_heelPivot_001')
+
+    # 镜像脚部定位关节链
+    cmds.mirrorJoint('jntRvs_l_heelPivot_001', mirrorBehavior=True, mirrorYZ=True, searchReplace=['_l_', '_r_'])
+
+    setup_foot(side='l')  # 设置左脚
+    setup_foot(side='r')  # 设置右脚
+
+
+@BUILD.stage('cleanup', depends=['spine', 'clavicle', 'limbs', 'fingers', 'ik', 'ikfk', 'foot'])
+def build_cleanup():
+    """层级整理与指引线设置"""
+    # 隐藏ikFk关节链
+    hidden = SCENE_INDEX.glob('jnt_?_upperArm??_001', 'jnt_?_upperLeg??_001', 'ikHnd_*_*_001')
+    if hidden:
+        cmds.hide(hidden)
+
+    # 调整层级结构
+    parent_matching('jnt_l_upperArm?k_001', 'jnt_l_scapula_001')
+    parent_matching('jnt_r_upperArm?k_001', 'jnt_r_scapula_001')
+    cmds.parent('zero_l_upperArmFk_001', 'output_l_scapula_001')
+    cmds.parent('zero_r_upperArmFk_001', 'output_r_scapula_001')
+    parent_matching('jnt_?_upperLeg?k_001', 'jnt_m_pelvisLocal_001')
+    cmds.group(em=True, n='grp_m_pelvisLocalCtrls_001')
+    cmds.parentConstraint('jnt_m_pelvisLocal_001', 'grp_m_pelvisLocalCtrls_001')
+    cmds.parent('grp_m_pelvisLocalCtrls_001', 'output_m_cog_001')
+    parent_matching('zero_?_upperLegFk_001', 'grp_m_pelvisLocalCtrls_001')
+    parent_matching('grp_?_fingerCtrls_001', 'output_m_cog_001')
+    parent_matching('zero_?_elbowIkGuide_001', 'output_m_cog_001')
+    parent_matching('crv_?_elbowIkGuide_001', 'output_m_cog_001')
+    parent_matching('zero_?_handIk_001', 'output_m_cog_001')
+    parent_matching('zero_?_kneeIkGuide_001', 'output_m_cog_001')
+    parent_matching('crv_?_kneeIkGuide_001', 'output_m_cog_001')
+    parent_matching('zero_?_ankleIk_001', 'output_m_cog_001')
+    parent_matching('zero_?_armIkFkBlend_001', 'grp_m_chestCtrls_001')
+    parent_matching('zero_?_legIkFkBlend_001', 'output_m_cog_001')
+    cmds.parent('zero_l_heelPivot_001', 'output_l_ankleIk_001')
+    cmds.parent('zero_r_heelPivot_001', 'output_r_ankleIk_001')
+
+    # 设置指引线属性，防止double transform
+    cmds.setAttr('crv_l_kneeIkGuide_001.inheritsTransform', 0)
+    cmds.setAttr('crv_r_kneeIkGuide_001.inheritsTransform', 0)
+    cmds.setAttr('crv_l_elbowIkGuide_001.inheritsTransform', 0)
+    cmds.setAttr('crv_r_elbowIkGuide_001.inheritsTransform', 0)
+    cmds.setAttr('crv_l_kneeIkGuide_001.translate', 0, 0, 0)
+    cmds.setAttr('crv_r_kneeIkGuide_001.translate', 0, 0, 0)
+    cmds.setAttr('crv_l_elbowIkGuide_001.translate', 0, 0, 0)
+    cmds.setAttr('crv_r_elbowIkGuide_001.translate', 0, 0, 0)
+
+
+# 执行构建，只重建有变化的阶段；FORCE_REBUILD_STAGES 中的阶段始终重建
+# 构建期间启用场景名称索引，存在性判断与通配符查询不再扫描整个场景
+with SCENE_INDEX:
+    BUILD.run(force=FORCE_REBUILD_STAGES)
+
+# 按子系统输出节点统计并检查节点预算（rig_report.FAIL_ON_NODE_BUDGET 为 True 时超出预算会使构建失败）
+node_report = build_report(BUILD_STATE_NODE)
+print(format_report(node_report))
+check_budgets(node_report)
@@ -0,0 +1,228 @@
+import maya.cmds as cmds
+import os
+import sys
+import json
+import time
+import fnmatch
+from collections import defaultdict
+
+# 视为"构建函数"的函数名匹配规则，cmds 调用归属到调用栈中最近的构建函数
+DEFAULT_BUILDER_PATTERNS = ['create_*', 'setup_*', 'build_*', 'duplicate_joint_chain', 'orient_joint_chain',
+                            'mirror_*']
+
+# 每个构建函数单次调用允许的 cmds 调用次数（包含其内部调用的其他构建函数），超出时给出警告
+# 例如 {'create_control': 60, 'create_fk_chain': 200}
+CALL_BUDGETS = {}
+
+# 预算文件，存在时覆盖 CALL_BUDGETS，可由 save_budgets() 根据一次基准运行生成
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cmds_budgets.json')
+
+TOP_LEVEL = '(top level)'
+
+
+class CmdsProfiler(object):
+    """
+    maya.cmds 调用统计
+
+    开启后替换 maya.cmds 中的所有命令，记录每次调用的命令名、次数与耗时，
+    并归属到调用栈中最近的构建函数（exclusive）；调用栈中所有构建函数同时累计 inclusive 次数。
+
+    用法:
+        with CmdsProfiler() as profiler:
+            create_fk_chain(joints)
+        print(profiler.report())
+    """
+
+    def __init__(self, patterns=None, budgets=None):
+        self.patterns = list(patterns or DEFAULT_BUILDER_PATTERNS)
+        self.budgets = dict(load_budgets() if budgets is None else budgets)
+        self._originals = {}
+        self._builder_names = {}  # code对象 -> 构建函数名（不是构建函数时为 None）
+        self.reset()
+
+    def reset(self):
+        """清空统计数据"""
+        # stats[builder][command] = [次数, 累计秒数]
+        self.stats = defaultdict(lambda: defaultdict(lambda: [0, 0.0]))
+        self.inclusive_calls = defaultdict(int)
+        self.inclusive_time = defaultdict(float)
+        self.invocations = defaultdict(int)
+        self._active_frames = {}
+
+    @property
+    def active(self):
+        return bool(self._originals)
+
+    def _builder_name(self, code):
+        name = self._builder_names.get(code, False)
+        if name is False:
+            name = code.co_name if any(fnmatch.fnmatchcase(code.co_name, p) for p in self.patterns) else None
+            self._builder_names[code] = name
+        return name
+
+    def _builder_stack(self, frame):
+        """返回调用栈中的构建函数（由内到外），同时统计构建函数的调用次数"""
+        builders = []
+        while frame is not None:
+            name = self._builder_name(frame.f_code)
+            if name is not None and name not in builders:
+                builders.append(name)
+                # 持有帧对象以区分同一函数的不同次调用
+                if self._active_frames.get(name) is not frame:
+                    self._active_frames[name] = frame
+                    self.invocations[name] += 1
+            frame = frame.f_back
+        return builders
+
+    def _wrap(self, command_name, command):
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            builders = profiler._builder_stack(sys._getframe(1))
+            start = time.perf_counter()
+            try:
+                return command(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                entry = profiler.stats[builders[0] if builders else TOP_LEVEL][command_name]
+                entry[0] += 1
+                entry[1] += elapsed
+                for name in builders:
+                    profiler.inclusive_calls[name] += 1
+                    profiler.inclusive_time[name] += elapsed
+
+        wrapper.__name__ = command_name
+        wrapper.__doc__ = getattr(command, '__doc__', None)
+        return wrapper
+
+    def start(self):
+        """开始统计，替换 maya.cmds 中的命令"""
+        if self.active:
+            return
+        for name in dir(cmds):
+            if name.startswith('_'):
+                continue
+            command = getattr(cmds, name)
+            if callable(command) and not isinstance(command, type):
+                self._originals[name] = command
+                setattr(cmds, name, self._wrap(name, command))
+
+    def stop(self):
+        """停止统计，还原 maya.cmds 中的命令"""
+        for name, command in self._originals.items():
+            setattr(cmds, name, command)
+        self._originals = {}
+        self._active_frames = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+        return False
+
+    def to_dict(self):
+        """
+        统计结果
+
+        Returns:
+            dict: {'builders': {构建函数: {'invocations', 'calls', 'time', 'inclusive_calls',
+                   'inclusive_time', 'commands': {命令: {'calls', 'time'}}}}, 'total_calls', 'total_time'}
+        """
+        builders = {}
+        for name in set(self.stats) | set(self.inclusive_calls):
+            commands = self.stats.get(name, {})
+            builders[name] = {
+                'invocations': self.invocations.get(name, 0),
+                'calls': sum(count for count, _ in commands.values()),
+                'time': sum(seconds for _, seconds in commands.values()),
+                'inclusive_calls': self.inclusive_calls.get(name, 0),
+                'inclusive_time': self.inclusive_time.get(name, 0.0),
+                'commands': {cmd: {'calls': count, 'time': seconds}
+                             for cmd, (count, seconds) in sorted(commands.items(), key=lambda i: -i[1][1])},
+            }
+        return {
+            'builders': builders,
+            'total_calls': sum(info['calls'] for info in builders.values()),
+            'total_time': sum(info['time'] for info in builders.values()),
+        }
+
+    def to_json(self, path=None):
+        """将统计结果输出为 json 字符串，指定 path 时同时写入文件"""
+        data = json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            print(f"cmds 调用统计已保存: {path}")
+        return data
+
+    def report(self, top=10):
+        """
+        生成文本表格
+
+        Args:
+            top (int): 每个构建函数显示耗时最多的命令数量
+
+        Returns:
+            str: 表格文本
+        """
+        data = self.to_dict()
+        lines = [f"{'构建函数':<30}{'调用':>6}{'cmds':>8}{'cmds/次':>10}{'含子函数':>10}{'耗时(ms)':>12}", '-' * 76]
+        ordered = sorted(data['builders'].items(), key=lambda i: -max(i[1]['inclusive_time'], i[1]['time']))
+        for name, info in ordered:
+            per_call = info['inclusive_calls'] / info['invocations'] if info['invocations'] else 0.0
+            elapsed = max(info['inclusive_time'], info['time']) * 1000
+            lines.append(f"{name:<30}{info['invocations']:>6}{info['calls']:>8}{per_call:>10.1f}"
+                         f"{info['inclusive_calls']:>10}{elapsed:>12.1f}")
+            for cmd, cmd_info in list(info['commands'].items())[:top]:
+                lines.append(f"    {cmd:<26}{'':>6}{cmd_info['calls']:>8}{'':>20}{cmd_info['time'] * 1000:>12.1f}")
+        lines.append('-' * 76)
+        lines.append(f"总计: {data['total_calls']} 次 cmds 调用, {data['total_time'] * 1000:.1f} ms")
+        return '\n'.join(lines)
+
+    def check_budgets(self, budgets=None):
+        """
+        检查构建函数单次调用的 cmds 调用次数是否超出预算
+
+        Returns:
+            list: [(构建函数, 实际单次调用次数, 预算)]
+        """
+        budgets = self.budgets if budgets is None else budgets
+        violations = []
+        for name, budget in budgets.items():
+            invocations = self.invocations.get(name, 0)
+            if not invocations:
+                continue
+            per_call = self.inclusive_calls.get(name, 0) / invocations
+            if per_call > budget:
+                violations.append((name, per_call, budget))
+                cmds.warning(f"{name} 单次调用使用了 {per_call:.1f} 次 cmds 调用，超出预算 {budget}")
+        return violations
+
+
+def load_budgets(path=BUDGET_FILE):
+    """读取预算文件，文件不存在时返回 CALL_BUDGETS"""
+    if not os.path.exists(path):
+        return dict(CALL_BUDGETS)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_budgets(profiler, path=BUDGET_FILE, margin=1.2):
+    """
+    以一次运行的统计结果为基准生成预算文件
+
+    Args:
+        profiler (CmdsProfiler): 已完成统计的实例
+        margin (float): 允许的增长比例
+    """
+    budgets = {}
+    for name, calls in profiler.inclusive_calls.items():
+        invocations = profiler.invocations.get(name, 0)
+        if invocations:
+            budgets[name] = int(calls / invocations * margin) + 1
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(budgets, f, indent=2, sort_keys=True)
+    print(f"已保存 {len(budgets)} 个构建函数的调用预算: {path}")
+    return budgets
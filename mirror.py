@@ -1,72 +1,363 @@
 import maya.cmds as cmds
+import time
+import numpy as np
+from collections import Counter, defaultdict
+from rig_math import get_world_matrices, remove_scale, plane_mirror_matrix
 
+# 镜像平面: None 为世界 YZ 平面，也可以是节点名称（例如 'ctrl_m_world_001'）或 4x4 世界矩阵
+MIRROR_PLANE = None
+# 镜像平面法线对应的平面局部轴
+MIRROR_AXIS = 'x'
+# 'world' 关于镜像平面镜像；'local' 相对每个控制器的 zero_* 父级镜像
+MIRROR_SPACES = ('world', 'local')
+MIRROR_SPACE = 'world'
+# local 方式下在源 zero_* 空间中应用的缩放
+LOCAL_MIRROR_SCALE = (-1.0, -1.0, -1.0)
 
-def mirror_curve_cv_positions():
-    """镜像NURBS曲线控制点位置，支持_l_/_r_和L_/R_命名规则"""
+# 对称检查的容差: 位置（场景单位）、朝向（角度）、缩放（比例）
+SYMMETRY_POSITION_TOLERANCE = 1e-3
+SYMMETRY_ROTATION_TOLERANCE = 0.01
+SYMMETRY_SCALE_TOLERANCE = 1e-3
+# 朝向比较方式: 'mirror' 每一对节点满足以下任一种即可（默认，空间组、极向量定位器等与世界轴对齐的节点属于后者）；
+# 'behavior' 要求右侧轴向与镜像后的左侧轴向全部相反（mirrorJoint -mirrorBehavior 的结果）；
+# 'orientation' 要求右侧轴向与左侧轴向相同（mirrorJoint 不加 -mirrorBehavior 的结果）；
+# 'any' 允许各轴向单独取反，只检查轴线是否对称
+SYMMETRY_AXIS_MODES = ('mirror', 'behavior', 'orientation', 'any')
+SYMMETRY_AXIS_MODE = 'mirror'
+
+
+def mirror_name(name):
+    """
+    返回镜像对象的名称，支持_l_/_r_和L_/R_命名规则
+
+    Args:
+        name (str): 节点名称（不含路径）
+
+    Returns:
+        str: 镜像名称，无法确定时返回 None
+    """
+    target_name = None
+    if '_l_' in name.lower():
+        target_name = name.replace('_l_', '_r_').replace('_L_', '_R_')
+    elif '_r_' in name.lower():
+        target_name = name.replace('_r_', '_l_').replace('_R_', '_L_')
+    elif name.startswith(('L_', 'l_')):
+        prefix = 'R_' if name[0] == 'L' else 'r_'
+        target_name = prefix + name[2:]
+    elif name.startswith(('R_', 'r_')):
+        prefix = 'L_' if name[0] == 'R' else 'l_'
+        target_name = prefix + name[2:]
+    return target_name if target_name != name else None
+
+
+def name_side(name):
+    """返回名称所属的一侧 'l' 或 'r'，中间对象返回 None"""
+    lower = name.lower()
+    if '_l_' in lower or lower.startswith('l_'):
+        return 'l'
+    if '_r_' in lower or lower.startswith('r_'):
+        return 'r'
+    return None
+
+
+def build_curve_pair_index():
+    """
+    用一次 ls 查询为场景中所有曲线控制器建立左右配对索引
+
+    Returns:
+        tuple: (配对 {源transform: 目标transform}, 曲线形状 {transform: [形状]})，均为完整路径
+    """
+    shapes_by_transform = defaultdict(list)
+    for shape in cmds.ls(type='nurbsCurve', long=True, noIntermediate=True) or []:
+        shapes_by_transform[shape.rsplit('|', 1)[0]].append(shape)
+
+    # 按短名称查找，重名的短名称不参与配对
+    leaf_names = Counter(path.rsplit('|', 1)[-1] for path in shapes_by_transform)
+    by_leaf = {path.rsplit('|', 1)[-1]: path for path in shapes_by_transform}
+
+    pairs = {}
+    for path in shapes_by_transform:
+        leaf = path.rsplit('|', 1)[-1]
+        target_leaf = mirror_name(leaf)
+        if target_leaf and leaf_names[leaf] == 1 and leaf_names.get(target_leaf) == 1:
+            pairs[path] = by_leaf[target_leaf]
+    return pairs, dict(shapes_by_transform)
+
+
+def resolve_mirror_plane(plane=None):
+    """
+    返回镜像平面的世界矩阵
+
+    Args:
+        plane: None（世界原点）、节点名称或 4x4 矩阵
+
+    Returns:
+        np.ndarray: (4, 4) 去除缩放的平面矩阵，None 时返回 None
+    """
+    if plane is None:
+        return None
+    if isinstance(plane, str):
+        if not cmds.objExists(plane):
+            raise ValueError(f"镜像平面节点 '{plane}' 不存在")
+        return remove_scale(get_world_matrices([plane])[0])
+    return remove_scale(np.asarray(plane, dtype=np.float64).reshape(4, 4))
+
+
+def _zero_parent(path):
+    """返回控制器路径上最近的 zero_* 父级，没有时返回直接父级（位于世界下返回 None）"""
+    parents = path.split('|')[1:-1]
+    for i in range(len(parents), 0, -1):
+        if parents[i - 1].startswith('zero_'):
+            return '|' + '|'.join(parents[:i])
+    return '|' + '|'.join(parents) if parents else None
+
+
+def _write_local_cvs(shape, points):
+    """一次 setAttr 写入曲线全部控制点（形状的局部空间）"""
+    cmds.setAttr(f"{shape}.cv[0:{len(points) - 1}]", *points.flatten().tolist())
+
+
+def mirror_transfer_matrices(pairs, plane=None, axis=None, space=None, local_scale=None):
+    """
+    批量计算每对控制器从源形状局部空间到目标形状局部空间的变换矩阵
+
+    world: Ws * inverse(P) * S * P * inverse(Wt)
+    local: Ws * inverse(Zs) * L * Zt * inverse(Wt)，Z 为 zero_* 父级，L 为 local_scale
+
+    Args:
+        pairs (list): [(源transform, 目标transform)]，完整路径
+        plane: 镜像平面，None 时使用 MIRROR_PLANE
+        axis (str): 镜像轴，None 时使用 MIRROR_AXIS
+        space (str): 'world' 或 'local'，None 时使用 MIRROR_SPACE
+        local_scale (sequence): local 方式的缩放，None 时使用 LOCAL_MIRROR_SCALE
+
+    Returns:
+        np.ndarray: (N, 4, 4)
+    """
+    space = space or MIRROR_SPACE
+    if space not in MIRROR_SPACES:
+        raise ValueError(f"无效的镜像空间 '{space}'，请使用: {', '.join(MIRROR_SPACES)}")
+    if not pairs:
+        return np.empty((0, 4, 4))
+
+    sources = [source for source, _ in pairs]
+    targets = [target for _, target in pairs]
+    nodes = sources + targets
+    if space == 'local':
+        zeros = [_zero_parent(node) for node in nodes]
+        zero_nodes = list(dict.fromkeys(zero for zero in zeros if zero))
+        nodes += zero_nodes
+    # 一次读取全部世界矩阵
+    matrices = get_world_matrices(list(dict.fromkeys(nodes)))
+    lookup = dict(zip(dict.fromkeys(nodes), matrices))
+    source_matrices = np.array([lookup[node] for node in sources])
+    target_inverses = np.linalg.inv(np.array([lookup[node] for node in targets]))
+
+    if space == 'world':
+        mirror = plane_mirror_matrix(resolve_mirror_plane(MIRROR_PLANE if plane is None else plane),
+                                     axis or MIRROR_AXIS)
+        return source_matrices @ mirror @ target_inverses
+
+    scale = np.identity(4)
+    scale[:3, :3] = np.diag(LOCAL_MIRROR_SCALE if local_scale is None else local_scale)
+    zero_matrices = np.array([lookup[zero] if zero else np.identity(4) for zero in zeros])
+    source_zeros, target_zeros = zero_matrices[:len(pairs)], zero_matrices[len(pairs):]
+    return source_matrices @ np.linalg.inv(source_zeros) @ scale @ target_zeros @ target_inverses
+
+
+def mirror_curve_pairs(pairs, shapes_by_transform, plane=None, axis=None, space=None, local_scale=None):
+    """
+    批量镜像曲线控制器形状
+
+    每条曲线只读写一次，世界矩阵一次性读取，所有控制点合并后用一次矩阵运算完成镜像。
+
+    Args:
+        pairs (dict): {源transform: 目标transform}
+        shapes_by_transform (dict): {transform: [曲线形状]}
+        plane, axis, space, local_scale: 见 mirror_transfer_matrices
+
+    Returns:
+        int: 镜像成功的控制器数量
+    """
+    valid = []
+    points, owners, target_shapes = [], [], []
+    for source, target in pairs.items():
+        sources = shapes_by_transform[source]
+        targets = shapes_by_transform[target]
+        if len(sources) != len(targets):
+            cmds.warning(f"'{source}' 与 '{target}' 的曲线数量不同，跳过")
+            continue
+        source_cvs = [np.asarray(cmds.getAttr(f"{shape}.cv[*]"), dtype=np.float64).reshape(-1, 3)
+                      for shape in sources]
+        sizes = [cmds.getAttr(f"{shape}.controlPoints", size=True) for shape in targets]
+        if sizes != [len(cvs) for cvs in source_cvs]:
+            cmds.warning(f"'{source}' 与 '{target}' 的控制点数量不同，跳过")
+            continue
+        for shape, cvs in zip(targets, source_cvs):
+            points.append(cvs)
+            owners.append(np.full(len(cvs), len(valid)))
+            target_shapes.append(shape)
+        valid.append((source, target))
+    if not valid:
+        return 0
+
+    transfers = mirror_transfer_matrices(valid, plane, axis, space, local_scale)
+    points_h = np.concatenate(points)
+    points_h = np.hstack([points_h, np.ones((len(points_h), 1))])
+    mirrored = np.einsum('ki,kij->kj', points_h, transfers[np.concatenate(owners)])[:, :3]
+
+    offset = 0
+    for shape, cvs in zip(target_shapes, points):
+        _write_local_cvs(shape, mirrored[offset:offset + len(cvs)])
+        offset += len(cvs)
+    return len(valid)
+
+
+def mirror_curve_cv_positions(plane=None, space=None):
+    """
+    镜像选中的NURBS曲线控制器形状，支持_l_/_r_和L_/R_命名规则
+
+    Args:
+        plane: 镜像平面（节点名称或 4x4 矩阵），None 时使用 MIRROR_PLANE
+        space (str): 'world' 或 'local'，None 时使用 MIRROR_SPACE
+    """
 
     # 获取选中的transform节点
-    selected_transforms = cmds.ls(selection=True, type='transform')
+    selected_transforms = cmds.ls(selection=True, type='transform', long=True)
 
     if not selected_transforms:
         cmds.warning("请选择一个或多个控制器transform节点")
         return
 
-    # 预先收集所有目标曲线，减少重复检查
-    existing_transforms = set(cmds.ls(type='transform'))
-
+    all_pairs, shapes_by_transform = build_curve_pair_index()
+    pairs = {}
     for transform in selected_transforms:
-        # 获取曲线形状节点（优化查询方式）
-        curves = cmds.listRelatives(transform, shapes=True, type='nurbsCurve', fullPath=True)
+        leaf = transform.rsplit('|', 1)[-1]
+        if transform not in shapes_by_transform:
+            cmds.warning(f"'{leaf}' 不包含NURBS曲线，跳过")
+        elif transform not in all_pairs:
+            cmds.warning(f"未找到 '{leaf}' 的镜像目标（或名称不唯一），跳过")
+        else:
+            pairs[transform] = all_pairs[transform]
 
-        if not curves:
-            cmds.warning(f"'{transform}' 不包含NURBS曲线，跳过")
-            continue
+    start_time = time.perf_counter()
+    count = mirror_curve_pairs(pairs, shapes_by_transform, plane=plane, space=space)
+    print(f"成功镜像 {count} 个控制器 ({time.perf_counter() - start_time:.3f} 秒)")
 
-        curve = curves[0]  # 使用完整路径名避免歧义
-
-        # 确定镜像目标名称（支持更多命名约定）
-        target_name = None
-        if '_l_' in transform.lower():
-            target_name = transform.replace('_l_', '_r_').replace('_L_', '_R_')
-        elif '_r_' in transform.lower():
-            target_name = transform.replace('_r_', '_l_').replace('_R_', '_L_')
-        elif transform.startswith(('L_', 'l_')):
-            prefix = 'R_' if transform[0] == 'L' else 'r_'
-            target_name = prefix + transform[2:]
-        elif transform.startswith(('R_', 'r_')):
-            prefix = 'L_' if transform[0] == 'R' else 'l_'
-            target_name = prefix + transform[2:]
-
-        if not target_name or target_name == transform:
-            cmds.warning(f"无法确定 '{transform}' 的镜像目标，跳过")
-            continue
 
-        # 检查目标是否存在（使用预先收集的集合加快检查）
-        if target_name not in existing_transforms:
-            cmds.warning(f"未找到镜像目标 '{target_name}'，跳过")
-            continue
+def mirror_all_curve_cv_positions(source_side='l', plane=None, space=None):
+    """
+    将一侧的全部曲线控制器形状镜像到另一侧
+
+    Args:
+        source_side (str): 源侧 'l'（左到右）或 'r'（右到左）
+        plane: 镜像平面，None 时使用 MIRROR_PLANE
+        space (str): 'world' 或 'local'，None 时使用 MIRROR_SPACE
+    """
+    if source_side not in ('l', 'r'):
+        raise ValueError(f"无效的源侧 '{source_side}'，请使用 'l' 或 'r'")
+
+    start_time = time.perf_counter()
+    all_pairs, shapes_by_transform = build_curve_pair_index()
+    pairs = {source: target for source, target in all_pairs.items()
+             if name_side(source.rsplit('|', 1)[-1]) == source_side}
+    count = mirror_curve_pairs(pairs, shapes_by_transform, plane=plane, space=space)
+    print(f"成功镜像 {count} 个控制器 ({source_side} → {'r' if source_side == 'l' else 'l'}，"
+          f"{time.perf_counter() - start_time:.3f} 秒)")
+
+
+def build_node_pair_index(node_type='transform', exclude_types=('constraint',)):
+    """
+    为场景中所有左侧节点建立左右配对索引（一次 ls 查询）
+
+    Args:
+        node_type (str): 参与配对的节点类型（joint 也属于 transform）
+        exclude_types (tuple): 排除的节点类型
+
+    Returns:
+        list: [(左侧节点, 右侧节点)]，完整路径，按名称排序
+    """
+    paths = cmds.ls(type=node_type, long=True) or []
+    excluded = set(cmds.ls(type=list(exclude_types), long=True) or []) if exclude_types else set()
+    leaf_names = Counter(path.rsplit('|', 1)[-1] for path in paths)
+    by_leaf = {path.rsplit('|', 1)[-1]: path for path in paths if path not in excluded}
 
-        # 获取目标曲线形状节点
-        target_curves = cmds.listRelatives(target_name, shapes=True, type='nurbsCurve', fullPath=True)
-        if not target_curves:
-            cmds.warning(f"目标 '{target_name}' 不包含NURBS曲线，跳过")
+    pairs = []
+    for leaf, path in sorted(by_leaf.items()):
+        if name_side(leaf) != 'l' or leaf_names[leaf] > 1:
             continue
+        target_leaf = mirror_name(leaf)
+        if target_leaf in by_leaf and leaf_names[target_leaf] == 1:
+            pairs.append((path, by_leaf[target_leaf]))
+    return pairs
+
+
+def audit_rig_symmetry(pairs=None, plane=None, axis=None, axis_mode=None, position_tolerance=None,
+                       rotation_tolerance=None, scale_tolerance=None):
+    """
+    检查左右节点的世界矩阵是否关于镜像平面对称
+
+    一次读取全部配对节点的世界矩阵，在 NumPy 中将左侧矩阵镜像后与右侧比较位置、轴向和缩放。
+
+    Args:
+        pairs (list): [(左侧节点, 右侧节点)]，None 时对场景中全部 _l_/_r_ 节点建立索引
+        plane: 镜像平面，None 时使用 MIRROR_PLANE
+        axis (str): 镜像轴，None 时使用 MIRROR_AXIS
+        axis_mode (str): 'mirror'、'behavior'、'orientation' 或 'any'，None 时使用 SYMMETRY_AXIS_MODE
+        position_tolerance, rotation_tolerance, scale_tolerance (float): None 时使用对应的 SYMMETRY_*_TOLERANCE
+
+    Returns:
+        list: 超出容差的配对 [{'left', 'right', 'position', 'rotation', 'scale'}]，按位置误差排序
+    """
+    axis_mode = axis_mode or SYMMETRY_AXIS_MODE
+    if axis_mode not in SYMMETRY_AXIS_MODES:
+        raise ValueError(f"无效的朝向比较方式 '{axis_mode}'，请使用: {', '.join(SYMMETRY_AXIS_MODES)}")
+    position_tolerance = SYMMETRY_POSITION_TOLERANCE if position_tolerance is None else position_tolerance
+    rotation_tolerance = SYMMETRY_ROTATION_TOLERANCE if rotation_tolerance is None else rotation_tolerance
+    scale_tolerance = SYMMETRY_SCALE_TOLERANCE if scale_tolerance is None else scale_tolerance
+
+    start_time = time.perf_counter()
+    pairs = build_node_pair_index() if pairs is None else list(pairs)
+    if not pairs:
+        print("没有找到左右配对的节点")
+        return []
 
-        target_curve = target_curves[0]
+    matrices = get_world_matrices([node for pair in pairs for node in pair]).reshape(-1, 2, 4, 4)
+    mirror = plane_mirror_matrix(resolve_mirror_plane(MIRROR_PLANE if plane is None else plane), axis or MIRROR_AXIS)
+    expected = matrices[:, 0] @ mirror
+    actual = matrices[:, 1]
 
-        # 获取所有CV点位置（优化查询方式）
-        cv_count = cmds.getAttr(f"{curve}.controlPoints", size=True)
-        cv_positions = [cmds.pointPosition(f"{curve}.cv[{i}]", world=True)
-                        for i in range(cv_count)]
+    position_error = np.linalg.norm(actual[:, 3, :3] - expected[:, 3, :3], axis=-1)
+    expected_scale = np.linalg.norm(expected[:, :3, :3], axis=-1)
+    actual_scale = np.linalg.norm(actual[:, :3, :3], axis=-1)
+    scale_error = np.max(np.abs(actual_scale - expected_scale) / np.maximum(expected_scale, 1e-8), axis=-1)
 
-        # 镜像控制点位置（X轴镜像）
-        mirrored_positions = [[-pos[0], pos[1], pos[2]] for pos in cv_positions]
+    # 每条轴向与期望轴向的夹角，取最大值；'mirror' 方式下每一对取 behavior 与 orientation 中误差较小的一种
+    expected_axes = expected[:, :3, :3] / np.maximum(expected_scale, 1e-8)[..., None]
+    actual_axes = actual[:, :3, :3] / np.maximum(actual_scale, 1e-8)[..., None]
+    left_axes = matrices[:, 0, :3, :3] / np.maximum(expected_scale, 1e-8)[..., None]
+    mirrored_dots = np.einsum('nij,nij->ni', actual_axes, expected_axes)
+    candidates = {
+        'behavior': -mirrored_dots,
+        'orientation': np.einsum('nij,nij->ni', actual_axes, left_axes),
+        'any': np.abs(mirrored_dots),
+    }
+    errors = {mode: np.degrees(np.max(np.arccos(np.clip(dots, -1.0, 1.0)), axis=-1))
+              for mode, dots in candidates.items()}
+    rotation_error = (np.minimum(errors['behavior'], errors['orientation']) if axis_mode == 'mirror'
+                      else errors[axis_mode])
 
-        # 批量设置目标CV位置（减少xform调用）
-        for i, pos in enumerate(mirrored_positions):
-            cmds.xform(f"{target_curve}.cv[{i}]", translation=pos, worldSpace=True)
+    failed = np.flatnonzero((position_error > position_tolerance) | (rotation_error > rotation_tolerance) |
+                            (scale_error > scale_tolerance))
+    failed = failed[np.argsort(-position_error[failed], kind='stable')]
+    results = [{'left': pairs[i][0], 'right': pairs[i][1], 'position': float(position_error[i]),
+                'rotation': float(rotation_error[i]), 'scale': float(scale_error[i])} for i in failed]
 
-        print(f"成功镜像: {transform} → {target_name} ({cv_count}个控制点)")
+    for result in results:
+        print(f"{result['left'].rsplit('|', 1)[-1]:<40}{result['right'].rsplit('|', 1)[-1]:<40}"
+              f"位置 {result['position']:.4f}  朝向 {result['rotation']:.3f}°  缩放 {result['scale']:.4f}")
+    print(f"对称检查: {len(pairs)} 对节点，{len(results)} 对不对称 ({time.perf_counter() - start_time:.3f} 秒)")
+    return results
 
 
 # 添加UI调用入口
@@ -79,6 +370,8 @@ def show_mirror_curve_ui():
     cmds.columnLayout(adjustableColumn=True)
     cmds.text(label="选择要镜像的曲线控制器")
     cmds.button(label="执行镜像", command=lambda x: mirror_curve_cv_positions())
+    cmds.button(label="相对 zero 父级镜像", command=lambda x: mirror_curve_cv_positions(space='local'))
+    cmds.button(label="全部左侧镜像到右侧", command=lambda x: mirror_all_curve_cv_positions('l'))
     cmds.button(label="关闭", command=lambda x: cmds.deleteUI('mirrorCurveUI'))
 
     # 非阻塞式显示窗口
@@ -0,0 +1,308 @@
+import maya.cmds as cmds
+import time
+import numpy as np
+from rig_math import get_world_matrices, plane_mirror_matrix
+from mirror import MIRROR_PLANE, MIRROR_AXIS, mirror_name, name_side, resolve_mirror_plane
+
+# 参与姿势镜像的控制器
+CONTROL_PATTERN = 'ctrl_*'
+# 需要按空间名称重新映射的枚举属性（空间切换的 space 及混合模式的 spaceB）
+SPACE_ENUM_ATTRS = ('space', 'spaceB')
+# 以时间为输入的动画曲线类型（不包含驱动关键帧）
+TIME_CURVE_TYPES = ('animCurveTL', 'animCurveTA', 'animCurveTU', 'animCurveTT')
+# 镜像后的轴与对侧轴夹角余弦低于此值时视为轴向不对齐
+AXIS_ALIGN_TOLERANCE = 0.99
+
+# build_mirror_table() 的结果，姿势和动画镜像默认使用
+MIRROR_TABLE = {}
+
+
+def _rest_frames(controls):
+    """
+    返回控制器在通道归零时的世界朝向（父级世界矩阵）{控制器: 矩阵}，一次读取
+
+    重复的控制器只计算一次，同一父级下的控制器共用一次读取；位于世界下的控制器使用单位矩阵
+    """
+    controls = list(dict.fromkeys(controls))
+    parents = {ctrl: ctrl.rsplit('|', 1)[0] for ctrl in controls}
+    unique_parents = list(dict.fromkeys(parent for parent in parents.values() if parent))
+    parent_matrices = dict(zip(unique_parents, get_world_matrices(unique_parents))) if unique_parents else {}
+    return {ctrl: parent_matrices[parent] if parent else np.identity(4) for ctrl, parent in parents.items()}
+
+
+def _read_enum(node, attr):
+    """读取枚举属性，返回 {名称: 枚举值}"""
+    entries = {}
+    index = -1
+    for token in cmds.attributeQuery(attr, node=node, listEnum=True)[0].split(":"):
+        name, _, value = token.partition("=")
+        index = int(value) if value else index + 1
+        entries[name] = index
+    return entries
+
+
+def _enum_map(source, target, attr):
+    """按空间名称建立源枚举值到目标枚举值的映射，侧向空间名称按镜像名称对应"""
+    source_entries = _read_enum(source, attr)
+    target_entries = _read_enum(target, attr)
+    mapping = {}
+    for name, value in source_entries.items():
+        target_value = target_entries.get(mirror_name(name) or name, target_entries.get(name))
+        if target_value is None:
+            cmds.warning(f"{target}.{attr} 没有空间 '{name}'，该值保持不变")
+            target_value = value
+        mapping[value] = target_value
+    return mapping
+
+
+def build_mirror_table(controls=None, plane=None, axis=None):
+    """
+    为绑定中的控制器预先计算镜像表
+
+    左右控制器按 _l_/_r_、L_/R_ 命名配对，中间控制器与自身配对。通道符号由归零姿势下的轴向决定：
+    源控制器的轴向关于镜像平面镜像后与目标控制器的同名轴同向时位移不取反、旋转取反，反向时相反；
+    缩放和其它自定义属性直接复制，space 枚举按空间名称重新映射。
+
+    Args:
+        controls (list): 控制器，None 时使用场景中全部 CONTROL_PATTERN 控制器
+        plane: 镜像平面，None 时使用 mirror.MIRROR_PLANE
+        axis (str): 镜像轴，None 时使用 mirror.MIRROR_AXIS
+
+    Returns:
+        dict: {控制器: {'target': 对侧控制器, 'side': 'l'/'r'/None, 'signs': {属性: ±1}, 'enum_maps': {属性: {值: 值}}}}
+    """
+    start_time = time.perf_counter()
+    if controls is None:
+        controls = cmds.ls(CONTROL_PATTERN, type='transform', long=True) or []
+    else:
+        controls = cmds.ls(controls, type='transform', long=True) or []
+    by_leaf = {ctrl.rsplit('|', 1)[-1]: ctrl for ctrl in controls}
+
+    pairs = []
+    for leaf, ctrl in by_leaf.items():
+        side = name_side(leaf)
+        target_leaf = mirror_name(leaf) if side else leaf
+        if target_leaf in by_leaf:
+            pairs.append((ctrl, by_leaf[target_leaf], side))
+        else:
+            cmds.warning(f"未找到 '{leaf}' 的镜像控制器，跳过")
+    if not pairs:
+        MIRROR_TABLE.clear()
+        return MIRROR_TABLE
+
+    # 行向量约定: 每行为一条局部轴，镜像后与对侧同名轴点积
+    # 每对都会以正反两个方向出现（中间控制器与自身配对），每个控制器只计算一次，按配对查表
+    frames = _rest_frames([ctrl for ctrl, _, _ in pairs] + [target for _, target, _ in pairs])
+    mirror = plane_mirror_matrix(resolve_mirror_plane(MIRROR_PLANE if plane is None else plane), axis or MIRROR_AXIS)
+    source_axes = (np.array([frames[ctrl] for ctrl, _, _ in pairs]) @ mirror)[:, :3, :3]
+    target_axes = np.array([frames[target] for _, target, _ in pairs])[:, :3, :3]
+    source_axes = source_axes / np.linalg.norm(source_axes, axis=-1, keepdims=True)
+    target_axes = target_axes / np.linalg.norm(target_axes, axis=-1, keepdims=True)
+    dots = np.einsum('nij,nij->ni', source_axes, target_axes)
+    axis_signs = np.where(dots < 0, -1, 1)
+
+    table = {}
+    for n, (ctrl, target, side) in enumerate(pairs):
+        if np.any(np.abs(dots[n]) < AXIS_ALIGN_TOLERANCE):
+            cmds.warning(f"'{ctrl.rsplit('|', 1)[-1]}' 与对侧控制器的轴向不对齐，镜像结果可能不准确")
+        target_attrs = set(cmds.listAttr(target, keyable=True, unlocked=True) or [])
+        signs, enum_maps = {}, {}
+        for attr in cmds.listAttr(ctrl, keyable=True, unlocked=True) or []:
+            if attr not in target_attrs:
+                continue
+            if attr[:-1] in ('translate', 'rotate') and attr[-1] in 'XYZ':
+                sign = int(axis_signs[n, 'XYZ'.index(attr[-1])])
+                # 旋转为轴向量，镜像时与位移的符号相反
+                signs[attr] = sign if attr.startswith('translate') else -sign
+            else:
+                signs[attr] = 1
+                if attr in SPACE_ENUM_ATTRS and cmds.attributeQuery(attr, node=ctrl, attributeType=True) == 'enum':
+                    enum_maps[attr] = _enum_map(ctrl, target, attr)
+        table[ctrl] = {'target': target, 'side': side, 'signs': signs, 'enum_maps': enum_maps}
+
+    MIRROR_TABLE.clear()
+    MIRROR_TABLE.update(table)
+    print(f"镜像表: {len(table)} 个控制器 ({time.perf_counter() - start_time:.3f} 秒)")
+    return MIRROR_TABLE
+
+
+def _mirror_entries(table, source_side):
+    """
+    按方向筛选镜像表
+
+    Args:
+        source_side (str): 'l' 左到右，'r' 右到左，None 为左右互换（中间控制器自身镜像）
+    """
+    table = table or MIRROR_TABLE or build_mirror_table()
+    if source_side not in ('l', 'r', None):
+        raise ValueError(f"无效的源侧 '{source_side}'，请使用 'l'、'r' 或 None")
+    return {ctrl: entry for ctrl, entry in table.items()
+            if (entry['side'] == source_side if source_side else True)}
+
+
+def _mirror_value(entry, attr, value):
+    if attr in entry['enum_maps']:
+        return entry['enum_maps'][attr].get(int(round(value)), value)
+    return value * entry['signs'][attr]
+
+
+def mirror_pose(source_side='l', table=None):
+    """
+    镜像当前姿势
+
+    先读取全部源通道再统一写入，因此 source_side=None 时可以同时交换左右两侧（翻转姿势）。
+
+    Args:
+        source_side (str): 'l' 左到右，'r' 右到左，None 翻转整个姿势
+        table (dict): 镜像表，None 时使用 MIRROR_TABLE（为空时自动创建）
+    """
+    entries = _mirror_entries(table, source_side)
+    values = {ctrl: {attr: cmds.getAttr(f"{ctrl}.{attr}") for attr in entry['signs']}
+              for ctrl, entry in entries.items()}
+    count = 0
+    for ctrl, entry in entries.items():
+        for attr, value in values[ctrl].items():
+            target_attr = f"{entry['target']}.{attr}"
+            if cmds.getAttr(target_attr, settable=True):
+                cmds.setAttr(target_attr, _mirror_value(entry, attr, value))
+                count += 1
+    print(f"镜像姿势: {len(entries)} 个控制器，{count} 个通道")
+
+
+def flip_pose(table=None):
+    """左右翻转当前姿势"""
+    mirror_pose(None, table)
+
+
+def _anim_curves(controls):
+    """返回 {控制器: {属性: 动画曲线}}，每个控制器一次 listConnections，驱动关键帧曲线不包含在内"""
+    curves = {}
+    for ctrl in controls:
+        connections = cmds.listConnections(ctrl, source=True, destination=False, type='animCurve',
+                                           connections=True, plugs=False) or []
+        if not connections:
+            curves[ctrl] = {}
+            continue
+        time_curves = set(cmds.ls(connections[1::2], type=TIME_CURVE_TYPES) or [])
+        curves[ctrl] = {plug.split('.', 1)[1]: curve for plug, curve in zip(connections[::2], connections[1::2])
+                        if curve in time_curves}
+    return curves
+
+
+def _remap_enum_keys(curve, mapping, time_range=None):
+    """按映射修改枚举动画曲线的关键帧值，每个目标值一次 keyframe 调用"""
+    kwargs = {'time': time_range} if time_range else {}
+    indices = cmds.keyframe(curve, query=True, indexValue=True, **kwargs) or []
+    values = np.rint(cmds.keyframe(curve, query=True, valueChange=True, **kwargs) or []).astype(int)
+    remapped = np.array([mapping.get(value, value) for value in values.tolist()], dtype=int)
+    for value in np.unique(remapped[remapped != values]):
+        index = [(int(i), int(i)) for i in np.asarray(indices)[(remapped == value) & (remapped != values)]]
+        cmds.keyframe(curve, edit=True, index=index, valueChange=float(value), absolute=True)
+
+
+def _write_static_channel(entry, attr, values, time_range, target_curve):
+    """
+    把源通道的静态值（或范围两端的值）镜像写入对侧通道
+
+    整条镜像时删除对侧原有曲线后直接 setAttr；指定范围时对侧有动画则清除范围内的关键帧，
+    在范围两端设置关键帧，对侧没有动画且两端的值相同时直接 setAttr。
+    """
+    target_attr = f"{entry['target']}.{attr}"
+    mirrored = [_mirror_value(entry, attr, value) for value in values]
+    if time_range is None:
+        if target_curve and cmds.objExists(target_curve):
+            cmds.delete(target_curve)
+        if cmds.getAttr(target_attr, settable=True):
+            cmds.setAttr(target_attr, mirrored[0])
+    elif target_curve or mirrored[0] != mirrored[-1]:
+        if target_curve:
+            cmds.cutKey(target_attr, time=time_range, clear=True)
+        for frame, value in zip(time_range, mirrored):
+            cmds.setKeyframe(target_attr, time=frame, value=value)
+    elif cmds.getAttr(target_attr, settable=True):
+        cmds.setAttr(target_attr, mirrored[0])
+
+
+def mirror_animation(source_side='l', time_range=None, table=None):
+    """
+    镜像动画曲线
+
+    源动画曲线先整条复制为缓冲，再连接（整条）或 pasteKey（指定范围）到对侧通道，
+    需要取反的通道对整条曲线或范围执行一次 scaleKey，space 枚举的关键帧按值批量重新映射，不逐帧设置。
+    没有动画的源通道把镜像后的静态值写入对侧并删除（指定范围时替换范围内的）对侧动画，
+    指定范围内没有关键帧的源曲线按其在范围两端的值写入，因此左右互换时两侧都会更新。
+
+    Args:
+        source_side (str): 'l' 左到右，'r' 右到左，None 左右互换
+        time_range (tuple): (起始帧, 结束帧)，None 时镜像整条曲线并替换对侧的动画
+        table (dict): 镜像表，None 时使用 MIRROR_TABLE
+    """
+    start_time = time.perf_counter()
+    entries = _mirror_entries(table, source_side)
+    source_curves = _anim_curves(list(entries))
+    target_curves = _anim_curves({entry['target'] for entry in entries.values()})
+
+    # 先复制全部源曲线并读取没有动画的源通道的值，左右互换时写入不会影响尚未读取的通道
+    buffers = []
+    statics = []
+    for ctrl, entry in entries.items():
+        for attr in entry['signs']:
+            curve = source_curves[ctrl].get(attr)
+            if curve:
+                buffers.append((entry, attr, curve, cmds.duplicate(curve, name=f"{curve}_mirrorBuffer")[0]))
+            else:
+                statics.append((entry, attr, [cmds.getAttr(f"{ctrl}.{attr}")]))
+
+    count = 0
+    for entry, attr, curve, buffer in buffers:
+        target = entry['target']
+        target_attr = f"{target}.{attr}"
+        if time_range is None:
+            # 对侧原有曲线已复制为缓冲（或不再需要），替换后删除
+            old_curve = target_curves.get(target, {}).get(attr)
+            cmds.connectAttr(f"{buffer}.output", target_attr, force=True)
+            if old_curve and cmds.objExists(old_curve):
+                cmds.delete(old_curve)
+            new_curve = cmds.rename(buffer, old_curve or curve.replace(*_side_swap(curve)))
+            if attr in entry['enum_maps']:
+                _remap_enum_keys(new_curve, entry['enum_maps'][attr])
+            elif entry['signs'][attr] < 0:
+                cmds.scaleKey(new_curve, valueScale=-1, valuePivot=0)
+        else:
+            try:
+                copied = cmds.copyKey(buffer, time=time_range)
+                if copied:
+                    cmds.pasteKey(target_attr, time=(time_range[0],), option='replace')
+                else:
+                    # 范围内没有关键帧: 不粘贴（剪贴板中可能是之前的数据），改为写入源曲线在范围两端的值
+                    values = [cmds.keyframe(buffer, query=True, eval=True, time=(frame, frame))[0]
+                              for frame in time_range]
+            finally:
+                cmds.delete(buffer)
+            if not copied:
+                _write_static_channel(entry, attr, values, time_range, target_curves.get(target, {}).get(attr))
+            elif attr in entry['enum_maps']:
+                _remap_enum_keys(target_attr, entry['enum_maps'][attr], time_range)
+            elif entry['signs'][attr] < 0:
+                cmds.scaleKey(target_attr, time=time_range, valueScale=-1, valuePivot=0)
+        count += 1
+
+    for entry, attr, values in statics:
+        _write_static_channel(entry, attr, values, time_range, target_curves.get(entry['target'], {}).get(attr))
+        count += 1
+    print(f"镜像动画: {count} 个通道 ({time.perf_counter() - start_time:.3f} 秒)")
+
+
+def flip_animation(time_range=None, table=None):
+    """左右翻转动画"""
+    mirror_animation(None, time_range, table)
+
+
+def _side_swap(name):
+    """返回重命名动画曲线时替换的侧向标记"""
+    for left, right in (('_l_', '_r_'), ('_L_', '_R_')):
+        if left in name:
+            return left, right
+        if right in name:
+            return right, left
+    return '', ''
@@ -0,0 +1,55 @@
+import maya.cmds as cmds
+import time
+
+
+def time_playback(pull_attrs, start=None, end=None, repeat=3):
+    """
+    逐帧切换时间并拉取属性，测量平均每帧的求值耗时
+
+    每帧调用 currentTime 后 getAttr 一次 pull_attrs，保证 DG 模式下被测网络也会被求值。
+    不同方案应拉取数量相同的属性，使 getAttr 本身的开销在对比中相互抵消。
+
+    Args:
+        pull_attrs (list): 每帧读取的属性，通常为被驱动关节链末端的 worldMatrix
+        start (float): 起始帧，None 时使用时间滑块范围
+        end (float): 结束帧，None 时使用时间滑块范围
+        repeat (int): 重复播放次数
+
+    Returns:
+        float: 平均每帧耗时（秒）
+    """
+    if start is None:
+        start = cmds.playbackOptions(query=True, minTime=True)
+    if end is None:
+        end = cmds.playbackOptions(query=True, maxTime=True)
+    frames = range(int(start), int(end) + 1)
+    if not frames:
+        raise ValueError(f"无效的帧范围: {start} - {end}")
+
+    original_time = cmds.currentTime(query=True)
+    elapsed = 0.0
+    try:
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            for frame in frames:
+                cmds.currentTime(frame, update=True)
+                for attr in pull_attrs:
+                    cmds.getAttr(attr)
+            elapsed += time.perf_counter() - start_time
+    finally:
+        cmds.currentTime(original_time, update=True)
+    return elapsed / (repeat * len(frames))
+
+
+def print_comparison(results, baseline):
+    """
+    打印各方案每帧耗时及相对 baseline 的提速
+
+    Args:
+        results (dict): {方案: 每帧秒数}
+        baseline (str): 作为基准的方案名称
+    """
+    base = results[baseline]
+    for label, per_frame in results.items():
+        speedup = base / per_frame if per_frame > 0 else float('inf')
+        print(f"{label:<16}{per_frame * 1000:>10.3f} ms/帧{speedup:>8.2f}x")
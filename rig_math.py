@@ -0,0 +1,282 @@
+import maya.api.OpenMaya as om
+import numpy as np
+
+
+def get_world_matrices(nodes, parent=False):
+    """
+    一次性读取多个节点的世界矩阵
+
+    nodes 中可以有重复的节点（或指向同一节点的不同名称），每个节点只查询一次，结果与 nodes 一一对应。
+
+    Args:
+        nodes (list): DAG 节点名称列表
+        parent (bool): 为 True 时返回各节点父级的世界矩阵（位于世界下的节点为单位矩阵）
+
+    Returns:
+        np.ndarray: (N, 4, 4) 世界矩阵，按 Maya 行向量约定（平移在第 4 行）
+    """
+    # MSelectionList 不会重复添加已在列表中的节点，因此按名称记录各自的 DAG 路径
+    selection = om.MSelectionList()
+    dag_paths = {}
+    for node in nodes:
+        if node in dag_paths:
+            continue
+        count = selection.length()
+        selection.add(node)
+        if selection.length() > count:
+            dag_paths[node] = selection.getDagPath(count)
+        else:
+            # 与已添加的节点是同一节点的另一个名称
+            single = om.MSelectionList()
+            single.add(node)
+            dag_paths[node] = single.getDagPath(0)
+
+    matrices = {node: np.array(list(dag_path.exclusiveMatrix() if parent else dag_path.inclusiveMatrix())).reshape(4, 4)
+                for node, dag_path in dag_paths.items()}
+    result = np.empty((len(nodes), 4, 4))
+    for i, node in enumerate(nodes):
+        result[i] = matrices[node]
+    return result
+
+
+def remove_scale(matrices):
+    """
+    去除矩阵中的缩放与切变，只保留旋转和平移
+
+    Args:
+        matrices (np.ndarray): (..., 4, 4) 矩阵
+
+    Returns:
+        np.ndarray: 旋转部分正交归一化后的矩阵
+    """
+    result = np.array(matrices, dtype=np.float64)
+    x = result[..., 0, :3]
+    x = x / np.linalg.norm(x, axis=-1, keepdims=True)
+    y = result[..., 1, :3]
+    z = np.cross(x, y)
+    z = z / np.linalg.norm(z, axis=-1, keepdims=True)
+    y = np.cross(z, x)
+    result[..., 0, :3] = x
+    result[..., 1, :3] = y
+    result[..., 2, :3] = z
+    result[..., :3, 3] = 0.0
+    result[..., 3, 3] = 1.0
+    return result
+
+
+def chain_local_matrices(world_matrices, root_parent_matrix=None):
+    """
+    计算链式层级中每个节点相对上一个节点的局部矩阵
+
+    Args:
+        world_matrices (np.ndarray): (N, 4, 4) 按层级顺序排列的世界矩阵
+        root_parent_matrix (np.ndarray): 第一个节点父级的世界矩阵，None 表示世界
+
+    Returns:
+        np.ndarray: (N, 4, 4) 局部矩阵，local[i] = world[i] * inverse(world[i - 1])
+    """
+    world_matrices = np.asarray(world_matrices, dtype=np.float64)
+    parents = np.empty_like(world_matrices)
+    parents[0] = np.identity(4) if root_parent_matrix is None else root_parent_matrix
+    parents[1:] = world_matrices[:-1]
+    return np.matmul(world_matrices, np.linalg.inv(parents))
+
+
+# 次轴方向对应的世界向量（与 cmds.joint 的 secondaryAxisOrient 相同）
+SECONDARY_AXIS_VECTORS = {
+    'yup': (0.0, 1.0, 0.0),
+    'ydown': (0.0, -1.0, 0.0),
+    'zup': (0.0, 0.0, 1.0),
+    'zdown': (0.0, 0.0, -1.0),
+}
+
+
+def aim_matrices(aim_vectors, up_vector, orient_order='xyz'):
+    """
+    根据瞄准方向和次轴方向计算旋转矩阵
+
+    主轴（orient_order 第一个字母）指向瞄准方向，次轴（第二个字母）朝向 up_vector 在垂直平面上的投影，
+    第三轴保证右手坐标系。瞄准方向与 up_vector 平行时改用另一条世界轴作为参考。
+
+    Args:
+        aim_vectors (np.ndarray): (N, 3) 瞄准方向
+        up_vector (sequence): 次轴参考方向
+        orient_order (str): 轴向顺序，例如 'xyz'
+
+    Returns:
+        np.ndarray: (N, 3, 3) 旋转矩阵，每一行为对应局部轴在世界中的方向
+    """
+    axes = ['xyz'.index(axis) for axis in orient_order.lower()]
+    aim = np.asarray(aim_vectors, dtype=np.float64)
+    aim = aim / np.linalg.norm(aim, axis=-1, keepdims=True)
+
+    up = np.broadcast_to(np.asarray(up_vector, dtype=np.float64), aim.shape)
+    third = np.cross(aim, up)
+    # 瞄准方向与次轴参考平行时，换用与参考方向垂直的世界轴
+    degenerate = np.linalg.norm(third, axis=-1) < 1e-8
+    if np.any(degenerate):
+        alternate = np.roll(np.asarray(up_vector, dtype=np.float64), 1)
+        third[degenerate] = np.cross(aim[degenerate], alternate)
+    third = third / np.linalg.norm(third, axis=-1, keepdims=True)
+    secondary = np.cross(third, aim)
+
+    result = np.empty(aim.shape[:-1] + (3, 3))
+    result[..., axes[0], :] = aim
+    result[..., axes[1], :] = secondary
+    result[..., axes[2], :] = third
+    # 保证右手坐标系
+    flip = np.linalg.det(result) < 0
+    result[flip, axes[2], :] *= -1
+    return result
+
+
+def matrix_to_euler_xyz(rotations):
+    """
+    将旋转矩阵转换为 xyz 旋转顺序的欧拉角（jointOrient 使用的顺序）
+
+    Args:
+        rotations (np.ndarray): (..., 3, 3) 行向量约定的旋转矩阵
+
+    Returns:
+        np.ndarray: (..., 3) 角度制欧拉角
+    """
+    m = np.asarray(rotations, dtype=np.float64)
+    sy = np.clip(-m[..., 0, 2], -1.0, 1.0)
+    y = np.arcsin(sy)
+    cy = np.cos(y)
+    gimbal = np.abs(cy) < 1e-8
+    x = np.where(gimbal, 0.0, np.arctan2(m[..., 1, 2], m[..., 2, 2]))
+    z = np.where(gimbal, np.arctan2(-m[..., 1, 0], m[..., 1, 1]), np.arctan2(m[..., 0, 1], m[..., 0, 0]))
+    return np.degrees(np.stack([x, y, z], axis=-1))
+
+
+def euler_xyz_to_matrix(angles):
+    """matrix_to_euler_xyz 的逆运算，angles 为 (..., 3) 角度制"""
+    x, y, z = np.moveaxis(np.radians(np.asarray(angles, dtype=np.float64)), -1, 0)
+    cx, sx, cy, sy, cz, sz = np.cos(x), np.sin(x), np.cos(y), np.sin(y), np.cos(z), np.sin(z)
+    m = np.empty(np.shape(x) + (3, 3))
+    m[..., 0, :] = np.stack([cy * cz, cy * sz, -sy], axis=-1)
+    m[..., 1, :] = np.stack([sx * sy * cz - cx * sz, sx * sy * sz + cx * cz, sx * cy], axis=-1)
+    m[..., 2, :] = np.stack([cx * sy * cz + sx * sz, cx * sy * sz - sx * cz, cx * cy], axis=-1)
+    return m
+
+
+def solve_joint_orients(positions, parents, aim_targets, up_vector, orient_order='xyz'):
+    """
+    计算整棵关节树的 jointOrient 与局部位移（语义同 cmds.joint -e -orientJoint -children）
+
+    有子关节的关节主轴指向 aim_targets 指定的子关节，末端关节的 jointOrient 为 0（与父关节朝向相同）。
+    所有数据都位于根关节父级的空间中，关节本身没有缩放。
+
+    Args:
+        positions (np.ndarray): (N, 3) 关节位置，父关节在子关节之前
+        parents (np.ndarray): (N,) 父关节索引，根关节为 -1
+        aim_targets (np.ndarray): (N,) 瞄准的子关节索引，末端关节为 -1
+        up_vector (sequence): 次轴参考方向
+        orient_order (str): 轴向顺序
+
+    Returns:
+        tuple: (旋转矩阵 (N, 3, 3), jointOrient 欧拉角 (N, 3), 局部位移 (N, 3))
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    parents = np.asarray(parents)
+    aim_targets = np.asarray(aim_targets)
+    count = len(positions)
+
+    rotations = np.empty((count, 3, 3))
+    has_aim = aim_targets >= 0
+    if np.any(has_aim):
+        rotations[has_aim] = aim_matrices(positions[aim_targets[has_aim]] - positions[has_aim], up_vector,
+                                          orient_order)
+
+    # 末端关节沿用父关节朝向（父关节在前，按顺序即可）
+    for i in np.flatnonzero(~has_aim):
+        rotations[i] = rotations[parents[i]] if parents[i] >= 0 else np.identity(3)
+
+    parent_rotations = np.empty_like(rotations)
+    is_root = parents < 0
+    parent_rotations[is_root] = np.identity(3)
+    parent_rotations[~is_root] = rotations[parents[~is_root]]
+
+    # 行向量约定: world = orient * parent，旋转矩阵的逆即转置
+    orients = np.matmul(rotations, np.swapaxes(parent_rotations, -1, -2))
+    translates = np.zeros((count, 3))
+    child = ~is_root
+    translates[child] = np.einsum('ni,nji->nj', positions[child] - positions[parents[child]],
+                                  parent_rotations[child])
+    return rotations, matrix_to_euler_xyz(orients), translates
+
+
+def solve_pole_positions(starts, mids, ends, distance=None, fallback_directions=None, tolerance=1e-4):
+    """
+    批量计算极向量位置
+
+    极向量方向为中间关节相对起始-结束连线的垂直偏移方向（位于肢体平面内），
+    肢体完全伸直（偏移量小于 tolerance * 肢体长度）时改用 fallback_directions。
+
+    Args:
+        starts (np.ndarray): (N, 3) 起始关节位置
+        mids (np.ndarray): (N, 3) 中间关节位置
+        ends (np.ndarray): (N, 3) 结束关节位置
+        distance (float or np.ndarray): 极向量到中间关节的距离，None 时使用上段长度（起始关节到中间关节）
+        fallback_directions (np.ndarray): (N, 3) 伸直时使用的方向，None 时取与肢体垂直的任意方向
+        tolerance (float): 判断伸直的相对阈值
+
+    Returns:
+        tuple: (极向量位置 (N, 3), 是否使用了备用方向 (N,))
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    mids = np.asarray(mids, dtype=np.float64).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+
+    limb = ends - starts
+    limb_length_sq = np.einsum('ni,ni->n', limb, limb)
+    t = np.einsum('ni,ni->n', mids - starts, limb) / np.where(limb_length_sq > 0, limb_length_sq, 1.0)
+    offsets = mids - (starts + limb * t[:, None])
+    offset_length = np.linalg.norm(offsets, axis=-1)
+
+    upper_length = np.linalg.norm(mids - starts, axis=-1)
+    lower_length = np.linalg.norm(ends - mids, axis=-1)
+    straight = offset_length <= tolerance * np.maximum(upper_length + lower_length, 1e-8)
+
+    directions = np.zeros_like(offsets)
+    bent = ~straight
+    directions[bent] = offsets[bent] / offset_length[bent, None]
+    if np.any(straight):
+        if fallback_directions is not None:
+            fallback = np.asarray(fallback_directions, dtype=np.float64).reshape(-1, 3)[straight]
+        else:
+            # 任取一条与肢体不平行的世界轴，求出与肢体垂直的方向
+            limb_dirs = limb[straight]
+            fallback = np.cross(limb_dirs, np.identity(3)[np.argmin(np.abs(limb_dirs), axis=-1)])
+        fallback_length = np.linalg.norm(fallback, axis=-1, keepdims=True)
+        directions[straight] = fallback / np.where(fallback_length > 0, fallback_length, 1.0)
+
+    if distance is None:
+        distance = upper_length
+    distance = np.broadcast_to(np.asarray(distance, dtype=np.float64), (len(mids),))
+    return mids + directions * distance[:, None], straight
+
+
+def plane_mirror_matrix(plane_matrix=None, axis='x'):
+    """
+    计算关于平面的镜像矩阵
+
+    平面由 plane_matrix 的局部坐标系给出，法线为其局部 axis 轴（'x' 即局部 YZ 平面）。
+    行向量约定下镜像后的点为 p * inverse(P) * S * P，S 为将 axis 分量取反的缩放矩阵。
+
+    Args:
+        plane_matrix (np.ndarray): (4, 4) 平面的世界矩阵，None 时为世界原点
+        axis (str): 平面法线对应的局部轴 'x'、'y' 或 'z'
+
+    Returns:
+        np.ndarray: (4, 4) 镜像矩阵
+    """
+    if axis not in ('x', 'y', 'z'):
+        raise ValueError(f"无效的镜像轴 '{axis}'，请使用 'x'、'y' 或 'z'")
+    flip = np.identity(4)
+    flip['xyz'.index(axis), 'xyz'.index(axis)] = -1.0
+    if plane_matrix is None:
+        return flip
+    plane_matrix = np.asarray(plane_matrix, dtype=np.float64).reshape(4, 4)
+    return np.linalg.inv(plane_matrix) @ flip @ plane_matrix
@@ -0,0 +1,261 @@
+import maya.cmds as cmds
+import os
+import json
+import fnmatch
+from collections import defaultdict
+
+# 记录各模块创建节点的 network 节点（由工具界面在每次执行后写入）
+REPORT_STATE_NODE = 'rigReport_state'
+# base_rigging 构建调度器保存阶段记录的节点，阶段记录优先于模块记录
+BUILD_STATE_NODE = 'rigBuild_state'
+
+# 每种节点的估算求值开销（以一个普通 transform 为 1），未列出的类型使用 DEFAULT_NODE_COST
+NODE_COSTS = {
+    'transform': 1.0,
+    'joint': 1.5,
+    'nurbsCurve': 0.5,
+    'locator': 0.5,
+    'parentConstraint': 4.0,
+    'orientConstraint': 3.0,
+    'pointConstraint': 2.0,
+    'scaleConstraint': 2.0,
+    'aimConstraint': 3.0,
+    'poleVectorConstraint': 2.0,
+    'ikEffector': 0.5,
+    'condition': 0.5,
+    'reverse': 0.3,
+    'multDoubleLinear': 0.3,
+    'plusMinusAverage': 0.5,
+    'multiplyDivide': 0.5,
+    'blendMatrix': 1.0,
+    'multMatrix': 0.5,
+    'decomposeMatrix': 0.5,
+    'skinCluster': 10.0,
+    'cluster': 3.0,
+    'blendShape': 6.0,
+}
+DEFAULT_NODE_COST = 0.5
+
+# 约束每多一个目标增加的开销
+CONSTRAINT_TARGET_COST = 1.0
+# ikHandle 按解算器类型计算开销
+IK_SOLVER_COSTS = {'ikRPsolver': 6.0, 'ikSCsolver': 3.0, 'ikSplineSolver': 10.0}
+# skinCluster 每个影响物增加的开销
+SKIN_INFLUENCE_COST = 0.5
+
+# 未被记录的节点按名称归属到子系统
+SUBSYSTEM_PATTERNS = {
+    'twist_joint': ['*Twist*'],
+    'space_switch': ['*Space*_001', 'cond_*Space*'],
+}
+
+# 节点预算: {子系统 / 节点类型 / 'total': {'nodes': 最大节点数, 'cost': 最大估算开销}}
+# 例如 {'total': {'nodes': 3000}, 'space_switch': {'cost': 400}, 'parentConstraint': {'nodes': 60}}
+NODE_BUDGETS = {}
+# 预算文件，存在时覆盖 NODE_BUDGETS
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'node_budgets.json')
+# 超出预算时是否抛出异常使构建失败（否则只给出警告）
+FAIL_ON_NODE_BUDGET = False
+
+
+def _load_json_attr(node, attr):
+    if not cmds.objExists(f'{node}.{attr}'):
+        return {}
+    data = cmds.getAttr(f'{node}.{attr}')
+    return json.loads(data) if data else {}
+
+
+def snapshot():
+    """返回场景中全部节点的 uuid 集合，与 record_subsystem 配合使用"""
+    return set(cmds.ls(uuid=True) or [])
+
+
+def record_subsystem(subsystem, before):
+    """
+    将 before 快照之后新建的节点记录到子系统下（保存在场景中）
+
+    Args:
+        subsystem (str): 子系统名称，例如模块名 'twist_joint'
+        before (set): 执行前 snapshot() 的结果
+
+    Returns:
+        int: 新记录的节点数
+    """
+    created = snapshot() - set(before)
+    if not created:
+        return 0
+    records = _load_json_attr(REPORT_STATE_NODE, 'records')
+    records[subsystem] = sorted(set(records.get(subsystem, [])) | created)
+    if not cmds.objExists(REPORT_STATE_NODE):
+        cmds.createNode('network', name=REPORT_STATE_NODE)
+    if not cmds.attributeQuery('records', node=REPORT_STATE_NODE, exists=True):
+        cmds.addAttr(REPORT_STATE_NODE, longName='records', dataType='string')
+    cmds.setAttr(f'{REPORT_STATE_NODE}.records', json.dumps(records), type='string')
+    return len(created)
+
+
+def clear_records():
+    """删除模块记录"""
+    if cmds.objExists(REPORT_STATE_NODE):
+        cmds.delete(REPORT_STATE_NODE)
+
+
+def collect_subsystems(build_state_node=BUILD_STATE_NODE):
+    """
+    收集每个子系统创建的节点
+
+    构建阶段记录（'base_rigging.<阶段>'）优先，其次是模块记录，
+    最后按 SUBSYSTEM_PATTERNS 归属未被记录的节点。
+
+    Returns:
+        dict: {子系统: [uuid]}
+    """
+    owner = {}
+    for stage, record in _load_json_attr(build_state_node, 'buildState').items():
+        for uuid in record.get('created', []):
+            owner.setdefault(uuid, f'base_rigging.{stage}')
+    for subsystem, uuids in _load_json_attr(REPORT_STATE_NODE, 'records').items():
+        for uuid in uuids:
+            owner.setdefault(uuid, subsystem)
+
+    if SUBSYSTEM_PATTERNS:
+        names = cmds.ls(long=True) or []
+        uuids = cmds.ls(uuid=True) or []
+        for name, uuid in zip(names, uuids):
+            if uuid in owner:
+                continue
+            leaf = name.rsplit('|', 1)[-1]
+            for subsystem, patterns in SUBSYSTEM_PATTERNS.items():
+                if any(fnmatch.fnmatchcase(leaf, pattern) for pattern in patterns):
+                    owner[uuid] = subsystem
+                    break
+
+    subsystems = defaultdict(list)
+    for uuid, subsystem in owner.items():
+        subsystems[subsystem].append(uuid)
+    return dict(subsystems)
+
+
+def node_cost(node, node_type):
+    """估算单个节点的求值开销"""
+    if node_type == 'ikHandle':
+        solver = cmds.listConnections(f'{node}.ikSolver', source=True, destination=False) or []
+        solver_type = cmds.nodeType(solver[0]) if solver else 'ikSCsolver'
+        return IK_SOLVER_COSTS.get(solver_type, DEFAULT_NODE_COST)
+    cost = NODE_COSTS.get(node_type, DEFAULT_NODE_COST)
+    if node_type.endswith('Constraint'):
+        targets = cmds.getAttr(f'{node}.target', size=True) or 1
+        cost += CONSTRAINT_TARGET_COST * (targets - 1)
+    elif node_type == 'skinCluster':
+        cost += SKIN_INFLUENCE_COST * len(cmds.skinCluster(node, query=True, influence=True) or [])
+    return cost
+
+
+def build_report(build_state_node=BUILD_STATE_NODE):
+    """
+    按子系统和节点类型统计构建创建的节点
+
+    Returns:
+        dict: {'subsystems': {子系统: {'nodes', 'cost', 'types': {类型: {'nodes', 'cost'}}}},
+               'types': {类型: {'nodes', 'cost'}}, 'total_nodes', 'total_cost'}
+    """
+    subsystems = {}
+    types = defaultdict(lambda: {'nodes': 0, 'cost': 0.0})
+    for subsystem, uuids in sorted(collect_subsystems(build_state_node).items()):
+        # ls 返回 [名称, 类型, 名称, 类型, ...]，已删除的节点不会返回
+        listing = cmds.ls(uuids, long=True, showType=True) or []
+        by_type = defaultdict(lambda: {'nodes': 0, 'cost': 0.0})
+        for node, node_type in zip(listing[::2], listing[1::2]):
+            cost = node_cost(node, node_type)
+            for entry in (by_type[node_type], types[node_type]):
+                entry['nodes'] += 1
+                entry['cost'] += cost
+        if not by_type:
+            continue
+        subsystems[subsystem] = {
+            'nodes': sum(entry['nodes'] for entry in by_type.values()),
+            'cost': sum(entry['cost'] for entry in by_type.values()),
+            'types': dict(sorted(by_type.items(), key=lambda i: -i[1]['cost'])),
+        }
+    return {
+        'subsystems': subsystems,
+        'types': dict(sorted(types.items(), key=lambda i: -i[1]['cost'])),
+        'total_nodes': sum(info['nodes'] for info in subsystems.values()),
+        'total_cost': sum(info['cost'] for info in subsystems.values()),
+    }
+
+
+def to_json(report, path=None):
+    """将统计结果输出为 json 字符串，指定 path 时同时写入文件"""
+    data = json.dumps(report, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        print(f"节点统计已保存: {path}")
+    return data
+
+
+def report_rows(report):
+    """
+    展开为表格行，每个子系统先输出合计行，再输出各节点类型
+
+    Returns:
+        list: [(子系统, 节点类型, 节点数, 估算开销)]，合计行的节点类型为 '(合计)'
+    """
+    rows = []
+    for subsystem, info in sorted(report['subsystems'].items(), key=lambda i: -i[1]['cost']):
+        rows.append((subsystem, '(合计)', info['nodes'], info['cost']))
+        for node_type, entry in info['types'].items():
+            rows.append((subsystem, node_type, entry['nodes'], entry['cost']))
+    rows.append(('(全部)', '(合计)', report['total_nodes'], report['total_cost']))
+    return rows
+
+
+def format_report(report):
+    """生成文本表格"""
+    lines = [f"{'子系统':<28}{'节点类型':<24}{'数量':>8}{'估算开销':>12}", '-' * 72]
+    for subsystem, node_type, nodes, cost in report_rows(report):
+        label = subsystem if node_type == '(合计)' else ''
+        lines.append(f"{label:<28}{node_type:<24}{nodes:>8}{cost:>12.1f}")
+    return '\n'.join(lines)
+
+
+def load_budgets(path=BUDGET_FILE):
+    """读取预算文件，文件不存在时返回 NODE_BUDGETS"""
+    if not os.path.exists(path):
+        return dict(NODE_BUDGETS)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_budgets(report, budgets=None, fail=None):
+    """
+    检查节点预算
+
+    Args:
+        report (dict): build_report() 的结果
+        budgets (dict): 预算，None 时读取预算文件
+        fail (bool): 超出时是否抛出 RuntimeError，None 时使用 FAIL_ON_NODE_BUDGET
+
+    Returns:
+        list: [(预算项, 指标, 实际值, 预算)]
+    """
+    budgets = load_budgets() if budgets is None else budgets
+    fail = FAIL_ON_NODE_BUDGET if fail is None else fail
+    violations = []
+    for key, limits in budgets.items():
+        if key == 'total':
+            actual = {'nodes': report['total_nodes'], 'cost': report['total_cost']}
+        else:
+            actual = report['subsystems'].get(key) or report['types'].get(key)
+        if not actual:
+            continue
+        for metric, limit in limits.items():
+            if actual.get(metric, 0) > limit:
+                violations.append((key, metric, actual[metric], limit))
+                cmds.warning(f"{key} 的 {metric} 为 {actual[metric]:g}，超出预算 {limit:g}")
+
+    if violations and fail:
+        raise RuntimeError("节点预算超出: " + ', '.join(f"{key}.{metric}={value:g}>{limit:g}"
+                                                   for key, metric, value, limit in violations))
+    return violations
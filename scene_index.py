@@ -0,0 +1,125 @@
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import fnmatch
+from collections import Counter
+
+
+class SceneNameIndex(object):
+    """
+    场景节点名称索引
+
+    启用时用一次 ls 读取场景中全部节点名称，之后通过 OpenMaya 的节点添加/删除/重命名回调保持同步，
+    存在性判断和通配符查询都在内存中完成，避免在大场景中反复调用 objExists 和通配符扫描。
+    未启用时 exists/glob 直接退回 cmds.objExists/cmds.ls。
+
+    用法:
+        with SCENE_INDEX:
+            if SCENE_INDEX.exists('ctrl_l_handIk_001'):
+                cmds.hide(SCENE_INDEX.glob('ikHnd_*_*_001'))
+    """
+
+    def __init__(self):
+        self._names = Counter()
+        self._callbacks = []
+        self._depth = 0
+
+    @property
+    def active(self):
+        return self._depth > 0
+
+    def _reload(self, *args):
+        self._names = Counter(name.rsplit('|', 1)[-1] for name in cmds.ls() or [])
+
+    def _on_node_added(self, node, client_data):
+        self._names[om.MFnDependencyNode(node).name()] += 1
+
+    def _on_node_removed(self, node, client_data):
+        self._discard(om.MFnDependencyNode(node).name())
+
+    def _on_name_changed(self, node, prev_name, client_data):
+        if prev_name:
+            self._discard(prev_name)
+        self._names[om.MFnDependencyNode(node).name()] += 1
+
+    def _discard(self, name):
+        if self._names[name] > 1:
+            self._names[name] -= 1
+        else:
+            self._names.pop(name, None)
+
+    def start(self):
+        """启用索引（可嵌套调用，与 stop 成对使用）"""
+        self._depth += 1
+        if self._depth > 1:
+            return
+        self._reload()
+        self._callbacks = [
+            om.MDGMessage.addNodeAddedCallback(self._on_node_added, 'dependNode'),
+            om.MDGMessage.addNodeRemovedCallback(self._on_node_removed, 'dependNode'),
+            om.MNodeMessage.addNameChangedCallback(om.MObject.kNullObj, self._on_name_changed),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, self._reload),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterNew, self._reload),
+        ]
+
+    def stop(self):
+        """停用索引并移除回调"""
+        if self._depth == 0:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            om.MMessage.removeCallbacks(self._callbacks)
+            self._callbacks = []
+            self._names = Counter()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+        return False
+
+    def exists(self, name):
+        """
+        判断节点或属性是否存在
+
+        Args:
+            name (str): 节点名称、路径或 'node.attr'
+
+        Returns:
+            bool: 是否存在
+        """
+        if not self.active:
+            return cmds.objExists(name)
+        node = name.split('.', 1)[0].rsplit('|', 1)[-1]
+        if node not in self._names:
+            return False
+        # 属性、路径或重名节点仍交给 objExists 精确判断
+        if '.' in name or '|' in name or self._names[node] > 1:
+            return cmds.objExists(name)
+        return True
+
+    def glob(self, *patterns):
+        """
+        按通配符匹配节点名称（支持 * 和 ?）
+
+        Args:
+            *patterns (str): 一个或多个名称通配符
+
+        Returns:
+            list: 匹配到的节点名称（重名节点返回其路径）
+        """
+        if not self.active or any('|' in pattern or '.' in pattern for pattern in patterns):
+            return cmds.ls(*patterns) or []
+        result = []
+        for name, count in self._names.items():
+            if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+                if count > 1:
+                    result.extend(cmds.ls(name) or [])
+                else:
+                    result.append(name)
+        return sorted(result)
+
+
+# 共享的场景索引，构建脚本在构建期间启用
+SCENE_INDEX = SceneNameIndex()
@@ -0,0 +1,160 @@
+import maya.cmds as cmds
+import numpy as np
+from rig_math import get_world_matrices
+
+
+class SkeletonIndex(object):
+    """
+    骨骼层级索引
+
+    用一次 listRelatives(allDescendents) 查询读取根关节下的全部关节，
+    在内存中保存父子关系、深度、分支点以及先序遍历顺序，
+    之后的链查询、分支遍历和"X 下的所有关节"都不再访问 Maya。
+
+    用法:
+        skeleton = SkeletonIndex('jnt_m_spine_001')
+        skeleton.chain('jnt_l_upperArm_001', 'jnt_l_wristEnd_001')
+        skeleton.descendants('jnt_l_wrist_001')
+    """
+
+    def __init__(self, root_joint):
+        root_path = (cmds.ls(root_joint, long=True, type='joint') or [None])[0]
+        if root_path is None:
+            raise ValueError(f"对象 '{root_joint}' 不存在或不是关节")
+
+        # allDescendents 以逆序返回，反转后父节点在子节点之前，兄弟节点保持场景中的顺序
+        descendants = cmds.listRelatives(root_path, allDescendents=True, fullPath=True, type='joint') or []
+        query_paths = [root_path] + descendants[::-1]
+        query_index = {path: i for i, path in enumerate(query_paths)}
+
+        children = [[] for _ in query_paths]
+        for i, path in enumerate(query_paths[1:], 1):
+            parent = query_index.get(path.rsplit('|', 1)[0])
+            if parent is not None:
+                children[parent].append(i)
+
+        # 先序遍历重新编号，使每个关节的子树在数组中连续
+        order = []
+        stack = [0]
+        while stack:
+            i = stack.pop()
+            order.append(i)
+            stack.extend(reversed(children[i]))
+        remap = {old: new for new, old in enumerate(order)}
+
+        self.paths = [query_paths[i] for i in order]
+        self.names = [path.rsplit('|', 1)[-1] for path in self.paths]
+        self.children = [[remap[c] for c in children[i]] for i in order]
+        self.parents = np.full(len(order), -1, dtype=np.int32)
+        for i, kids in enumerate(self.children):
+            self.parents[kids] = i
+        self.depths = np.zeros(len(order), dtype=np.int32)
+        for i in range(1, len(order)):
+            self.depths[i] = self.depths[self.parents[i]] + 1
+
+        # 每个关节子树在先序数组中的结束位置（不含）
+        self.subtree_end = np.arange(1, len(order) + 1, dtype=np.int32)
+        for i in range(len(order) - 1, 0, -1):
+            parent = self.parents[i]
+            self.subtree_end[parent] = max(self.subtree_end[parent], self.subtree_end[i])
+
+        self._lookup = {}
+        for i, (name, path) in enumerate(zip(self.names, self.paths)):
+            self._lookup[path] = i
+            # 重名关节只能通过完整路径查询
+            self._lookup[name] = None if name in self._lookup else i
+        self._matrices = None
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, joint):
+        return self._lookup.get(joint) is not None
+
+    @property
+    def root(self):
+        return self.names[0]
+
+    def index(self, joint):
+        """返回关节在索引中的位置"""
+        i = self._lookup.get(joint)
+        if i is None:
+            raise ValueError(f"关节 '{joint}' 不在 {self.root} 的层级中或名称不唯一")
+        return i
+
+    def parent(self, joint):
+        """返回父关节名称（根关节返回 None）"""
+        parent = self.parents[self.index(joint)]
+        return self.names[parent] if parent >= 0 else None
+
+    def child_joints(self, joint):
+        """返回直接子关节名称"""
+        return [self.names[i] for i in self.children[self.index(joint)]]
+
+    def depth(self, joint):
+        """返回关节相对根关节的深度"""
+        return int(self.depths[self.index(joint)])
+
+    def is_branch(self, joint):
+        return len(self.children[self.index(joint)]) > 1
+
+    def branch_points(self):
+        """返回有多个子关节的关节"""
+        return [self.names[i] for i, kids in enumerate(self.children) if len(kids) > 1]
+
+    def leaves(self):
+        """返回末端关节"""
+        return [self.names[i] for i, kids in enumerate(self.children) if not kids]
+
+    def descendants(self, joint, include_self=False):
+        """返回关节下的全部关节（先序顺序）"""
+        i = self.index(joint)
+        return self.names[i if include_self else i + 1:self.subtree_end[i]]
+
+    def chain(self, start_joint, end_joint=None):
+        """
+        返回从 start_joint 到 end_joint 的关节链
+
+        Args:
+            start_joint (str): 起始关节
+            end_joint (str): 结束关节，None 时沿第一个子关节一直走到末端（与 get_joint_chain 一致）
+
+        Returns:
+            list: 按层级顺序排列的关节链
+        """
+        start = self.index(start_joint)
+        if end_joint is None:
+            chain = [start]
+            while self.children[chain[-1]]:
+                chain.append(self.children[chain[-1]][0])
+        else:
+            end = self.index(end_joint)
+            if not start <= end < self.subtree_end[start]:
+                raise ValueError(f"关节 '{end_joint}' 不在 '{start_joint}' 之下")
+            chain = [end]
+            while chain[-1] != start:
+                chain.append(self.parents[chain[-1]])
+            chain.reverse()
+        return [self.names[i] for i in chain]
+
+    def segments(self):
+        """
+        按分支点拆分骨骼，返回每一段不分叉的关节链
+
+        每段从根关节或分支点的子关节开始，到末端关节或下一个分支点结束
+        """
+        segments = []
+        starts = [0]
+        while starts:
+            current = [starts.pop()]
+            while len(self.children[current[-1]]) == 1:
+                current.append(self.children[current[-1]][0])
+            segments.append([self.names[i] for i in current])
+            starts.extend(reversed(self.children[current[-1]]))
+        return segments
+
+    def world_matrices(self):
+        """返回全部关节的世界矩阵 (N, 4, 4)，首次调用时一次性读取并缓存"""
+        if self._matrices is None:
+            self._matrices = get_world_matrices(self.paths)
+        return self._matrices
@@ -1,4 +1,9 @@
 import maya.cmds as cmds
+import time
+import numpy as np
+from scene_index import SCENE_INDEX
+from rig_math import get_world_matrices
+from rig_benchmark import time_playback, print_comparison
 
 # ========================
 # 全局配置
@@ -29,6 +34,13 @@ group_parents = [
     ("grp_r_clavicleSpaceLocs_001", "output_r_clavicle_001")
 ]
 
+# 空间切换实现: 'constraint' 每个空间一个定位器 + 多目标约束 + 每个空间一个 condition 节点；
+# 'matrix' 由 space 枚举通过 choice 节点直接选择空间矩阵，父子切换驱动 offsetParentMatrix（需要 Maya 2020 及以上）；
+# 'pooled' 约束直接以共享的空间组为目标，偏移保存在约束中，不再为每个控制器创建定位器
+# （仅支持父子约束: orientConstraint 整个约束只有一个 offset，无法为每个目标保存偏移，旋转切换回退到 'constraint'）
+SPACE_SWITCH_MODES = ('constraint', 'matrix', 'pooled')
+SPACE_SWITCH_MODE = 'constraint'
+
 # 空间组配置（所有命名规则统一）
 space_groups = {
     'handIk': {'sides': ['l', 'r']},  # 左右处理
@@ -40,7 +52,15 @@ space_groups = {
 # ========================
 
 
-def create_space_switch(ctrl_name, space_group, prefix, space_options, space_group_map, constraint_type="parent"):
+def _resolve_space_group(opt, space_group_map, side):
+    """返回空间选项对应的空间组名（处理 <side> 占位符，未配置时使用 World 组）"""
+    base_group = space_group_map.get(opt)
+    return (base_group.replace("<side>", side) if base_group and "<side>" in base_group
+            else base_group) or space_group_map["World"]
+
+
+def create_space_switch(ctrl_name, space_group, prefix, space_options, space_group_map, constraint_type="parent",
+                        mode=None, blend=False):
     """
     为控制器创建空间切换系统（完整实现）
 
@@ -51,31 +71,44 @@ def create_space_switch(ctrl_name, space_group, prefix, space_options, space_gro
         space_options: 空间选项列表 (e.g. ['World', 'Clavicle'])
         space_group_map: 空间组映射字典
         constraint_type: 约束类型 - "parent"(父子约束)或"orient"(旋转约束)
+        mode: 实现方式 - "constraint"、"matrix" 或 "pooled"，None 时使用 SPACE_SWITCH_MODE
+              （"pooled" 仅支持父子约束，旋转约束时回退到 "constraint"）
+        blend: 仅矩阵模式 - 额外添加 spaceB 枚举与 spaceBlend 属性，在两个空间之间混合
     """
+    mode = mode or SPACE_SWITCH_MODE
+    if mode not in SPACE_SWITCH_MODES:
+        raise ValueError(f"无效的空间切换方式 '{mode}'，请使用: {', '.join(SPACE_SWITCH_MODES)}")
+    if blend and mode != "matrix":
+        raise ValueError(f"blend 只支持 'matrix' 方式，当前为 '{mode}'")
+    if mode == "matrix":
+        return create_matrix_space_switch(ctrl_name, space_group, prefix, space_options, space_group_map,
+                                          constraint_type, blend)
+    if mode == "pooled" and constraint_type.lower() == "orient":
+        cmds.warning(f"{ctrl_name}: 'pooled' 方式不支持旋转约束，改用 'constraint' 方式")
+        mode = "constraint"
+    if mode == "pooled":
+        return create_pooled_space_switch(ctrl_name, space_group, prefix, space_options, space_group_map,
+                                          constraint_type)
+
     # 1. 确定左右侧
     side = "l" if prefix.startswith("l_") else "r" if prefix.startswith("r_") else "m"
 
     # 2. 添加空间枚举属性
-    if not cmds.objExists(f"{ctrl_name}.space"):
+    if not SCENE_INDEX.exists(f"{ctrl_name}.space"):
         enum_str = ":".join([f"{opt}={i}" for i, opt in enumerate(space_options)])
         cmds.addAttr(ctrl_name, ln="space", at="enum", enumName=enum_str, keyable=True)
 
     # 3. 创建/复用空间定位器
     locators = []
     for opt in space_options:
-        # 动态生成空间组名（处理占位符）
-        base_group = space_group_map.get(opt)
-        group_name = (
-                         base_group.replace("<side>", side)
-                         if base_group and "<side>" in base_group
-                         else base_group
-                     ) or space_group_map["World"]  # 默认使用World组
+        # 动态生成空间组名（处理占位符，默认使用World组）
+        group_name = _resolve_space_group(opt, space_group_map, side)
 
         loc_name = f"loc_{prefix}Space{opt}_001"
         zero_name = f"zero_{prefix}Space{opt}_001"
 
         # 定位器存在则复用，否则创建
-        if not cmds.objExists(loc_name):
+        if not SCENE_INDEX.exists(loc_name):
             loc = cmds.spaceLocator(name=loc_name)[0]
             zero_group = cmds.group(loc, name=zero_name)
             cmds.parent(zero_group, group_name)
@@ -88,7 +121,7 @@ def create_space_switch(ctrl_name, space_group, prefix, space_options, space_gro
     if constraint_type.lower() == "orient":
         # 旋转约束
         constraint_node = f"{space_group}_orientConstraint"
-        if not cmds.objExists(constraint_node):
+        if not SCENE_INDEX.exists(constraint_node):
             constraint_node = cmds.orientConstraint(
                 *locators,
                 space_group,
@@ -99,7 +132,7 @@ def create_space_switch(ctrl_name, space_group, prefix, space_options, space_gro
     else:
         # 默认使用父子约束
         constraint_node = f"{space_group}_parentConstraint"
-        if not cmds.objExists(constraint_node):
+        if not SCENE_INDEX.exists(constraint_node):
             constraint_node = cmds.parentConstraint(
                 *locators,
                 space_group,
@@ -113,7 +146,7 @@ def create_space_switch(ctrl_name, space_group, prefix, space_options, space_gro
         cond_node = f"cond_{prefix}Space{opt}_001"
         weight_attr = f"{constraint_node}.{loc}W{i}"
 
-        if not cmds.objExists(cond_node):
+        if not SCENE_INDEX.exists(cond_node):
             cond = cmds.createNode("condition", name=cond_node)
             cmds.connectAttr(f"{ctrl_name}.space", f"{cond}.firstTerm")
             cmds.setAttr(f"{cond}.secondTerm", i)
@@ -123,6 +156,419 @@ def create_space_switch(ctrl_name, space_group, prefix, space_options, space_gro
             cmds.connectAttr(f"{cond}.outColorR", weight_attr)
 
 
+def _add_space_enum(ctrl_name, attr, space_options):
+    if not SCENE_INDEX.exists(f"{ctrl_name}.{attr}"):
+        enum_str = ":".join([f"{opt}={i}" for i, opt in enumerate(space_options)])
+        cmds.addAttr(ctrl_name, ln=attr, at="enum", enumName=enum_str, keyable=True)
+
+
+def _space_choice(ctrl_name, attr, prefix, suffix, space_targets):
+    """创建由 ctrl_name.attr 选择空间矩阵的 choice 节点"""
+    choice = cmds.createNode("choice", name=f"chc_{prefix}{suffix}_001")
+    cmds.connectAttr(f"{ctrl_name}.{attr}", f"{choice}.selector")
+    for i, target in enumerate(space_targets):
+        cmds.connectAttr(f"{target}.matrixSum", f"{choice}.input[{i}]")
+    return choice
+
+
+def create_matrix_space_switch(ctrl_name, space_group, prefix, space_options, space_group_map,
+                               constraint_type="parent", blend=False):
+    """
+    矩阵方式的空间切换：不创建定位器、约束和 condition 节点
+
+    每个空间一个 multMatrix（固定偏移 * 空间组世界矩阵 * space_group 父级逆矩阵），
+    space 枚举通过 choice 节点选择其中一个，父子切换直接驱动 space_group.offsetParentMatrix，
+    旋转切换经 decomposeMatrix 只驱动旋转。choice 只求值被选中的输入，因此每帧只计算一个空间。
+    偏移按构建时 space_group 的世界矩阵计算，与约束方式中定位器匹配到 space_group 的结果相同。
+
+    参数同 create_space_switch；blend 为 True 时额外添加 spaceB 枚举与 spaceBlend (0-1) 属性，
+    用 blendMatrix 在 space 与 spaceB 两个空间之间混合。
+
+    返回:
+        list: 创建的节点
+    """
+    choice_name = f"chc_{prefix}Space_001"
+    if SCENE_INDEX.exists(choice_name):
+        return []
+
+    side = "l" if prefix.startswith("l_") else "r" if prefix.startswith("r_") else "m"
+    _add_space_enum(ctrl_name, "space", space_options)
+
+    # 一次读取 space_group 与所有空间组的世界矩阵（未配置的空间都回退到 World 组，只读取一次），计算每个空间的固定偏移
+    group_names = [_resolve_space_group(opt, space_group_map, side) for opt in space_options]
+    unique_nodes = list(dict.fromkeys([space_group] + group_names))
+    matrices = dict(zip(unique_nodes, get_world_matrices(unique_nodes)))
+    offsets = np.matmul(matrices[space_group], np.linalg.inv([matrices[name] for name in group_names]))
+
+    nodes = []
+    targets = []
+    for opt, group_name, offset in zip(space_options, group_names, offsets):
+        mult = cmds.createNode("multMatrix", name=f"mmx_{prefix}Space{opt}_001")
+        cmds.setAttr(f"{mult}.matrixIn[0]", offset.flatten().tolist(), type="matrix")
+        cmds.connectAttr(f"{group_name}.worldMatrix[0]", f"{mult}.matrixIn[1]")
+        cmds.connectAttr(f"{space_group}.parentInverseMatrix[0]", f"{mult}.matrixIn[2]")
+        targets.append(mult)
+    nodes.extend(targets)
+
+    choice = _space_choice(ctrl_name, "space", prefix, "Space", targets)
+    nodes.append(choice)
+    output = f"{choice}.output"
+
+    if blend:
+        _add_space_enum(ctrl_name, "spaceB", space_options)
+        if not SCENE_INDEX.exists(f"{ctrl_name}.spaceBlend"):
+            cmds.addAttr(ctrl_name, ln="spaceBlend", at="float", minValue=0, maxValue=1, defaultValue=0,
+                         keyable=True)
+        choice_b = _space_choice(ctrl_name, "spaceB", prefix, "SpaceB", targets)
+        blend_node = cmds.createNode("blendMatrix", name=f"bmx_{prefix}Space_001")
+        cmds.connectAttr(output, f"{blend_node}.inputMatrix")
+        cmds.connectAttr(f"{choice_b}.output", f"{blend_node}.target[0].targetMatrix")
+        cmds.connectAttr(f"{ctrl_name}.spaceBlend", f"{blend_node}.target[0].weight")
+        nodes.extend([choice_b, blend_node])
+        output = f"{blend_node}.outputMatrix"
+
+    if constraint_type.lower() == "orient":
+        # 只替换旋转，位移保持 space_group 自身的值（与旋转约束相同）
+        decompose = cmds.createNode("decomposeMatrix", name=f"dcm_{prefix}Space_001")
+        cmds.connectAttr(output, f"{decompose}.inputMatrix")
+        cmds.connectAttr(f"{space_group}.rotateOrder", f"{decompose}.inputRotateOrder")
+        cmds.connectAttr(f"{decompose}.outputRotate", f"{space_group}.rotate", force=True)
+        nodes.append(decompose)
+    else:
+        # 整个局部矩阵由 offsetParentMatrix 提供，清零自身变换
+        cmds.xform(space_group, translation=(0, 0, 0), rotation=(0, 0, 0), scale=(1, 1, 1))
+        cmds.connectAttr(output, f"{space_group}.offsetParentMatrix", force=True)
+    return nodes
+
+
+def _create_space_condition(ctrl_name, prefix, opt, index, false_source=None):
+    cond = cmds.createNode("condition", name=f"cond_{prefix}Space{opt}_001")
+    cmds.connectAttr(f"{ctrl_name}.space", f"{cond}.firstTerm")
+    cmds.setAttr(f"{cond}.secondTerm", index)
+    cmds.setAttr(f"{cond}.operation", 0)  # 等于操作
+    cmds.setAttr(f"{cond}.colorIfTrueR", 1)
+    if false_source:
+        cmds.connectAttr(false_source, f"{cond}.colorIfFalseR")
+    else:
+        cmds.setAttr(f"{cond}.colorIfFalseR", 0)
+    return cond
+
+
+def create_pooled_space_switch(ctrl_name, space_group, prefix, space_options, space_group_map,
+                               constraint_type="parent"):
+    """
+    共享空间组的空间切换：不创建定位器
+
+    约束直接以 SPACE_GROUPS 中的空间组为目标（所有控制器共享），maintainOffset 把每个 (空间, 控制器)
+    的偏移保存在约束的目标偏移属性里，结果与为每个空间创建匹配到 space_group 的定位器相同。
+    多个空间解析到同一个空间组时共用一个约束目标，其 condition 节点串联（任一空间被选中时权重为1）。
+    只支持父子约束: parentConstraint 每个目标有各自的 targetOffsetTranslate/Rotate，
+    orientConstraint 只有一个作用于所有目标的 offset，无法为每个空间保存偏移。
+
+    参数同 create_space_switch（constraint_type 只能为 "parent"）
+
+    返回:
+        list: 创建的节点（约束与 condition 节点）
+    """
+    if constraint_type.lower() == "orient":
+        raise ValueError("共享空间组方式只支持父子约束，旋转切换请使用 'constraint' 或 'matrix' 方式")
+    constraint_node = f"{space_group}_parentConstraint"
+    if SCENE_INDEX.exists(constraint_node):
+        return []
+
+    side = "l" if prefix.startswith("l_") else "r" if prefix.startswith("r_") else "m"
+    _add_space_enum(ctrl_name, "space", space_options)
+
+    # 按空间组去重，记录每个约束目标对应的空间索引
+    targets = []
+    target_options = {}
+    for i, opt in enumerate(space_options):
+        group_name = _resolve_space_group(opt, space_group_map, side)
+        if group_name not in target_options:
+            targets.append(group_name)
+            target_options[group_name] = []
+        target_options[group_name].append((i, opt))
+
+    constraint_node = cmds.parentConstraint(*targets, space_group, maintainOffset=True, name=constraint_node)[0]
+    cmds.setAttr(f"{constraint_node}.interpType", 2)  # 最短路径插值
+    weight_aliases = cmds.parentConstraint(constraint_node, query=True, weightAliasList=True)
+
+    nodes = [constraint_node]
+    for target, weight_alias in zip(targets, weight_aliases):
+        next_attr = None
+        # 从后往前创建，前一个 condition 不满足时取后一个的结果
+        for i, opt in reversed(target_options[target]):
+            cond = _create_space_condition(ctrl_name, prefix, opt, i, next_attr)
+            next_attr = f"{cond}.outColorR"
+            nodes.append(cond)
+        cmds.connectAttr(next_attr, f"{constraint_node}.{weight_alias}")
+    return nodes
+
+
+def _read_space_enum(ctrl_name, attr="space"):
+    """读取空间枚举，返回 [(空间名称, 枚举值)]"""
+    entries = []
+    index = -1
+    for token in cmds.attributeQuery(attr, node=ctrl_name, listEnum=True)[0].split(":"):
+        name, _, value = token.partition("=")
+        index = int(value) if value else index + 1
+        entries.append((name, index))
+    return entries
+
+
+def _write_space_enum(ctrl_name, entries, attr="space"):
+    """以显式枚举值写回空间枚举，已有空间的值保持不变"""
+    enum_str = ":".join(f"{name}={index}" for name, index in entries)
+    cmds.addAttr(f"{ctrl_name}.{attr}", edit=True, enumName=enum_str)
+
+
+def _find_space_constraint(space_group):
+    """返回 space_group 上的空间约束及对应的约束命令"""
+    for constraint_type, constraint_func in (("parent", cmds.parentConstraint), ("orient", cmds.orientConstraint)):
+        constraint_node = f"{space_group}_{constraint_type}Constraint"
+        if SCENE_INDEX.exists(constraint_node):
+            return constraint_node, constraint_func
+    return None, None
+
+
+def _constraint_weight_attr(constraint_node, constraint_func, target):
+    """返回约束中 target 对应的权重属性"""
+    targets = constraint_func(constraint_node, query=True, targetList=True) or []
+    aliases = constraint_func(constraint_node, query=True, weightAliasList=True) or []
+    return f"{constraint_node}.{aliases[targets.index(target)]}"
+
+
+def _target_offsets(constraint_node):
+    """读取父子约束每个目标的偏移 {目标索引: (targetOffsetTranslate, targetOffsetRotate)}"""
+    offsets = {}
+    for i in cmds.getAttr(f"{constraint_node}.target", multiIndices=True) or []:
+        plug = f"{constraint_node}.target[{i}]"
+        offsets[i] = (cmds.getAttr(f"{plug}.targetOffsetTranslate")[0], cmds.getAttr(f"{plug}.targetOffsetRotate")[0])
+    return offsets
+
+
+def add_space(ctrl_name, space_group, prefix, opt, space_group_map=SPACE_GROUPS):
+    """
+    为已有的空间切换追加一个空间
+
+    枚举末尾追加新空间（已有空间的枚举值不变，space 上的动画不受影响），
+    只创建新空间的目标与权重逻辑，适用于 constraint / matrix / pooled 三种方式。
+
+    参数:
+        ctrl_name: 控制器名称 (e.g. 'ctrl_l_handIk_001')
+        space_group: 空间组名称 (e.g. 'space_l_handIk_001')
+        prefix: 命名前缀 (e.g. 'l_handIk')
+        opt: 新空间名称 (e.g. 'Hips')，对应的空间组从 space_group_map 中获取
+        space_group_map: 空间组映射字典
+
+    返回:
+        int: 新空间的枚举值
+    """
+    if not SCENE_INDEX.exists(f"{ctrl_name}.space"):
+        raise ValueError(f"控制器 {ctrl_name} 没有空间切换，请先调用 create_space_switch")
+    entries = _read_space_enum(ctrl_name)
+    if opt in [name for name, _ in entries]:
+        cmds.warning(f"{ctrl_name} 已有空间 {opt}，跳过")
+        return dict(entries)[opt]
+
+    side = "l" if prefix.startswith("l_") else "r" if prefix.startswith("r_") else "m"
+    group_name = _resolve_space_group(opt, space_group_map, side)
+    index = max(i for _, i in entries) + 1
+    choice = f"chc_{prefix}Space_001"
+
+    if SCENE_INDEX.exists(choice):
+        # 矩阵方式: 新建一个空间矩阵并接入 choice
+        matrices = get_world_matrices([space_group, group_name])
+        mult = cmds.createNode("multMatrix", name=f"mmx_{prefix}Space{opt}_001")
+        cmds.setAttr(f"{mult}.matrixIn[0]", np.matmul(matrices[0], np.linalg.inv(matrices[1])).flatten().tolist(),
+                     type="matrix")
+        cmds.connectAttr(f"{group_name}.worldMatrix[0]", f"{mult}.matrixIn[1]")
+        cmds.connectAttr(f"{space_group}.parentInverseMatrix[0]", f"{mult}.matrixIn[2]")
+        cmds.connectAttr(f"{mult}.matrixSum", f"{choice}.input[{index}]")
+        if SCENE_INDEX.exists(f"chc_{prefix}SpaceB_001"):
+            cmds.connectAttr(f"{mult}.matrixSum", f"chc_{prefix}SpaceB_001.input[{index}]")
+            _write_space_enum(ctrl_name, _read_space_enum(ctrl_name, "spaceB") + [(opt, index)], "spaceB")
+    else:
+        constraint_node, constraint_func = _find_space_constraint(space_group)
+        if constraint_node is None:
+            raise ValueError(f"{space_group} 上没有空间约束")
+        targets = constraint_func(constraint_node, query=True, targetList=True) or []
+        pooled = not any(target.startswith(f"loc_{prefix}Space") for target in targets)
+        if pooled and constraint_func is cmds.orientConstraint:
+            raise ValueError(f"{constraint_node} 为共享空间组的旋转约束（只有一个 offset），无法只为新空间计算偏移，"
+                             f"请用 'constraint' 或 'matrix' 方式重建")
+
+        if pooled and group_name in targets:
+            # 共享同一空间组: 串联到该目标已有的 condition 之前
+            weight_attr = _constraint_weight_attr(constraint_node, constraint_func, group_name)
+            source = cmds.listConnections(weight_attr, source=True, destination=False, plugs=True)
+            cond = _create_space_condition(ctrl_name, prefix, opt, index, source[0] if source else None)
+            cmds.connectAttr(f"{cond}.outColorR", weight_attr, force=True)
+        else:
+            if pooled:
+                # maintainOffset 会按当前姿势重新计算所有目标的偏移，只保留新目标的偏移，已有目标写回原值
+                target = group_name
+                existing_offsets = _target_offsets(constraint_node)
+                constraint_func(target, space_group, maintainOffset=True)
+                for i, (translate, rotate) in existing_offsets.items():
+                    cmds.setAttr(f"{constraint_node}.target[{i}].targetOffsetTranslate", *translate)
+                    cmds.setAttr(f"{constraint_node}.target[{i}].targetOffsetRotate", *rotate)
+            else:
+                # 与 create_space_switch 相同: 定位器匹配到 space_group
+                target = cmds.spaceLocator(name=f"loc_{prefix}Space{opt}_001")[0]
+                zero_group = cmds.group(target, name=f"zero_{prefix}Space{opt}_001")
+                cmds.parent(zero_group, group_name)
+                cmds.matchTransform(zero_group, space_group)
+                constraint_func(target, space_group, maintainOffset=False)
+            cond = _create_space_condition(ctrl_name, prefix, opt, index)
+            cmds.connectAttr(f"{cond}.outColorR", _constraint_weight_attr(constraint_node, constraint_func, target))
+
+    _write_space_enum(ctrl_name, entries + [(opt, index)])
+    return index
+
+
+def remove_space(ctrl_name, space_group, prefix, opt):
+    """
+    从已有的空间切换中移除一个空间
+
+    只删除该空间的目标与权重逻辑，其余空间的枚举值保持不变。
+    space 上仍有关键帧使用该空间时给出警告（关键帧本身不做修改）。
+
+    参数:
+        ctrl_name: 控制器名称
+        space_group: 空间组名称
+        prefix: 命名前缀
+        opt: 要移除的空间名称
+    """
+    entries = _read_space_enum(ctrl_name)
+    indices = dict(entries)
+    if opt not in indices:
+        cmds.warning(f"{ctrl_name} 没有空间 {opt}，跳过")
+        return
+    if len(entries) == 1:
+        raise ValueError(f"不能移除 {ctrl_name} 的最后一个空间")
+    index = indices[opt]
+
+    keyed_values = cmds.keyframe(f"{ctrl_name}.space", query=True, valueChange=True) or []
+    if any(int(round(value)) == index for value in keyed_values):
+        cmds.warning(f"{ctrl_name}.space 仍有关键帧使用空间 {opt}（{index}），请检查动画")
+
+    choice = f"chc_{prefix}Space_001"
+    if SCENE_INDEX.exists(choice):
+        for node in (choice, f"chc_{prefix}SpaceB_001"):
+            if SCENE_INDEX.exists(node):
+                cmds.removeMultiInstance(f"{node}.input[{index}]", b=True)
+        if SCENE_INDEX.exists(f"chc_{prefix}SpaceB_001"):
+            _write_space_enum(ctrl_name, [e for e in _read_space_enum(ctrl_name, "spaceB") if e[0] != opt], "spaceB")
+        cmds.delete(f"mmx_{prefix}Space{opt}_001")
+    else:
+        constraint_node, constraint_func = _find_space_constraint(space_group)
+        cond = f"cond_{prefix}Space{opt}_001"
+        next_source = cmds.listConnections(f"{cond}.colorIfFalseR", source=True, destination=False, plugs=True)
+        destinations = cmds.listConnections(f"{cond}.outColorR", source=False, destination=True, plugs=True) or []
+        loc = f"loc_{prefix}Space{opt}_001"
+
+        if SCENE_INDEX.exists(loc):
+            constraint_func(loc, space_group, edit=True, remove=True)
+            cmds.delete(f"zero_{prefix}Space{opt}_001")
+        elif next_source:
+            # 共享目标的 condition 串联中摘除当前节点
+            for destination in destinations:
+                cmds.connectAttr(next_source[0], destination, force=True)
+        elif destinations and destinations[0].endswith(".colorIfFalseR"):
+            # 串联末尾: 前一个 condition 不再取后续结果
+            cmds.disconnectAttr(f"{cond}.outColorR", destinations[0])
+            cmds.setAttr(destinations[0], 0)
+        else:
+            # 该空间组只被这一个空间使用: 移除约束目标
+            targets = constraint_func(constraint_node, query=True, targetList=True) or []
+            aliases = constraint_func(constraint_node, query=True, weightAliasList=True) or []
+            for target, alias in zip(targets, aliases):
+                sources = cmds.listConnections(f"{constraint_node}.{alias}", source=True, destination=False) or []
+                if cond in sources:
+                    constraint_func(target, space_group, edit=True, remove=True)
+        if SCENE_INDEX.exists(cond):
+            cmds.delete(cond)
+
+    remaining = [entry for entry in entries if entry[0] != opt]
+    _write_space_enum(ctrl_name, remaining)
+    # 当前值指向被移除的空间时切换到第一个空间（有关键帧时以动画为准）
+    if cmds.getAttr(f"{ctrl_name}.space") == index and not keyed_values:
+        cmds.setAttr(f"{ctrl_name}.space", remaining[0][1])
+
+
+def report_space_locators():
+    """
+    统计场景中的空间定位器数量，并与每个空间各一个定位器（约束方式）所需的数量对比
+
+    返回:
+        tuple: (当前定位器数量, 约束方式需要的定位器数量)
+    """
+    locators = [loc for loc in SCENE_INDEX.glob("loc_*Space*_001")
+                if cmds.listRelatives(loc, shapes=True, type="locator")]
+    switched = sorted({attr.split(".", 1)[0] for attr in cmds.ls("*.space") or []})
+    per_space = sum(len(cmds.attributeQuery("space", node=ctrl, listEnum=True)[0].split(":")) for ctrl in switched)
+    print(f"空间定位器: 当前 {len(locators)} 个，{len(switched)} 个空间切换控制器按每个空间一个定位器需要 {per_space} 个")
+    return len(locators), per_space
+
+
+def benchmark_space_switch(control_count=13, space_count=5, frames=100, repeat=3):
+    """
+    对比约束方式与矩阵方式空间切换的节点数和逐帧求值耗时
+
+    创建 space_count 个带随机动画的空间父级和 control_count 个控制器，
+    每种方式各构建一次（space 枚举逐帧切换的关键帧），统计新增节点数并逐帧播放拉取控制器的世界矩阵。
+
+    返回:
+        dict: {方式: {'nodes': 新增节点数, 'per_frame': 每帧秒数, 'build': 构建秒数}}
+    """
+    rng = np.random.default_rng(0)
+    options = [f"Bench{i}" for i in range(space_count)]
+    options[0] = "World"
+    results = {}
+    for mode in SPACE_SWITCH_MODES:
+        root = cmds.group(empty=True, name="grp_m_spaceBench_001")
+        group_map = {}
+        for opt in options:
+            parent = cmds.group(empty=True, name=f"grp_m_spaceBench{opt}Parent_001", parent=root)
+            for frame in (1, frames // 2, frames):
+                for attr in ("tx", "ty", "tz", "rx", "ry", "rz"):
+                    cmds.setKeyframe(parent, attribute=attr, time=frame, value=float(rng.uniform(-20, 20)))
+            group_map[opt] = cmds.group(empty=True, name=f"grp_m_spaceBench{opt}SpaceLocs_001", parent=parent)
+
+        ctrls = []
+        for i in range(control_count):
+            driven = cmds.group(empty=True, name=f"driven_m_spaceBench{i}_001", parent=root)
+            cmds.xform(driven, translation=[float(v) for v in rng.uniform(-10, 10, 3)])
+            space = cmds.group(empty=True, name=f"space_m_spaceBench{i}_001", parent=driven)
+            ctrls.append(cmds.group(empty=True, name=f"ctrl_m_spaceBench{i}_001", parent=space))
+
+        before = set(cmds.ls(uuid=True) or [])
+        start = time.perf_counter()
+        for i, ctrl in enumerate(ctrls):
+            create_space_switch(ctrl, f"space_m_spaceBench{i}_001", f"m_spaceBench{i}", options, group_map,
+                                constraint_type="orient" if i % 3 == 2 else "parent", mode=mode)
+        build_time = time.perf_counter() - start
+        created = set(cmds.ls(uuid=True) or []) - before
+        node_count = len(created)
+
+        for i, ctrl in enumerate(ctrls):
+            for frame in range(1, frames + 1, 10):
+                cmds.setKeyframe(ctrl, attribute="space", time=frame, value=(frame // 10 + i) % space_count)
+        per_frame = time_playback([f"{ctrl}.worldMatrix[0]" for ctrl in ctrls], 1, frames, repeat)
+        results[mode] = {"nodes": node_count, "per_frame": per_frame, "build": build_time}
+        # condition/choice 等依赖节点不在 root 层级下，需要单独删除
+        cmds.delete(root)
+        remaining = cmds.ls(list(created)) or []
+        if remaining:
+            cmds.delete(remaining)
+        print(f"{mode}: {node_count} 个节点, 构建 {build_time * 1000:.1f} ms")
+
+    print(f"空间切换播放耗时 ({control_count} 个控制器 x {space_count} 个空间, {frames} 帧):")
+    print_comparison({mode: info["per_frame"] for mode, info in results.items()}, "constraint")
+    return results
+
+
 # ========================
 # 辅助函数（完整子模块）
 # ========================
@@ -156,7 +602,7 @@ def create_space_locators(prefix, space_group, options, group_mapping, constrain
         loc_name = f"loc_{prefix}Space{opt}_001"
         zero_name = f"zero_{prefix}Space{opt}_001"
 
-        if not cmds.objExists(loc_name):
+        if not SCENE_INDEX.exists(loc_name):
             loc = cmds.spaceLocator(name=loc_name)[0]
             zero_group = cmds.group(loc, name=zero_name)
             cmds.parent(zero_group, group_name)
@@ -207,138 +653,144 @@ def connect_switch_logic(ctrl_name, constraint_node, locators, options, prefix):
 # 调用示例
 # ========================
 
-# 批量创建空间组
-for group_type, config in space_groups.items():
-    for side in config['sides']:
-        # 统一命名规则
-        space_name = f"space_{side}_{group_type}_001"
-        driven_name = f"driven_{side}_{group_type}_001"
-        connect_name = f"connect_{side}_{group_type}_001"
-
-        # 创建并设置空间组
-        cmds.group(em=True, n=space_name)
-        cmds.matchTransform(space_name, driven_name)
-        cmds.parent(space_name, driven_name)
-        cmds.parent(connect_name, space_name)
-
-# 批量创建空组并设置父子关系
-for group_name, parent_obj in group_parents:
-    if not cmds.objExists(group_name):
-        cmds.group(em=True, n=group_name)
-        cmds.hide(group_name)
-
-    if cmds.objExists(parent_obj):
-        cmds.parent(group_name, parent_obj)
-    else:
-        print(f"// Warning: 父对象 '{parent_obj}' 不存在，跳过层级设置 //")
-
-cmds.hide("grp_?_*SpaceLocs_001")
-
-create_space_switch(
-    ctrl_name="ctrl_l_handIk_001",
-    space_group="space_l_handIk_001",
-    prefix="l_handIk",
-    space_options=["World", "Cog", "Chest", "Head", "Pelvis"],
-    space_group_map=SPACE_GROUPS
-)
-
-create_space_switch(
-    ctrl_name="ctrl_r_handIk_001",
-    space_group="space_r_handIk_001",
-    prefix="r_handIk",
-    space_options=["World", "Cog", "Chest", "Head", "Pelvis"],
-    space_group_map=SPACE_GROUPS
-)
-
-create_space_switch(
-    ctrl_name="ctrl_l_ankleIk_001",
-    space_group="space_l_ankleIk_001",
-    prefix="l_ankleIk",
-    space_options=["World", "Cog", "Pelvis"],
-    space_group_map=SPACE_GROUPS
-)
-
-create_space_switch(
-    ctrl_name="ctrl_r_ankleIk_001",
-    space_group="space_r_ankleIk_001",
-    prefix="r_ankleIk",
-    space_options=["World", "Cog", "Pelvis"],
-    space_group_map=SPACE_GROUPS
-)
-
-create_space_switch(
-    ctrl_name="ctrl_l_elbowIkGuide_001",
-    space_group="space_l_elbowIkGuide_001",
-    prefix="l_elbowIkGuide",
-    space_options=["World", "Cog", "Chest", "Head", "Pelvis"],
-    space_group_map=SPACE_GROUPS
-)
-
-create_space_switch(
-    ctrl_name="ctrl_r_elbowIkGuide_001",
-    space_group="space_r_elbowIkGuide_001",
-    prefix="r_elbowIkGuide",
-    space_options=["World", "Cog", "Chest", "Head", "Pelvis"],
-    space_group_map=SPACE_GROUPS
-)
-
-create_space_switch(
-    ctrl_name="ctrl_l_kneeIkGuide_001",
-    space_group="space_l_kneeIkGuide_001",
-    prefix="l_kneeIkGuide",
-    space_options=["World", "Cog", "Pelvis"],
-    space_group_map=SPACE_GROUPS
-)
-create_space_switch(
-    ctrl_name="ctrl_r_kneeIkGuide_001",
-    space_group="space_r_kneeIkGuide_001",
-    prefix="r_kneeIkGuide",
-    space_options=["World", "Cog", "Pelvis"],
-    space_group_map=SPACE_GROUPS
-)
-
-create_space_switch(
-    ctrl_name="ctrl_m_headIk_001",
-    space_group="space_m_headIk_001",
-    prefix="m_headIk",
-    space_options=["World", "Cog", "Chest", "Neck"],
-    space_group_map=SPACE_GROUPS,
-    constraint_type='orient'
-
-)
-
-create_space_switch(
-    ctrl_name="ctrl_l_upperArmFk_001",
-    space_group="space_l_upperArmFk_001",
-    prefix="l_upperArmFk",
-    space_options=["World", "Cog", "Chest", "Clavicle", "Scapula"],
-    space_group_map=SPACE_GROUPS,
-    constraint_type='orient'
-)
-
-create_space_switch(
-    ctrl_name="ctrl_r_upperArmFk_001",
-    space_group="space_r_upperArmFk_001",
-    prefix="r_upperArmFk",
-    space_options=["World", "Cog", "Chest", "Clavicle", "Scapula"],
-    space_group_map=SPACE_GROUPS,
-    constraint_type='orient'
-)
-
-create_space_switch(
-    ctrl_name="ctrl_l_upperLegFk_001",
-    space_group="space_l_upperLegFk_001",
-    prefix="l_upperLegFk",
-    space_options=["World", "Cog", "Pelvis"],
-    space_group_map=SPACE_GROUPS,
-    constraint_type='orient'
-)
-
-create_space_switch(
-    ctrl_name="ctrl_r_upperLegFk_001",
-    space_group="space_r_upperLegFk_001",
-    prefix="r_upperLegFk",
-    space_options=["World", "Cog", "Pelvis"],
-    space_group_map=SPACE_GROUPS,
-    constraint_type='orient'
-)
+# 构建期间启用场景名称索引，存在性判断与通配符查询不再扫描整个场景
+with SCENE_INDEX:
+    # 批量创建空间组
+    for group_type, config in space_groups.items():
+        for side in config['sides']:
+            # 统一命名规则
+            space_name = f"space_{side}_{group_type}_001"
+            driven_name = f"driven_{side}_{group_type}_001"
+            connect_name = f"connect_{side}_{group_type}_001"
+
+            # 创建并设置空间组
+            cmds.group(em=True, n=space_name)
+            cmds.matchTransform(space_name, driven_name)
+            cmds.parent(space_name, driven_name)
+            cmds.parent(connect_name, space_name)
+
+    # 批量创建空组并设置父子关系
+    for group_name, parent_obj in group_parents:
+        if not SCENE_INDEX.exists(group_name):
+            cmds.group(em=True, n=group_name)
+            cmds.hide(group_name)
+
+        if SCENE_INDEX.exists(parent_obj):
+            cmds.parent(group_name, parent_obj)
+        else:
+            print(f"// Warning: 父对象 '{parent_obj}' 不存在，跳过层级设置 //")
+
+    space_loc_groups = SCENE_INDEX.glob("grp_?_*SpaceLocs_001")
+    if space_loc_groups:
+        cmds.hide(space_loc_groups)
+
+    create_space_switch(
+        ctrl_name="ctrl_l_handIk_001",
+        space_group="space_l_handIk_001",
+        prefix="l_handIk",
+        space_options=["World", "Cog", "Chest", "Head", "Pelvis"],
+        space_group_map=SPACE_GROUPS
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_r_handIk_001",
+        space_group="space_r_handIk_001",
+        prefix="r_handIk",
+        space_options=["World", "Cog", "Chest", "Head", "Pelvis"],
+        space_group_map=SPACE_GROUPS
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_l_ankleIk_001",
+        space_group="space_l_ankleIk_001",
+        prefix="l_ankleIk",
+        space_options=["World", "Cog", "Pelvis"],
+        space_group_map=SPACE_GROUPS
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_r_ankleIk_001",
+        space_group="space_r_ankleIk_001",
+        prefix="r_ankleIk",
+        space_options=["World", "Cog", "Pelvis"],
+        space_group_map=SPACE_GROUPS
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_l_elbowIkGuide_001",
+        space_group="space_l_elbowIkGuide_001",
+        prefix="l_elbowIkGuide",
+        space_options=["World", "Cog", "Chest", "Head", "Pelvis"],
+        space_group_map=SPACE_GROUPS
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_r_elbowIkGuide_001",
+        space_group="space_r_elbowIkGuide_001",
+        prefix="r_elbowIkGuide",
+        space_options=["World", "Cog", "Chest", "Head", "Pelvis"],
+        space_group_map=SPACE_GROUPS
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_l_kneeIkGuide_001",
+        space_group="space_l_kneeIkGuide_001",
+        prefix="l_kneeIkGuide",
+        space_options=["World", "Cog", "Pelvis"],
+        space_group_map=SPACE_GROUPS
+    )
+    create_space_switch(
+        ctrl_name="ctrl_r_kneeIkGuide_001",
+        space_group="space_r_kneeIkGuide_001",
+        prefix="r_kneeIkGuide",
+        space_options=["World", "Cog", "Pelvis"],
+        space_group_map=SPACE_GROUPS
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_m_headIk_001",
+        space_group="space_m_headIk_001",
+        prefix="m_headIk",
+        space_options=["World", "Cog", "Chest", "Neck"],
+        space_group_map=SPACE_GROUPS,
+        constraint_type='orient'
+
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_l_upperArmFk_001",
+        space_group="space_l_upperArmFk_001",
+        prefix="l_upperArmFk",
+        space_options=["World", "Cog", "Chest", "Clavicle", "Scapula"],
+        space_group_map=SPACE_GROUPS,
+        constraint_type='orient'
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_r_upperArmFk_001",
+        space_group="space_r_upperArmFk_001",
+        prefix="r_upperArmFk",
+        space_options=["World", "Cog", "Chest", "Clavicle", "Scapula"],
+        space_group_map=SPACE_GROUPS,
+        constraint_type='orient'
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_l_upperLegFk_001",
+        space_group="space_l_upperLegFk_001",
+        prefix="l_upperLegFk",
+        space_options=["World", "Cog", "Pelvis"],
+        space_group_map=SPACE_GROUPS,
+        constraint_type='orient'
+    )
+
+    create_space_switch(
+        ctrl_name="ctrl_r_upperLegFk_001",
+        space_group="space_r_upperLegFk_001",
+        prefix="r_upperLegFk",
+        space_options=["World", "Cog", "Pelvis"],
+        space_group_map=SPACE_GROUPS,
+        constraint_type='orient'
+    )
+
+    report_space_locators()
@@ -1,4 +1,34 @@
 import maya.cmds as cmds
+import numpy as np
+from rig_math import get_world_matrices, remove_scale, matrix_to_euler_xyz
+from rig_benchmark import time_playback, print_comparison
+
+# 四肢twist配置表，每条肢体生成上下两段twist（上段在靠近肩膀/髋部处最强，下段在靠近手腕/脚踝处最强）
+TWIST_LIMBS = [
+    {'side': 'l', 'limb_type': 'arm', 'upper_joint': 'jnt_l_upperArm_001', 'middle_joint': 'jnt_l_elbow_001',
+     'lower_joint': 'jnt_l_wrist_001', 'scapula_or_hip_joint': 'jnt_l_scapula_001'},
+    {'side': 'r', 'limb_type': 'arm', 'upper_joint': 'jnt_r_upperArm_001', 'middle_joint': 'jnt_r_elbow_001',
+     'lower_joint': 'jnt_r_wrist_001', 'scapula_or_hip_joint': 'jnt_r_scapula_001'},
+    # 髋关节根据实际骨骼层级调整
+    {'side': 'l', 'limb_type': 'leg', 'upper_joint': 'jnt_l_upperLeg_001', 'middle_joint': 'jnt_l_knee_001',
+     'lower_joint': 'jnt_l_ankle_001', 'scapula_or_hip_joint': 'jnt_m_pelvisLocal_001'},
+    {'side': 'r', 'limb_type': 'leg', 'upper_joint': 'jnt_r_upperLeg_001', 'middle_joint': 'jnt_r_knee_001',
+     'lower_joint': 'jnt_r_ankle_001', 'scapula_or_hip_joint': 'jnt_m_pelvisLocal_001'},
+]
+
+# 每段twist关节数量（包含两端，2-20），可在配置表中按肢体用 'joint_count' 覆盖
+TWIST_JOINT_COUNT = 5
+TWIST_JOINT_COUNT_RANGE = (2, 20)
+
+# twist权重衰减曲线: 'linear'、'smoothstep' 或自定义采样值列表（从最弱端到最强端均匀采样，例如 [0, 0.1, 0.5, 1]），
+# 可在配置表中按肢体用 'falloff' 覆盖
+TWIST_FALLOFF = 'linear'
+
+# twist提取方式: 'ik' 每段一条带 ikSCsolver 的驱动器关节链；
+# 'matrix' 由IK手柄父级相对twist父关节的矩阵做 swing/twist 分解（multMatrix -> decomposeMatrix -> quatNormalize -> quatToEuler），
+# 不创建IK手柄
+TWIST_EXTRACTION_MODES = ('ik', 'matrix')
+TWIST_EXTRACTION = 'ik'
 
 
 def setup_twist_system(side, limb_part, start_joint, end_joint, parent_joint, ik_parent, twist_direction='start'):
@@ -161,42 +191,378 @@ def setup_limb_twist(side, limb_type, upper_joint, middle_joint, lower_joint, sc
     )
 
 
-# 设置左臂twist
-setup_limb_twist(
-    side='l',
-    limb_type='arm',
-    upper_joint='jnt_l_upperArm_001',
-    middle_joint='jnt_l_elbow_001',
-    lower_joint='jnt_l_wrist_001',
-    scapula_or_hip_joint='jnt_l_scapula_001'
-)
-
-# 设置右臂twist
-setup_limb_twist(
-    side='r',
-    limb_type='arm',
-    upper_joint='jnt_r_upperArm_001',
-    middle_joint='jnt_r_elbow_001',
-    lower_joint='jnt_r_wrist_001',
-    scapula_or_hip_joint='jnt_r_scapula_001'
-)
-
-# 设置左腿twist
-setup_limb_twist(
-    side='l',
-    limb_type='leg',
-    upper_joint='jnt_l_upperLeg_001',
-    middle_joint='jnt_l_knee_001',
-    lower_joint='jnt_l_ankle_001',
-    scapula_or_hip_joint='jnt_m_pelvisLocal_001'  # 根据实际骨骼层级调整
-)
-
-# 设置右腿twist
-setup_limb_twist(
-    side='r',
-    limb_type='leg',
-    upper_joint='jnt_r_upperLeg_001',
-    middle_joint='jnt_r_knee_001',
-    lower_joint='jnt_r_ankle_001',
-    scapula_or_hip_joint='jnt_m_pelvisLocal_001'  # 根据实际骨骼层级调整
-)
+def twist_segments(limbs):
+    """
+    将肢体配置表展开为twist段
+
+    返回:
+        list: 每段一个字典 {side, limb_part, start_joint, end_joint, parent_joint, ik_parent, twist_direction}
+    """
+    segments = []
+    for limb in limbs:
+        side = limb['side']
+        upper_joint, middle_joint, lower_joint = limb['upper_joint'], limb['middle_joint'], limb['lower_joint']
+        options = {'joint_count': limb.get('joint_count', TWIST_JOINT_COUNT),
+                   'falloff': limb.get('falloff', TWIST_FALLOFF)}
+        segments.append(dict(options, side=side, limb_part=upper_joint.split('_')[-2], start_joint=upper_joint,
+                             end_joint=middle_joint, parent_joint=upper_joint,
+                             ik_parent=limb['scapula_or_hip_joint'], twist_direction='start'))
+        segments.append(dict(options, side=side, limb_part=middle_joint.split('_')[-2], start_joint=middle_joint,
+                             end_joint=lower_joint, parent_joint=middle_joint,
+                             ik_parent=lower_joint, twist_direction='end'))
+    return segments
+
+
+def twist_weights(joint_count, falloff='linear', twist_direction='start'):
+    """
+    计算一段twist关节的权重
+
+    参数:
+        joint_count (int): twist关节数量（包含两端，2-20）
+        falloff: 'linear'、'smoothstep' 或自定义采样值列表（从最弱端到最强端均匀采样，中间线性插值）
+        twist_direction (str): 'start' 或 'end' - twist在靠近起始或结束关节处最强
+
+    返回:
+        np.ndarray: (joint_count,) 每个关节的权重，最强端为 falloff 曲线在 1 处的值
+    """
+    low, high = TWIST_JOINT_COUNT_RANGE
+    if not low <= joint_count <= high:
+        raise ValueError(f"twist关节数量必须在 {low} 到 {high} 之间: {joint_count}")
+    if twist_direction not in ('start', 'end'):
+        raise ValueError("twist_direction 必须是 'start' 或 'end'")
+
+    t = np.linspace(0.0, 1.0, joint_count)
+    # 参数化为到最弱端的距离
+    if twist_direction == 'start':
+        t = 1.0 - t
+    if isinstance(falloff, str):
+        if falloff == 'linear':
+            return t
+        if falloff == 'smoothstep':
+            return t * t * (3.0 - 2.0 * t)
+        raise ValueError(f"未知的衰减曲线 '{falloff}'，请使用 'linear'、'smoothstep' 或采样值列表")
+    samples = np.asarray(falloff, dtype=np.float64)
+    if samples.ndim != 1 or len(samples) < 2:
+        raise ValueError("自定义衰减曲线至少需要两个采样值")
+    return np.interp(t, np.linspace(0.0, 1.0, len(samples)), samples)
+
+
+def connect_twist_weights(driver_attr, twist_joints, weights, name_prefix, pack=True):
+    """
+    用权重把驱动旋转分配到twist关节的 rotateX
+
+    权重为 1 的关节直接连接，权重为 0 的关节不连接，其余关节每三个共用一个 multiplyDivide 节点
+    （X/Y/Z 三个通道各对应一个关节），节点数约为中间关节数的三分之一。
+    pack 为 False 时每个关节一个 multDoubleLinear（旧方式）。
+
+    返回:
+        list: 创建的工具节点
+    """
+    scaled = []
+    for jnt, weight in zip(twist_joints, weights):
+        if abs(weight - 1.0) < 1e-6:
+            cmds.connectAttr(driver_attr, f"{jnt}.rotateX")
+        elif abs(weight) > 1e-6:
+            scaled.append((jnt, float(weight)))
+
+    nodes = []
+    if not pack:
+        for i, (jnt, weight) in enumerate(scaled, 1):
+            mult_node = cmds.createNode('multDoubleLinear', name=f"{name_prefix}_{i:03d}")
+            cmds.setAttr(f"{mult_node}.input2", weight)
+            cmds.connectAttr(driver_attr, f"{mult_node}.input1")
+            cmds.connectAttr(f"{mult_node}.output", f"{jnt}.rotateX")
+            nodes.append(mult_node)
+        return nodes
+
+    for i in range(0, len(scaled), 3):
+        mult_node = cmds.createNode('multiplyDivide', name=f"{name_prefix}_{i // 3 + 1:03d}")
+        for channel, (jnt, weight) in zip('XYZ', scaled[i:i + 3]):
+            cmds.connectAttr(driver_attr, f"{mult_node}.input1{channel}")
+            cmds.setAttr(f"{mult_node}.input2{channel}", weight)
+            cmds.connectAttr(f"{mult_node}.output{channel}", f"{jnt}.rotateX")
+        nodes.append(mult_node)
+    return nodes
+
+
+def _create_joint(name, parent, translate, orient):
+    """在父级下直接创建关节并设置局部位移与jointOrient"""
+    jnt = cmds.createNode('joint', name=name, parent=parent)
+    cmds.setAttr(f"{jnt}.translate", *translate)
+    cmds.setAttr(f"{jnt}.jointOrient", *orient)
+    return jnt
+
+
+def _create_matrix_twist(side, limb_part, source, parent_joint, rest_inverse, orient):
+    """
+    用矩阵节点提取 source 相对 parent_joint 绕twist关节 X 轴的twist角度
+
+    multMatrix 计算 source 相对 parent_joint 的旋转，去除绑定姿势（rest_inverse）并转换到twist关节朝向（orient），
+    decomposeMatrix 输出四元数，只保留 X 与 W 分量归一化后即为绕 X 轴的twist，quatToEuler 转回角度。
+
+    返回:
+        tuple: (twist角度属性, 创建的节点)
+    """
+    prefix = f"{side}_{limb_part}Twist"
+    mult = cmds.createNode('multMatrix', name=f"mmx_{prefix}_001")
+    cmds.setAttr(f"{mult}.matrixIn[0]", np.matmul(orient, rest_inverse).flatten().tolist(), type='matrix')
+    cmds.connectAttr(f"{source}.worldMatrix[0]", f"{mult}.matrixIn[1]")
+    cmds.connectAttr(f"{parent_joint}.worldInverseMatrix[0]", f"{mult}.matrixIn[2]")
+    cmds.setAttr(f"{mult}.matrixIn[3]", orient.T.flatten().tolist(), type='matrix')
+
+    decompose = cmds.createNode('decomposeMatrix', name=f"dcm_{prefix}_001")
+    cmds.connectAttr(f"{mult}.matrixSum", f"{decompose}.inputMatrix")
+
+    normalize = cmds.createNode('quatNormalize', name=f"qnm_{prefix}_001")
+    cmds.connectAttr(f"{decompose}.outputQuatX", f"{normalize}.inputQuatX")
+    cmds.connectAttr(f"{decompose}.outputQuatW", f"{normalize}.inputQuatW")
+
+    to_euler = cmds.createNode('quatToEuler', name=f"q2e_{prefix}_001")
+    cmds.connectAttr(f"{normalize}.outputQuat", f"{to_euler}.inputQuat")
+    return f"{to_euler}.outputRotateX", [mult, decompose, normalize, to_euler]
+
+
+def setup_twist_batch(limbs=TWIST_LIMBS, pack=True, extraction=None):
+    """
+    按配置表一次性为所有肢体创建twist系统
+
+    一次读取所有段起止关节与父级的世界矩阵，用插值批量计算twist关节与驱动器关节的局部位移和jointOrient，
+    直接在父级下创建关节，不使用临时约束、matchTransform/makeIdentity 或通配符查找。
+    默认配置（5个关节、线性衰减）下结果与逐段调用 setup_twist_system 相同。
+
+    参数:
+        limbs (list): 肢体配置表，格式同 TWIST_LIMBS（可选 'joint_count'、'falloff' 覆盖全局配置）
+        pack (bool): 是否每三个关节共用一个 multiplyDivide 节点
+        extraction (str): twist提取方式 'ik' 或 'matrix'，None 时使用 TWIST_EXTRACTION
+
+    返回:
+        list: 每段一个字典 {'segment', 'twist_joints', 'twist_attr', 'driver_joints', 'ik_handle',
+              'utility_nodes'}（matrix 方式没有驱动器关节和IK手柄）
+    """
+    extraction = extraction or TWIST_EXTRACTION
+    if extraction not in TWIST_EXTRACTION_MODES:
+        raise ValueError(f"无效的twist提取方式 '{extraction}'，请使用: {', '.join(TWIST_EXTRACTION_MODES)}")
+    segments = twist_segments(limbs)
+    if not segments:
+        return []
+    # 先校验所有段的配置，避免创建到一半失败
+    weights = [twist_weights(segment['joint_count'], segment['falloff'], segment['twist_direction'])
+               for segment in segments]
+
+    # 一次读取所有需要的世界矩阵（相邻段共用关节，如上段的末端关节同时是下段的起始关节，每个节点只读取一次）
+    segment_nodes = [[segment['start_joint'], segment['end_joint'], segment['parent_joint'], segment['ik_parent']]
+                     for segment in segments]
+    unique_nodes = list(dict.fromkeys(node for names in segment_nodes for node in names))
+    world_matrices = dict(zip(unique_nodes, get_world_matrices(unique_nodes)))
+    matrices = np.array([[world_matrices[node] for node in names] for names in segment_nodes])
+    start_matrices = remove_scale(matrices[:, 0])
+    start_positions = matrices[:, 0, 3, :3]
+    end_positions = matrices[:, 1, 3, :3]
+    parent_matrices = matrices[:, 2]
+    parent_inverses = np.linalg.inv(parent_matrices)
+    parent_rotations = remove_scale(parent_matrices)[:, :3, :3]
+    # matrix 方式: IK手柄父级在绑定姿势下相对twist父关节的矩阵的逆
+    rest_inverses = np.linalg.inv(np.matmul(matrices[:, 3], parent_inverses))
+
+    # twist关节与驱动器关节的朝向都与起始关节一致
+    orient_rotations = np.matmul(start_matrices[:, :3, :3], np.swapaxes(parent_rotations, -1, -2))
+    orients = matrix_to_euler_xyz(orient_rotations)
+    driver_ends = np.einsum('ni,nji->nj', end_positions - start_positions, start_matrices[:, :3, :3])
+
+    results = []
+    hidden = []
+    for n, segment in enumerate(segments):
+        side, limb_part = segment['side'], segment['limb_part']
+        parent_joint = segment['parent_joint']
+
+        # twist关节沿起止连线均匀分布，转换到父级空间
+        t = np.linspace(0.0, 1.0, segment['joint_count'])
+        world = np.repeat(start_matrices[n][None], len(t), axis=0)
+        world[:, 3, :3] = start_positions[n] + t[:, None] * (end_positions[n] - start_positions[n])
+        local_translates = np.matmul(world, parent_inverses[n])[:, 3, :3]
+
+        if extraction == 'matrix':
+            # 与IK驱动器相同: twist来源为IK手柄父级相对twist父关节的旋转
+            orient = np.identity(4)
+            orient[:3, :3] = orient_rotations[n]
+            twist_attr, extract_nodes = _create_matrix_twist(side, limb_part, segment['ik_parent'], parent_joint,
+                                                             rest_inverses[n], orient)
+            driver_joints, ik_handle = [], None
+        else:
+            # 驱动器关节
+            driver_prefix = f"jnt_{side}_{limb_part}TwistDriver"
+            driver_start = _create_joint(f"{driver_prefix}_001", parent_joint, local_translates[0], orients[n])
+            driver_end = _create_joint(f"{driver_prefix}_002", driver_start, driver_ends[n], (0, 0, 0))
+
+            ik_handle = cmds.ikHandle(startJoint=driver_start, endEffector=driver_end, solver="ikSCsolver",
+                                      name=f"ikHnd_{side}_{limb_part}TwistDriver_001")[0]
+            ik_handle = cmds.parent(ik_handle, segment['ik_parent'])[0]
+            # 上段（大臂/大腿）的IK手柄跟随末端关节
+            if segment['twist_direction'] == 'start':
+                cmds.pointConstraint(segment['end_joint'], ik_handle)
+            hidden.extend([driver_start, ik_handle])
+            twist_attr, extract_nodes = f"{driver_start}.rotateX", []
+            driver_joints = [driver_start, driver_end]
+
+        # twist关节
+        twist_joints = [_create_joint(f"jnt_{side}_{limb_part}Twist_{i + 1:03d}", parent_joint,
+                                      local_translates[i], orients[n]) for i in range(len(t))]
+
+        # 按衰减曲线分配twist权重
+        utility_nodes = connect_twist_weights(twist_attr, twist_joints, weights[n],
+                                              f"mult_{side}_{limb_part}Twist", pack=pack)
+
+        results.append({'segment': segment, 'twist_joints': twist_joints, 'twist_attr': twist_attr,
+                        'driver_joints': driver_joints, 'ik_handle': ik_handle,
+                        'utility_nodes': extract_nodes + utility_nodes})
+
+    # 隐藏驱动器关节与IK手柄
+    if hidden:
+        cmds.hide(hidden)
+    return results
+
+
+def _build_test_limb(name, seed=0):
+    """创建一条测试肢体（上/中/下三个关节放在一个父关节下），返回配置表中的一项"""
+    rng = np.random.default_rng(seed)
+    cmds.select(clear=True)
+    root = cmds.joint(name=f"jnt_m_{name}Root_001", position=(0, 0, 0))
+    names = [f"jnt_m_{name}{part}_001" for part in ('Upper', 'Middle', 'Lower')]
+    position = np.zeros(3)
+    for joint_name in names:
+        position = position + rng.normal(0.0, 2.0, 3) + (10.0, 0.0, 0.0)
+        cmds.joint(name=joint_name, position=tuple(position))
+    cmds.select(clear=True)
+    cmds.joint(root, edit=True, orientJoint='xyz', secondaryAxisOrient='yup', children=True, zeroScaleOrient=True)
+    return {'side': 'm', 'limb_type': 'arm', 'upper_joint': names[0], 'middle_joint': names[1],
+            'lower_joint': names[2], 'scapula_or_hip_joint': root}
+
+
+def benchmark_twist_nodes(joint_counts=(2, 3, 5, 8, 11, 14, 17, 20)):
+    """
+    统计不同twist关节数量下每条肢体创建的节点数（逐关节 multDoubleLinear 与打包 multiplyDivide 对比）
+
+    返回:
+        dict: {关节数: {'unpacked': {'utility', 'total'}, 'packed': {'utility', 'total'}}}
+    """
+    results = {}
+    print(f"{'关节数':>6}{'工具节点(旧)':>14}{'工具节点(打包)':>16}{'总节点(旧)':>12}{'总节点(打包)':>14}")
+    for joint_count in joint_counts:
+        results[joint_count] = {}
+        for label, pack in (('unpacked', False), ('packed', True)):
+            limb = _build_test_limb('twistBench')
+            limb['joint_count'] = joint_count
+            before = set(cmds.ls(uuid=True) or [])
+            segments = setup_twist_batch([limb], pack=pack)
+            created = set(cmds.ls(uuid=True) or []) - before
+            results[joint_count][label] = {
+                'utility': sum(len(segment['utility_nodes']) for segment in segments),
+                'total': len(created),
+            }
+            cmds.delete(limb['scapula_or_hip_joint'])
+            remaining = cmds.ls(list(created)) or []
+            if remaining:
+                cmds.delete(remaining)
+        info = results[joint_count]
+        print(f"{joint_count:>6}{info['unpacked']['utility']:>14}{info['packed']['utility']:>16}"
+              f"{info['unpacked']['total']:>12}{info['packed']['total']:>14}")
+    return results
+
+
+def _delete_created(before):
+    """删除 before 快照之后创建的节点"""
+    created = cmds.ls(list(set(cmds.ls(uuid=True) or []) - before), long=True) or []
+    # 先删除层级最深的节点，避免父级删除后子级名称失效
+    for node in sorted(created, key=lambda name: -name.count('|')):
+        if cmds.objExists(node):
+            cmds.delete(node)
+
+
+def _key_test_limb(limb, frames, seed=0):
+    """为测试肢体的关节添加以twist为主的随机旋转动画"""
+    rng = np.random.default_rng(seed)
+    joints = [limb['scapula_or_hip_joint'], limb['upper_joint'], limb['middle_joint'], limb['lower_joint']]
+    for jnt in joints:
+        for frame in (1, frames // 2, frames):
+            for axis, limit in (('X', 90.0), ('Y', 20.0), ('Z', 20.0)):
+                cmds.setKeyframe(jnt, attribute=f'rotate{axis}', time=frame, value=float(rng.uniform(-limit, limit)))
+
+
+def verify_twist_extraction(frames=(1, 13, 25, 37, 50), tolerance=1.0):
+    """
+    校验 matrix 方式与 ik 方式提取的twist是否一致
+
+    创建两条相同的测试肢体并添加相同的动画，分别用两种方式创建twist，比较各帧所有twist关节的 rotateX。
+
+    返回:
+        float: rotateX 的最大差值（角度）
+    """
+    before = set(cmds.ls(uuid=True) or [])
+    original_time = cmds.currentTime(query=True)
+    results = {}
+    try:
+        for mode in TWIST_EXTRACTION_MODES:
+            limb = _build_test_limb(f"twistCheck{mode.capitalize()}")
+            _key_test_limb(limb, max(frames))
+            results[mode] = setup_twist_batch([limb], extraction=mode)
+
+        max_error = 0.0
+        for frame in frames:
+            cmds.currentTime(frame, update=True)
+            values = {mode: np.array([cmds.getAttr(f"{jnt}.rotateX") for segment in segments
+                                      for jnt in segment['twist_joints']])
+                      for mode, segments in results.items()}
+            error = float(np.max(np.abs(values['ik'] - values['matrix'])))
+            max_error = max(max_error, error)
+            if error > tolerance:
+                cmds.warning(f"第 {frame} 帧两种twist提取方式相差 {error:.3f} 度")
+    finally:
+        cmds.currentTime(original_time, update=True)
+        _delete_created(before)
+
+    print(f"twist提取校验: 最大差值 {max_error:.4f} 度 ({'通过' if max_error <= tolerance else '未通过'})")
+    return max_error
+
+
+def benchmark_twist_extraction(limbs=TWIST_LIMBS, frames=100, repeat=3):
+    """
+    对比 ik 与 matrix 两种twist提取方式的逐帧播放耗时
+
+    默认在当前绑定上按 TWIST_LIMBS 测试整套四肢（使用场景已有的动画）：每种方式在已有的twist旁边另建一套
+    （重名节点由 Maya 自动改名），已有的twist、蒙皮及其连接不做任何修改，两种方式的耗时都包含已有twist的求值。
+    limbs 为 None 时改为创建四条带动画的测试肢体。
+    每种方式创建后逐帧播放并拉取各段末端twist关节的世界矩阵，测完只删除本次新建的节点。
+
+    返回:
+        dict: {提取方式: 每帧秒数}
+    """
+    before = set(cmds.ls(uuid=True) or [])
+    if limbs is None:
+        limbs = []
+        for i in range(4):
+            limb = _build_test_limb(f"twistBench{i}Limb", seed=i)
+            _key_test_limb(limb, frames, seed=i)
+            limbs.append(limb)
+        start, end = 1, frames
+    else:
+        start, end = None, None
+
+    results = {}
+    try:
+        for mode in TWIST_EXTRACTION_MODES:
+            mode_before = set(cmds.ls(uuid=True) or [])
+            segments = setup_twist_batch(limbs, extraction=mode)
+            pull_attrs = [f"{segment['twist_joints'][-1]}.worldMatrix[0]" for segment in segments]
+            results[mode] = time_playback(pull_attrs, start, end, repeat)
+            _delete_created(mode_before)
+    finally:
+        _delete_created(before)
+
+    print(f"twist提取播放耗时 ({len(limbs)} 条肢体):")
+    print_comparison(results, 'ik')
+    return results
+
+
+if __name__ == "__main__":
+    # 按配置表为四肢设置twist（只在作为脚本执行时创建，导入本模块时不会重复创建）
+    setup_twist_batch(TWIST_LIMBS)
@@ -7,6 +7,14 @@ import traceback
 import importlib.util
 import ast  # 用于解析函数而不执行代码
 
+# 将工具目录加入 sys.path，以便导入同目录下的工具模块（如 cmds_profiler）
+try:
+    TOOL_DIR = os.path.dirname(os.path.abspath(__file__))
+except NameError:
+    TOOL_DIR = None
+if TOOL_DIR and TOOL_DIR not in sys.path:
+    sys.path.append(TOOL_DIR)
+
 
 # 获取Maya主窗口
 def get_maya_main_window():
@@ -51,7 +59,8 @@ class MayaToolWindow(QtWidgets.QDialog):
         self.current_module = None  # 当前选中的模块对象
         self.module_functions = {}  # 存储模块函数信息
         self.undo_stack = []  # 存储撤销信息
-        self.max_undo_steps = 5  # 最大保存的撤销步骤数
+        self.max_undo_steps = 20  # 最大保存的撤销步骤数
+        self.max_file_snapshots = 5  # 最大保存的文件快照数
         self.undo_counter = 0  # 撤销文件计数器
         self.redo_stack = []  # 存储重做信息
 
@@ -65,6 +74,9 @@ class MayaToolWindow(QtWidgets.QDialog):
         # 添加模块管理选项卡
         self.setup_module_tab()
 
+        # 添加节点统计选项卡
+        self.setup_report_tab()
+
         # 添加日志输出区域
         log_group = QtWidgets.QGroupBox("执行日志")
         log_layout = QtWidgets.QVBoxLayout()
@@ -179,11 +191,110 @@ class MayaToolWindow(QtWidgets.QDialog):
         self.execute_btn.clicked.connect(self.execute_module)
         function_layout.addWidget(self.execute_btn, 1, 1)
 
+        # cmds调用统计开关
+        self.profile_checkbox = QtWidgets.QCheckBox("统计cmds调用")
+        self.profile_checkbox.setToolTip("执行时统计每个构建函数的 maya.cmds 调用次数与耗时")
+        function_layout.addWidget(self.profile_checkbox, 1, 0)
+
+        # 文件快照撤销开关（用于无法通过 Maya 撤销的操作）
+        self.snapshot_checkbox = QtWidgets.QCheckBox("文件快照撤销")
+        self.snapshot_checkbox.setToolTip("执行前保存整个场景作为撤销点，仅用于无法通过 Maya 撤销的操作")
+        function_layout.addWidget(self.snapshot_checkbox, 2, 0)
+
         function_group.setLayout(function_layout)
         layout.addWidget(function_group)
 
         self.tab_widget.addTab(module_tab, "模块管理")
 
+    def setup_report_tab(self):
+        """设置节点统计选项卡：按子系统和节点类型显示构建创建的节点数与估算开销"""
+        report_tab = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(report_tab)
+
+        self.report_table = QtWidgets.QTableWidget(0, 4)
+        self.report_table.setHorizontalHeaderLabels(["子系统", "节点类型", "数量", "估算开销"])
+        self.report_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.report_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.report_table)
+
+        btn_layout = QtWidgets.QHBoxLayout()
+        refresh_btn = QtWidgets.QPushButton("刷新统计")
+        refresh_btn.clicked.connect(self.refresh_node_report)
+        export_btn = QtWidgets.QPushButton("导出JSON")
+        export_btn.clicked.connect(self.export_node_report)
+        btn_layout.addWidget(refresh_btn)
+        btn_layout.addWidget(export_btn)
+        btn_layout.addStretch()
+        layout.addLayout(btn_layout)
+
+        self.node_report = None
+        self.tab_widget.addTab(report_tab, "节点统计")
+
+    def refresh_node_report(self):
+        """重新统计节点并刷新表格"""
+        try:
+            import rig_report
+        except ImportError as e:
+            self.log(f"无法加载 rig_report: {str(e)}")
+            return None
+        self.node_report = rig_report.build_report()
+        rows = rig_report.report_rows(self.node_report)
+        self.report_table.setRowCount(len(rows))
+        for row, (subsystem, node_type, nodes, cost) in enumerate(rows):
+            values = [subsystem if node_type == "(合计)" else "", node_type, str(nodes), f"{cost:.1f}"]
+            for column, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem(value)
+                if column >= 2:
+                    item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                self.report_table.setItem(row, column, item)
+        self.log(f"节点统计: 共 {self.node_report['total_nodes']} 个节点，"
+                 f"估算开销 {self.node_report['total_cost']:.1f}")
+        return self.node_report
+
+    def export_node_report(self):
+        """将节点统计导出为 json"""
+        if self.node_report is None and self.refresh_node_report() is None:
+            return
+        import rig_report
+        json_path = os.path.join(cmds.internalVar(userTmpDir=True), "rig_node_report.json")
+        rig_report.to_json(self.node_report, json_path)
+        self.log(f"节点统计已保存: {json_path}")
+
+    def record_nodes(self, subsystem, before):
+        """记录本次执行创建的节点并刷新节点统计"""
+        if before is None:
+            return
+        import rig_report
+        rig_report.record_subsystem(subsystem, before)
+        self.refresh_node_report()
+
+    def check_node_budgets(self, action_name):
+        """
+        检查节点预算
+        FAIL_ON_NODE_BUDGET 为 True 且超出预算时，本次执行标记为失败（日志、状态栏与错误对话框）
+        :return: 是否通过预算检查
+        """
+        import rig_report
+        try:
+            violations = rig_report.check_budgets(self.refresh_node_report())
+        except RuntimeError as e:
+            message = f"{action_name} 执行失败: {str(e)}"
+            self.log(message)
+            QtWidgets.QMessageBox.critical(self, "节点预算超出", f"{message}\n\n可使用\"撤回\"还原本次执行。")
+            return False
+        for key, metric, value, limit in violations:
+            self.log(f"警告: {key} 的 {metric} 为 {value:g}，超出节点预算 {limit:g}")
+        return True
+
+    def take_node_snapshot(self):
+        """执行前记录场景中的节点，无法加载 rig_report 时返回 None"""
+        try:
+            import rig_report
+        except ImportError as e:
+            self.log(f"无法加载 rig_report: {str(e)}")
+            return None
+        return rig_report.snapshot()
+
     def add_module(self):
         """添加新模块到列表"""
         file_path, _ = QtWidgets.QFileDialog.getOpenFileName(
@@ -297,63 +408,114 @@ class MayaToolWindow(QtWidgets.QDialog):
     def create_undo_point(self, action_name):
         """
         创建撤销点
+        默认打开一个命名的 Maya 撤销块（撤销时在内存中回退，不读写文件）；
+        勾选"文件快照"或 Maya 撤销被关闭时改为保存整个场景
         :param action_name: 操作名称，用于在历史记录中显示
+        :return: 撤销信息，创建失败时返回 None
         """
+        self.undo_counter += 1
+        use_file = self.snapshot_checkbox.isChecked()
+        if not use_file and not cmds.undoInfo(query=True, state=True):
+            self.log("Maya 撤销已关闭，改用文件快照")
+            use_file = True
+
+        undo_info = {
+            'mode': 'file' if use_file else 'chunk',
+            'timestamp': QtCore.QDateTime.currentDateTime().toString(),
+            'action': action_name,
+            'index': len(self.undo_stack) + 1
+        }
         try:
-            # 创建唯一的文件名称
-            self.undo_counter += 1
-            file_path = os.path.join(
-                cmds.internalVar(userTmpDir=True),
-                f"undo_state_{self.undo_counter}.ma"
-            )
-
-            # 保存当前场景
-            current_scene = cmds.file(query=True, sceneName=True)
-
-            # 如果没有场景名称，使用新建的场景
-            if not current_scene or not os.path.exists(current_scene):
-                current_scene = file_path
-                cmds.file(rename=file_path)
-
-            # 保存场景副本作为撤销点
-            cmds.file(save=True, type='mayaAscii', force=True)
-            backup_path = file_path
-            cmds.file(rename=backup_path)
-            cmds.file(save=True, force=True, type="mayaAscii")
+            if use_file:
+                undo_info['file'] = self.save_scene_snapshot(f"undo_state_{self.undo_counter}.ma")
+            else:
+                # 撤销块名称带序号，撤回时据此找到对应的撤销块
+                undo_info['chunk'] = f"MayaTool_{self.undo_counter}: {action_name}"
+                cmds.undoInfo(openChunk=True, chunkName=undo_info['chunk'])
+        except Exception as e:
+            self.log(f"创建撤销点失败: {str(e)}")
+            traceback.print_exc()
+            return None
+
+        # 如果超过最大步数，删除最旧的记录；文件快照单独限制数量
+        while len(self.undo_stack) >= self.max_undo_steps:
+            self.discard_undo_info(self.undo_stack.pop(0))
+        snapshots = [info for info in self.undo_stack if info['mode'] == 'file']
+        if use_file and len(snapshots) >= self.max_file_snapshots:
+            self.undo_stack.remove(snapshots[0])
+            self.discard_undo_info(snapshots[0])
+
+        # 添加到撤销栈
+        self.undo_stack.append(undo_info)
+        # 清除重做栈，因为有了新操作
+        self.clear_redo_stack()
+        self.log(f"创建撤销点: {action_name}" + (" (文件快照)" if use_file else ""))
+        self.update_undo_ui()
+        return undo_info
 
-            # 恢复原来的文件路径
-            if current_scene != backup_path:
-                cmds.file(rename=current_scene)
+    def close_undo_point(self, undo_info):
+        """执行结束后关闭撤销块（执行失败时也必须关闭）"""
+        if undo_info and undo_info['mode'] == 'chunk':
+            cmds.undoInfo(closeChunk=True)
 
-            # 保存撤销信息
-            undo_info = {
-                'file': backup_path,
-                'timestamp': QtCore.QDateTime.currentDateTime().toString(),
-                'action': action_name,
-                'index': len(self.undo_stack) + 1
-            }
+    def save_scene_snapshot(self, file_name):
+        """将当前场景另存到临时目录作为快照，场景路径保持不变，返回快照路径"""
+        backup_path = os.path.join(cmds.internalVar(userTmpDir=True), file_name)
 
-            # 如果超过最大步数，删除最旧的记录
-            if len(self.undo_stack) >= self.max_undo_steps:
-                oldest = self.undo_stack.pop(0)
-                try:
-                    if os.path.exists(oldest['file']):
-                        os.remove(oldest['file'])
-                except:
-                    pass
-
-            # 添加到撤销栈
-            self.undo_stack.append(undo_info)
-            # 清除重做栈，因为有了新操作
-            self.clear_redo_stack()
-            self.log(f"创建撤销点: {action_name}")
-            self.update_undo_ui()
+        # 保存当前场景
+        current_scene = cmds.file(query=True, sceneName=True)
 
-            return True
-        except Exception as e:
-            self.log(f"创建撤销点失败: {str(e)}")
-            traceback.print_exc()
-            return False
+        # 如果没有场景名称，使用新建的场景
+        if not current_scene or not os.path.exists(current_scene):
+            current_scene = backup_path
+            cmds.file(rename=backup_path)
+
+        # 保存场景副本作为撤销点
+        cmds.file(rename=backup_path)
+        cmds.file(save=True, force=True, type="mayaAscii")
+
+        # 恢复原来的文件路径
+        if current_scene != backup_path:
+            cmds.file(rename=current_scene)
+        return backup_path
+
+    def discard_undo_info(self, undo_info):
+        """删除撤销信息对应的快照文件"""
+        try:
+            if undo_info.get('file') and os.path.exists(undo_info['file']):
+                os.remove(undo_info['file'])
+        except:
+            pass
+
+    def drop_chunk_history(self):
+        """打开场景文件会清空 Maya 撤销队列，之前的撤销块随之失效"""
+        dropped = [info for info in self.undo_stack + self.redo_stack if info['mode'] == 'chunk']
+        if dropped:
+            self.undo_stack = [info for info in self.undo_stack if info['mode'] != 'chunk']
+            self.redo_stack = [info for info in self.redo_stack if info['mode'] != 'chunk']
+            self.log(f"打开快照文件后 {len(dropped)} 个撤销块已失效")
+
+    def walk_undo_chunk(self, undo_info, redo=False):
+        """
+        撤回（或重做）到指定撤销块为止
+        之后在 Maya 中进行的操作（例如选择）位于撤销块之上，会一并撤回
+        队列中没有该撤销块时（例如已被撤销队列长度挤出）把已经走过的步骤反向恢复，场景保持不变
+        :return: 是否找到并处理了该撤销块
+        """
+        step, step_back = (cmds.redo, cmds.undo) if redo else (cmds.undo, cmds.redo)
+        steps = 0
+        while True:
+            name = cmds.undoInfo(query=True, redoName=True) if redo else cmds.undoInfo(query=True, undoName=True)
+            if not name:
+                for _ in range(steps):
+                    step_back()
+                return False
+            step()
+            steps += 1
+            if name == undo_info['chunk']:
+                if steps > 1:
+                    self.log(f"{'重做' if redo else '撤回'}了 {steps - 1} 个之后的 Maya 操作")
+                return True
 
     def undo_action(self):
         """执行撤回操作"""
@@ -365,37 +527,31 @@ class MayaToolWindow(QtWidgets.QDialog):
             undo_info = self.undo_stack.pop()
             action_name = undo_info['action']
 
+            if undo_info['mode'] == 'chunk':
+                if self.walk_undo_chunk(undo_info):
+                    self.redo_stack.append(undo_info)
+                    self.log(f"撤回操作: {action_name}")
+                else:
+                    self.log(f"Maya 撤销队列中已没有该操作: {action_name}")
+                self.update_undo_ui()
+                return
+
             # 保存当前场景到重做点
-            current_scene = cmds.file(query=True, sceneName=True)
-            if current_scene and os.path.exists(current_scene):
-                # 创建重做点
-                redo_counter = len(self.redo_stack) + 1
-                redo_path = os.path.join(
-                    cmds.internalVar(userTmpDir=True),
-                    f"redo_state_{redo_counter}.ma"
-                )
-
-                # 保存当前场景到重做点
-                cmds.file(rename=redo_path)
-                cmds.file(save=True, force=True, type="mayaAscii")
-
-                # 添加重做信息
-                redo_info = {
-                    'file': redo_path,
-                    'timestamp': QtCore.QDateTime.currentDateTime().toString(),
-                    'action': f"重做: {action_name}",
-                    'index': len(self.redo_stack) + 1
-                }
-                self.redo_stack.append(redo_info)
+            redo_path = self.save_scene_snapshot(f"redo_state_{len(self.redo_stack) + 1}.ma")
+            redo_info = {
+                'mode': 'file',
+                'file': redo_path,
+                'timestamp': QtCore.QDateTime.currentDateTime().toString(),
+                'action': action_name,
+                'index': len(self.redo_stack) + 1
+            }
 
             # 重置Maya状态
             if os.path.exists(undo_info['file']):
                 # 打开撤销点文件
                 cmds.file(undo_info['file'], open=True, force=True)
-
-                # 更新重做按钮状态
-                self.redo_btn.setEnabled(True)
-
+                self.drop_chunk_history()
+                self.redo_stack.append(redo_info)
                 self.log(f"撤回操作: {action_name}")
             else:
                 self.log(f"撤销点文件已丢失: {undo_info['file']}")
@@ -415,37 +571,34 @@ class MayaToolWindow(QtWidgets.QDialog):
             # 获取最新的重做点
             redo_info = self.redo_stack.pop()
 
+            if redo_info['mode'] == 'chunk':
+                if self.walk_undo_chunk(redo_info, redo=True):
+                    self.undo_stack.append(redo_info)
+                    self.log(f"重做操作: {redo_info['action']}")
+                else:
+                    self.log(f"Maya 重做队列中已没有该操作: {redo_info['action']}")
+                self.update_undo_ui()
+                return
+
             # 保存当前场景到撤销点
-            current_scene = cmds.file(query=True, sceneName=True)
-            if current_scene and os.path.exists(current_scene):
-                # 保存到撤销点
-                self.undo_counter += 1
-                undo_path = os.path.join(
-                    cmds.internalVar(userTmpDir=True),
-                    f"undo_state_{self.undo_counter}.ma"
-                )
-
-                # 保存当前场景到撤销点
-                cmds.file(rename=undo_path)
-                cmds.file(save=True, force=True, type="mayaAscii")
-
-                # 添加到撤销栈
-                undo_info = {
-                    'file': undo_path,
-                    'timestamp': QtCore.QDateTime.currentDateTime().toString(),
-                    'action': f"重做: {redo_info['action']}",
-                    'index': len(self.undo_stack) + 1
-                }
-                self.undo_stack.append(undo_info)
+            self.undo_counter += 1
+            undo_info = {
+                'mode': 'file',
+                'file': self.save_scene_snapshot(f"undo_state_{self.undo_counter}.ma"),
+                'timestamp': QtCore.QDateTime.currentDateTime().toString(),
+                'action': redo_info['action'],
+                'index': len(self.undo_stack) + 1
+            }
 
             # 打开重做点文件
             if os.path.exists(redo_info['file']):
                 cmds.file(redo_info['file'], open=True, force=True)
-
+                self.drop_chunk_history()
+                self.undo_stack.append(undo_info)
                 self.log(f"重做操作: {redo_info['action']}")
-                self.update_undo_ui()
             else:
                 self.log(f"重做点文件已丢失: {redo_info['file']}")
+            self.update_undo_ui()
 
         except Exception as e:
             self.log(f"重做操作失败: {str(e)}")
@@ -455,11 +608,7 @@ class MayaToolWindow(QtWidgets.QDialog):
         """清除所有撤销历史"""
         # 删除所有撤销文件
         for undo_info in self.undo_stack:
-            try:
-                if os.path.exists(undo_info['file']):
-                    os.remove(undo_info['file'])
-            except:
-                pass
+            self.discard_undo_info(undo_info)
 
         # 同时清除重做历史
         self.clear_redo_stack()
@@ -471,11 +620,7 @@ class MayaToolWindow(QtWidgets.QDialog):
     def clear_redo_stack(self):
         """清除重做栈"""
         for redo_info in self.redo_stack:
-            try:
-                if os.path.exists(redo_info['file']):
-                    os.remove(redo_info['file'])
-            except:
-                pass
+            self.discard_undo_info(redo_info)
         self.redo_stack = []
         self.redo_btn.setEnabled(False)
 
@@ -506,12 +651,18 @@ class MayaToolWindow(QtWidgets.QDialog):
         file_path = module_info['file_path']
         encoding = module_info['encoding']
 
+        profiler = self.start_profiler()
+        before = None
+        undo_info = None
         try:
             # 1. 首先创建撤销点
-            if not self.create_undo_point(f"{module_name}.{func_name}"):
+            undo_info = self.create_undo_point(f"{module_name}.{func_name}")
+            if not undo_info:
                 self.log(f"警告: 撤销点创建失败，继续执行函数 '{func_name}'")
+            before = self.take_node_snapshot()
 
-            # 2. 动态加载模块
+            # 2. 动态加载模块（模块目录加入 sys.path，以便导入同目录下的辅助模块）
+            self.add_module_dir_to_path(file_path)
             spec = importlib.util.spec_from_file_location(module_name, file_path)
             module = importlib.util.module_from_spec(spec)
 
@@ -526,10 +677,18 @@ class MayaToolWindow(QtWidgets.QDialog):
             func = getattr(module, func_name)
             self.log(f"执行函数: {func_name}()")
             func()
-            self.log(f"函数 {func_name}() 执行完成")
+            self.record_nodes(module_name, before)
+            before = None
+            if self.check_node_budgets(f"{module_name}.{func_name}"):
+                self.log(f"函数 {func_name}() 执行完成")
         except Exception as e:
             self.log(f"执行错误: {str(e)}")
             traceback.print_exc()
+        finally:
+            self.finish_profiler(profiler, f"{module_name}.{func_name}")
+            # 执行失败时也记录已创建的节点
+            self.record_nodes(module_name, before)
+            self.close_undo_point(undo_info)
 
     def execute_module(self):
         """执行整个模块（按原样执行脚本）"""
@@ -548,26 +707,72 @@ class MayaToolWindow(QtWidgets.QDialog):
         file_path = module_info['file_path']
         encoding = module_info['encoding']
 
+        profiler = self.start_profiler()
+        before = None
+        undo_info = None
         try:
             # 1. 首先创建撤销点
-            if not self.create_undo_point(f"模块 {module_name}"):
+            undo_info = self.create_undo_point(f"模块 {module_name}")
+            if not undo_info:
                 self.log(f"警告: 撤销点创建失败，继续执行模块 '{module_name}'")
+            before = self.take_node_snapshot()
 
             # 2. 记录执行开始
             self.log(f"开始执行模块: {module_name}")
 
-            # 3. 直接执行整个脚本文件
+            # 3. 直接执行整个脚本文件（模块目录加入 sys.path，以便导入同目录下的辅助模块）
+            self.add_module_dir_to_path(file_path)
             with open(file_path, 'r', encoding=encoding) as f:
                 code = f.read()
 
-            # 4. 编译并执行
+            # 4. 编译并按脚本方式执行（独立的命名空间，__file__ 指向模块文件，脚本可据此查找同目录的数据文件）
             compiled_code = compile(code, file_path, 'exec')
-            exec(compiled_code, globals())
+            exec(compiled_code, {'__name__': '__main__', '__file__': file_path, '__builtins__': __builtins__})
 
-            self.log(f"模块 {module_name} 执行完成")
+            self.record_nodes(module_name, before)
+            before = None
+            if self.check_node_budgets(f"模块 {module_name}"):
+                self.log(f"模块 {module_name} 执行完成")
         except Exception as e:
             self.log(f"执行错误: {str(e)}")
             traceback.print_exc()
+        finally:
+            self.finish_profiler(profiler, module_name)
+            # 执行失败时也记录已创建的节点
+            self.record_nodes(module_name, before)
+            self.close_undo_point(undo_info)
+
+    def add_module_dir_to_path(self, file_path):
+        """将模块所在目录加入 sys.path"""
+        module_dir = os.path.dirname(os.path.abspath(file_path))
+        if module_dir not in sys.path:
+            sys.path.insert(0, module_dir)
+
+    def start_profiler(self):
+        """勾选统计时开始记录 cmds 调用，返回统计对象（未勾选时返回 None）"""
+        if not self.profile_checkbox.isChecked():
+            return None
+        try:
+            import cmds_profiler
+        except ImportError as e:
+            self.log(f"无法加载 cmds_profiler: {str(e)}")
+            return None
+        profiler = cmds_profiler.CmdsProfiler()
+        profiler.start()
+        return profiler
+
+    def finish_profiler(self, profiler, label):
+        """停止统计，输出表格与 json，并检查调用预算"""
+        if profiler is None:
+            return
+        profiler.stop()
+        self.log(f"cmds调用统计 ({label}):\n{profiler.report()}")
+        json_path = os.path.join(cmds.internalVar(userTmpDir=True),
+                                 f"cmds_profile_{label.replace('.', '_').replace(' ', '_')}.json")
+        profiler.to_json(json_path)
+        self.log(f"统计结果已保存: {json_path}")
+        for name, per_call, budget in profiler.check_budgets():
+            self.log(f"警告: {name} 单次调用 {per_call:.1f} 次 cmds 调用，超出预算 {budget}")
 
     def log(self, message):
         """添加日志信息"""